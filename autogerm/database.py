@@ -0,0 +1,45 @@
+"""Настройки подключения к SQLite для продакшена.
+
+WAL позволяет читателям не блокироваться на время записи, synchronous=NORMAL
+в режиме WAL безопасен при падении процесса и убирает fsync на каждый коммит,
+а BEGIN IMMEDIATE сразу берёт блокировку записи и не даёт двум транзакциям
+упереться друг в друга при повышении блокировки. Pragmas выполняются на каждом
+новом соединении, сами соединения переиспользуются (CONN_MAX_AGE).
+"""
+
+BUSY_TIMEOUT = 20
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': BUSY_TIMEOUT * 1000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def pragma_statements(pragmas):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+def sqlite_database(name, pragmas=None, conn_max_age=600, **overrides):
+    """Словарь для settings.DATABASES с включёнными pragmas.
+
+    pragmas дополняет или переопределяет SQLITE_PRAGMAS; остальные ключи
+    DATABASES можно передать через overrides.
+    """
+    pragmas = {**SQLITE_PRAGMAS, **(pragmas or {})}
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': '; '.join(pragma_statements(pragmas)),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': BUSY_TIMEOUT,
+        },
+    }
+    config.update(overrides)
+    return config
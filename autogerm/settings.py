@@ -10,8 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
+import os
+import sys
 from pathlib import Path
 
+from autogerm.database import sqlite_database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,8 +46,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'main.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'main.middleware.SessionRefreshMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -52,18 +60,26 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'autogerm.urls'
 
+# В продакшене шаблоны компилируются один раз на процесс (cached.Loader), при
+# DEBUG читаются с диска при каждом рендеринге, чтобы правки были видны сразу.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'main.template_backends.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'main/templates']
         ,
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'main.context_processors.cart_summary',
             ],
+            'loaders': TEMPLATE_LOADERS if DEBUG else [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
         },
     },
 ]
@@ -74,11 +90,143 @@ WSGI_APPLICATION = 'autogerm.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# WAL, pragmas и постоянные соединения описаны в autogerm/database.py;
+# сравнить с настройками по умолчанию: python manage.py bench_sqlite
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+    'default': sqlite_database(BASE_DIR / 'db.sqlite3'),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# AUTOGERM_CACHE: locmem (по умолчанию), file или redis. Если задан REDIS_URL
+# и установлен пакет redis, Redis включается автоматически. Для нескольких
+# процессов лучше общий кеш (file или redis): с locmem каждый процесс
+# заполняет свой. Версии каталога, от которых зависят ключи кеша и ETag,
+# хранятся в базе (main.caching), поэтому изменения из run_jobs и команд
+# импорта видны сайту при любом кеше — не позже чем через CACHE_VERSION_TTL
+# секунд.
+REDIS_URL = os.environ.get('REDIS_URL', '')
+CACHE_BACKEND = os.environ.get(
+    'AUTOGERM_CACHE',
+    'redis' if REDIS_URL and importlib.util.find_spec('redis') else 'locmem',
+)
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL or 'redis://127.0.0.1:6379/1',
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('AUTOGERM_CACHE_DIR', BASE_DIR / '.cache'),
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        }
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'autogerm',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+
+PAGE_CACHE_TIMEOUT = 60 * 5
+CACHE_VERSION_TTL = 1.0
+
+
+# Sessions
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/
+
+# AUTOGERM_SESSIONS: db, cached_db или signed_cookies. По умолчанию cached_db,
+# если кеш общий для процессов (file или redis): сессия читается из кеша, а не
+# из базы на каждый запрос. С locmem — db, иначе другой процесс прочитал бы
+# из своего кеша устаревшую сессию. signed_cookies хранит сессию (корзину
+# гостя, сообщения) в подписанной cookie без обращений к базе и кешу; данные
+# видны клиенту, а выход не отзывает ранее выданные cookie.
+SESSION_BACKEND = os.environ.get('AUTOGERM_SESSIONS', 'db' if CACHE_BACKEND == 'locmem' else 'cached_db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_BACKEND]
+
+# Сессия пишется только при изменении; срок продлевается не чаще раза в
+# SESSION_REFRESH_INTERVAL (main.middleware.SessionRefreshMiddleware),
+# last_login — не чаще раза в LAST_LOGIN_UPDATE_INTERVAL (main.signals).
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_INTERVAL = 60 * 60
+LAST_LOGIN_UPDATE_INTERVAL = 60 * 60
+
+
+# Удалённые автомобили переносятся в ArchivedCar командой manage.py archive_cars
+# через CAR_ARCHIVE_AFTER_DAYS дней после пометки (main.archive).
+CAR_ARCHIVE_AFTER_DAYS = 90
+
+
+# Background jobs (main.jobs, worker: manage.py run_jobs)
+
+# Упавшее задание повторяется через JOB_RETRY_DELAY секунд, задержка
+# удваивается с каждой попыткой до JOB_RETRY_MAX_DELAY; после
+# JOB_MAX_ATTEMPTS попыток задание остаётся в статусе «Ошибка». Задание,
+# которое выполняется дольше JOB_LOCK_TIMEOUT, считается брошенным
+# (обработчик убит) и возвращается в очередь. JOBS_RUN_INLINE=1 выполняет
+# задания сразу в процессе сайта — для разработки без run_jobs.
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_RETRY_MAX_DELAY = 60 * 60
+JOB_LOCK_TIMEOUT = 60 * 15
+JOB_POLL_INTERVAL = 1.0
+JOB_KEEP_DONE = 60 * 60 * 24 * 7
+JOB_WORKER_PROCESSES = int(os.environ.get('JOB_WORKER_PROCESSES', 1))
+JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 2))
+JOBS_RUN_INLINE = os.environ.get('JOBS_RUN_INLINE') == '1'
+JOB_LOG_LEVEL = os.environ.get('JOB_LOG_LEVEL', 'CRITICAL' if 'test' in sys.argv[1:2] else 'INFO')
+
+
+# Performance instrumentation (main.middleware.PerformanceMiddleware)
+# Metrics: /manage/metrics/ (staff session or "Authorization: Bearer <METRICS_TOKEN>")
+
+PERF_SLOW_REQUEST_MS = int(os.environ.get('PERF_SLOW_REQUEST_MS', 500))
+PERF_LOG_LEVEL = os.environ.get('PERF_LOG_LEVEL', 'ERROR' if 'test' in sys.argv[1:2] else 'INFO')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+        'jobs': {'format': '%(asctime)s %(levelname)s [%(threadName)s] %(message)s'},
+    },
+    'handlers': {
+        'performance': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+        'jobs': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'jobs',
+        },
+    },
+    'loggers': {
+        'main.performance': {
+            'handlers': ['performance'],
+            'level': PERF_LOG_LEVEL,
+            'propagate': False,
+        },
+        'main.jobs': {
+            'handlers': ['jobs'],
+            'level': JOB_LOG_LEVEL,
+            'propagate': False,
+        },
+    },
 }
 
 
@@ -123,10 +271,24 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'main.User'
-import os
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# В продакшене collectstatic добавляет к именам хеш содержимого и пишет
+# сжатые копии .gz/.br (main.staticfiles). STATIC_ROOT и MEDIA_ROOT отдаёт
+# main.middleware.StaticFilesMiddleware: файлы с хешем в имени кешируются
+# навсегда (immutable), остальные — на *_MAX_AGE секунд с проверкой по ETag.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': ('django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+                    else 'main.staticfiles.CompressedManifestStaticFilesStorage'),
+    },
+}
+STATIC_MAX_AGE = 60 * 10
+MEDIA_MAX_AGE = 60 * 60
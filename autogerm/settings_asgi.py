@@ -0,0 +1,16 @@
+"""
+ASGI-профиль: страницы чтения обслуживают async-view из main.async_views.
+
+Запуск, например: uvicorn autogerm.asgi:application --workers 4
+(autogerm/asgi.py по умолчанию использует этот модуль настроек).
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+ROOT_URLCONF = 'autogerm.urls_asgi'
+
+# Под ASGI синхронный код каждого запроса выполняется в отдельном потоке, поэтому
+# постоянное соединение не переиспользуется следующим запросом, а только висит
+# открытым. Соединение закрывается в конце запроса.
+DATABASES = {**DATABASES, 'default': {**DATABASES['default'], 'CONN_MAX_AGE': 0}}
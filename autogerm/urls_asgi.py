@@ -0,0 +1,13 @@
+"""URL-конфигурация ASGI-профиля: каталог, автомобиль, корзина и профиль — async-view."""
+from django.urls import path
+
+from main import async_views
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('catalog/', async_views.catalog, name='catalog'),
+    path('car/<int:car_id>/', async_views.car_detail, name='car_detail'),
+    path('cart/', async_views.cart, name='cart'),
+    path('profile/', async_views.profile, name='profile'),
+] + wsgi_urlpatterns
@@ -0,0 +1,99 @@
+"""JSON-API каталога для бесконечной прокрутки.
+
+GET /api/catalog/ принимает те же фильтры и сортировку, что страница
+каталога, а также fields — список полей через запятую и cursor следующей
+страницы. Строки берутся из карточек CarListing, как и в HTML-каталоге,
+поэтому курсоры страницы и API взаимозаменяемы.
+
+Ответ зависит только от строки запроса и версии каталога, которая растёт
+при любом изменении автомобиля (bump_version('catalog')). Версия хранится в
+базе и общая для всех процессов — сайта, run_jobs, команд импорта и
+rebuild_listings, — а процесс запоминает её на CACHE_VERSION_TTL секунд.
+Поэтому сильный ETag обычно считается без обращения к базе, повторный
+запрос с If-None-Match получает 304 до SELECT, а устаревший ETag живёт не
+дольше CACHE_VERSION_TTL.
+"""
+import hashlib
+
+from django.urls import reverse
+
+from .caching import get_version
+from .catalog import PAGE_SIZE, filter_cars, get_ordering
+from .models import CarListing
+from .pagination import decode_cursor, keyset_paginate
+
+
+# Поле API -> поле CarListing; url собирается из id.
+API_FIELDS = {
+    'id': 'id',
+    'url': 'id',
+    'title': 'title',
+    'price': 'price',
+    'price_display': 'price_display',
+    'power': 'power',
+    'mileage': 'mileage',
+    'mileage_display': 'mileage_display',
+    'transmission': 'transmission',
+    'transmission_display': 'transmission_display',
+    'fuel_type': 'fuel_type',
+    'drive': 'drive',
+    'color': 'color',
+    'photo_src': 'photo_src',
+    'photo_jpeg_srcset': 'photo_jpeg_srcset',
+    'photo_webp_srcset': 'photo_webp_srcset',
+}
+
+# Поля карточки каталога (main/includes/car_card.html).
+DEFAULT_FIELDS = (
+    'id', 'url', 'title', 'price_display', 'power', 'mileage_display', 'transmission_display',
+    'photo_src', 'photo_jpeg_srcset', 'photo_webp_srcset',
+)
+
+
+class InvalidFields(Exception):
+    pass
+
+
+def parse_fields(raw):
+    """Список полей из параметра fields; пустой — DEFAULT_FIELDS."""
+    fields = list(dict.fromkeys(name.strip() for name in (raw or '').split(',') if name.strip()))
+    unknown = [name for name in fields if name not in API_FIELDS]
+    if unknown:
+        raise InvalidFields(unknown)
+    return fields or list(DEFAULT_FIELDS)
+
+
+def catalog_etag(request):
+    """Сильный ETag ответа: версия каталога и полный путь запроса."""
+    digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'"{get_version("catalog")}-{digest}"'
+
+
+def check_cursor(filters, cursor):
+    """Проверяет подпись курсора без запроса к базе; InvalidCursor, если он не от этой сортировки."""
+    if cursor:
+        decode_cursor(cursor, get_ordering(filters.get('sort')))
+
+
+def _serialize(row, fields):
+    item = {}
+    for name in fields:
+        if name == 'url':
+            item[name] = reverse('car_detail', args=[row['id']])
+        elif name == 'price':
+            item[name] = str(row['price'])
+        else:
+            item[name] = row[API_FIELDS[name]]
+    return item
+
+
+def catalog_api_page(filters, fields, cursor=None, per_page=PAGE_SIZE):
+    """Страница каталога: словари с полями fields и KeysetPage для курсора следующей.
+
+    Из базы читаются только нужные колонки и ключи сортировки для курсора.
+    """
+    ordering = get_ordering(filters.get('sort'))
+    columns = {API_FIELDS[name] for name in fields} | {name.lstrip('-') for name in ordering}
+    queryset = filter_cars(CarListing.objects.values(*columns), filters)
+    page = keyset_paginate(queryset, ordering, cursor, per_page)
+    return [_serialize(row, fields) for row in page.items], page
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+
+    def ready(self):
+        from django.contrib.auth.signals import user_logged_in
+
+        # Стандартный обработчик пишет last_login при каждом входе; main.signals
+        # подключает вместо него вариант с интервалом под тем же dispatch_uid.
+        user_logged_in.disconnect(dispatch_uid='update_last_login')
+        from . import signals, tasks  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""Перенос давно удалённых автомобилей из Car в ArchivedCar.
+
+car_delete только помечает автомобиль удалённым: его можно восстановить, а
+заказы по-прежнему на него ссылаются. Через CAR_ARCHIVE_AFTER_DAYS дней
+после пометки строка переносится в архив (manage.py archive_cars), и
+рабочая таблица со своими индексами остаётся размером с живой каталог.
+
+Пачка переносится в одной транзакции: копия в ArchivedCar, позиции заказов
+переключаются на архив (OrderItem.archived_car), строки корзин удаляются
+вместе с автомобилем. Фото остаётся в хранилище: его показывает история
+заказов.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cart import invalidate_cart_summaries
+from .models import ArchivedCar, Car, CartItem, OrderItem
+
+
+ARCHIVE_BATCH_SIZE = 500
+
+ARCHIVED_FIELDS = (
+    'id', 'stock_id', 'price', 'power', 'mileage', 'transmission', 'color', 'drive', 'fuel_type',
+    'configuration', 'configuration_desc', 'deleted_at',
+)
+
+
+def archive_candidates(days=None):
+    """Удалённые автомобили, помеченные раньше чем days (по умолчанию CAR_ARCHIVE_AFTER_DAYS) дней назад."""
+    days = settings.CAR_ARCHIVE_AFTER_DAYS if days is None else days
+    border = timezone.now() - timedelta(days=days)
+    return Car.all_objects.filter(is_deleted=True, deleted_at__lt=border)
+
+
+def _archive_batch(ids):
+    with transaction.atomic():
+        # Автомобиль могли восстановить, пока шла выборка: переносим только всё ещё удалённые.
+        cars = list(Car.all_objects.select_for_update().filter(id__in=ids, is_deleted=True))
+        ids = [car.id for car in cars]
+        if not ids:
+            return 0
+        ArchivedCar.objects.bulk_create([
+            ArchivedCar(photo=car.photo.name, **{name: getattr(car, name) for name in ARCHIVED_FIELDS})
+            for car in cars
+        ])
+        OrderItem.objects.filter(car_id__in=ids).update(archived_car_id=F('car_id'), car=None)
+        users = set(CartItem.objects.filter(car_id__in=ids).values_list('user_id', flat=True))
+        Car.all_objects.filter(id__in=ids).delete()
+        transaction.on_commit(lambda: invalidate_cart_summaries(users))
+    return len(ids)
+
+
+def archive_deleted_cars(days=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """Переносит в архив все подходящие автомобили пачками; возвращает их число."""
+    archived = 0
+    while True:
+        ids = list(archive_candidates(days).order_by('deleted_at', 'id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return archived
+        archived += _archive_batch(ids)
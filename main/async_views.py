@@ -0,0 +1,129 @@
+"""Асинхронные версии страниц каталога, автомобиля, корзины и профиля.
+
+Подключаются в ASGI-профиле (autogerm/settings_asgi.py, autogerm/urls_asgi.py),
+под WSGI по-прежнему работают синхронные view из main.views. Все данные для
+шаблона загружаются через async ORM до рендеринга: ленивый запрос из шаблона
+в async-контексте закончился бы SynchronousOnlyOperation.
+"""
+from functools import wraps
+
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import aget_object_or_404, redirect, render
+
+from .caching import anonymous_page_cache
+from .cart import SessionCart, acart_totals, aget_cart_summary, session_cart_totals, store_cart_summary
+from .catalog import acatalog_page, next_page_query
+from .facets import acatalog_facets, range_links
+from .forms import CatalogFilterForm
+from .models import Car, CartItem, Order
+from .orders import aorder_history_page
+from .pagination import InvalidCursor
+
+
+def with_user(view):
+    """Загружает пользователя через request.auser() и кладёт его в request.user.
+
+    Синхронный request.user ходит в базу сессий и в async-view недоступен,
+    а к нему обращаются кеш страниц, контекст-процессоры и шаблоны.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.user = await request.auser()
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def login_required(view):
+    """login_required без перехода в пул потоков: пользователь уже загружен with_user."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def base_context(request):
+    """Данные base.html, которые контекст-процессор cart_summary загрузил бы синхронно."""
+    if request.user.is_authenticated:
+        return {'cart_summary': await aget_cart_summary(request.user)}
+    # Сессия уже загружена request.auser(), чтение из неё не ходит в базу.
+    return {'cart_summary': {'count': SessionCart(request.session).count()}}
+
+
+@with_user
+@anonymous_page_cache('catalog', lambda request: ['catalog'])
+async def catalog(request):
+    form = CatalogFilterForm(request.GET)
+    form.is_valid()
+    filters = form.cleaned_data
+    try:
+        page = await acatalog_page(filters, request.GET.get('cursor'))
+    except InvalidCursor:
+        page = await acatalog_page(filters)
+    facets = await acatalog_facets(filters)
+    form.show_facets(facets)
+    return render(request, 'main/catalog.html', {
+        **await base_context(request),
+        'cars': page.items,
+        'form': form,
+        'facets': facets,
+        'range_links': range_links(request.GET, facets),
+        'next_query': next_page_query(request.GET, page),
+    })
+
+
+@with_user
+@anonymous_page_cache('car_detail', lambda request, car_id: [f'car:{car_id}'])
+async def car_detail(request, car_id):
+    car = await aget_object_or_404(Car, id=car_id)
+    return render(request, 'main/car_detail.html', {**await base_context(request), 'car': car})
+
+
+@with_user
+async def cart(request):
+    if not request.user.is_authenticated:
+        items = await SessionCart(request.session).aitems()
+        summary = session_cart_totals(items)
+        return render(request, 'main/cart.html', {
+            'cart_summary': summary,
+            'items': items,
+            'total_price': summary['total'],
+        })
+    items = CartItem.objects.filter(user=request.user)
+    summary = await acart_totals(items)
+    store_cart_summary(request.user, summary)
+    return render(request, 'main/cart.html', {
+        'cart_summary': summary,
+        'items': [item async for item in items.select_related('car').order_by('id')],
+        'total_price': summary['total'],
+    })
+
+
+@with_user
+@login_required
+async def profile(request):
+    user = request.user
+    if request.method == 'POST':
+        address = request.POST.get('address')
+        if address:
+            user.address = address
+            await user.asave()
+            messages.success(request, 'Адрес обновлен')
+        return redirect('profile')
+    status = request.GET.get('status')
+    if status not in dict(Order.STATUS_CHOICES):
+        status = None
+    try:
+        page = await aorder_history_page(user, status, request.GET.get('cursor'))
+    except InvalidCursor:
+        page = await aorder_history_page(user, status)
+    return render(request, 'main/profile.html', {
+        **await base_context(request),
+        'user': user,
+        'orders': page.items,
+        'status': status,
+        'status_choices': Order.STATUS_CHOICES,
+        'next_query': next_page_query(request.GET, page),
+    })
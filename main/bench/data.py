@@ -0,0 +1,154 @@
+"""Генератор синтетических данных для бенчмарков: пользователи, автомобили, заказы.
+
+Все строки вставляются через bulk_create, поэтому сигналы Car не срабатывают —
+после генерации generate() сам перестраивает производные структуры
+(поисковый индекс, карточки каталога, счётчики статусов заказов, версии кеша).
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from main.caching import bump_version
+from main.listings import build_listing, rebuild_listings
+from main.models import Car, CarListing, Order, OrderItem, User
+from main.orders import recount_order_statuses
+from main.search import get_search_backend
+
+
+BENCH_PASSWORD = 'bench-password-1'
+
+MODELS = [
+    ('BMW', ['320i', '520d', 'X3 xDrive20d', 'X5 xDrive30d', 'M3 Competition', 'i4 eDrive40']),
+    ('Mercedes-Benz', ['C 200', 'E 220 d', 'GLC 300', 'GLE 350 d', 'S 500', 'EQE 350']),
+    ('Audi', ['A4 40 TFSI', 'A6 45 TDI', 'Q5 40 TDI', 'Q7 55 TFSI', 'RS 6 Avant', 'e-tron GT']),
+    ('Volkswagen', ['Golf 1.4 TSI', 'Passat 2.0 TDI', 'Tiguan 2.0 TSI', 'Touareg 3.0 TDI', 'ID.4 Pro']),
+    ('Porsche', ['Macan S', 'Cayenne', 'Panamera 4', '911 Carrera', 'Taycan 4S']),
+    ('Opel', ['Astra 1.2', 'Insignia 2.0 CDTI', 'Grandland Hybrid']),
+]
+
+DESCRIPTIONS = [
+    'Один владелец, полная история обслуживания у официального дилера.',
+    'Полноприводный автомобиль в отличном состоянии, зимняя резина в комплекте.',
+    'Дизельный двигатель с низким расходом, кожаный салон, панорамная крыша.',
+    'Гибридная установка, адаптивный круиз-контроль, камера кругового обзора.',
+    'Спортивный пакет, усиленные тормоза, карбоновые вставки в салоне.',
+    'Электромобиль с быстрой зарядкой и запасом хода более 400 км.',
+]
+
+# Доли значений примерно как в объявлениях о продаже подержанных авто из Германии.
+TRANSMISSIONS = [('auto', 60), ('manual', 25), ('robot', 15)]
+FUELS = [('petrol', 50), ('diesel', 30), ('hybrid', 12), ('electric', 8)]
+DRIVES = [('full', 45), ('rear', 30), ('front', 25)]
+COLORS = [('Черный', 30), ('Белый', 22), ('Серый', 20), ('Синий', 12), ('Красный', 8), ('Зеленый', 8)]
+STATUSES = [('created', 15), ('processed', 15), ('in_process', 20), ('in_delivery', 15),
+            ('delivered', 15), ('completed', 20)]
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def make_car(rng):
+    brand, models = rng.choice(MODELS)
+    fuel = _weighted(rng, FUELS)
+    power = int(rng.triangular(90, 650, 190))
+    age = rng.randint(0, 12)
+    price = Decimal(int(rng.lognormvariate(15.2, 0.55) * (1.15 ** -age) + power * 9000)).quantize(Decimal('1000'))
+    deleted = rng.random() < 0.03
+    return Car(
+        photo='cars/bench.jpg',
+        price=min(price, Decimal('99999999')),
+        power=power,
+        mileage=max(0, int(rng.gauss(age * 17000, 12000))),
+        transmission='auto' if fuel == 'electric' else _weighted(rng, TRANSMISSIONS),
+        color=_weighted(rng, COLORS),
+        drive=_weighted(rng, DRIVES),
+        fuel_type=fuel,
+        configuration=f'{brand} {rng.choice(models)}',
+        configuration_desc=rng.choice(DESCRIPTIONS),
+        is_deleted=deleted,
+        deleted_at=timezone.now() if deleted else None,
+    )
+
+
+def generate(users=100, cars=1000, orders=500, seed=42, batch_size=2000, stdout=None):
+    """Заполняет текущую базу синтетическими данными и возвращает сводку.
+
+    Пароль всех пользователей — BENCH_PASSWORD; первый из них суперпользователь.
+    """
+    rng = random.Random(seed)
+    password = make_password(BENCH_PASSWORD)
+    first_id = (User.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+
+    User.objects.bulk_create([
+        User(
+            phone=f'+7900{first_id + i:07d}',
+            password=password,
+            first_name=f'Пользователь {first_id + i}',
+            last_name='Тестовый',
+            address='Москва, ул. Тестовая, 1' if rng.random() < 0.9 else '',
+            is_staff=i == 0,
+            is_superuser=i == 0,
+        )
+        for i in range(users)
+    ], batch_size=batch_size)
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+
+    for start in range(0, cars, batch_size):
+        Car.all_objects.bulk_create([make_car(rng) for _ in range(min(batch_size, cars - start))])
+    car_prices = dict(Car.all_objects.values_list('id', 'price'))
+    car_ids = list(car_prices)
+
+    now = timezone.now()
+    created = 0
+    while created < orders and user_ids and car_ids:
+        count = min(batch_size, orders - created)
+        batch = Order.objects.bulk_create([
+            Order(
+                user_id=rng.choice(user_ids),
+                status=_weighted(rng, STATUSES),
+                address='Москва, ул. Тестовая, 1',
+            )
+            for _ in range(count)
+        ])
+        items = []
+        for order in batch:
+            for car_id in rng.sample(car_ids, min(len(car_ids), rng.choice((1, 1, 1, 2, 3)))):
+                items.append(OrderItem(order=order, car_id=car_id, quantity=rng.choice((1, 1, 2)),
+                                       price=car_prices[car_id]))
+        OrderItem.objects.bulk_create(items, batch_size=batch_size)
+        # auto_now_add не даёт задать дату в bulk_create, поэтому разносим заказы по году отдельно.
+        for order in batch:
+            order.created_at = now - timezone.timedelta(minutes=rng.randint(0, 525600))
+        Order.objects.bulk_update(batch, ['created_at'], batch_size=batch_size)
+        created += count
+
+    get_search_backend().rebuild()
+    rebuild_listings()
+    recount_order_statuses()
+    bump_version('catalog')
+    summary = {'users': len(user_ids), 'cars': len(car_ids), 'orders': Order.objects.count()}
+    if stdout:
+        stdout.write(f'Сгенерировано: {summary}')
+    return summary
+
+
+def generate_listings(count, seed=42, batch_size=5000):
+    """Добавляет count карточек CarListing без автомобилей — для бенчмарков каталога на миллионах строк.
+
+    Значения те же, что у make_car; id продолжают наибольший существующий.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    next_id = (CarListing.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+    for start in range(0, count, batch_size):
+        batch = []
+        for offset in range(min(batch_size, count - start)):
+            car = make_car(rng)
+            car.id, car.updated_at = next_id + start + offset, now
+            batch.append(build_listing(car))
+        CarListing.objects.bulk_create(batch)
+    bump_version('catalog')
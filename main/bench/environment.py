@@ -0,0 +1,44 @@
+"""Окружение бенчмарков: временная база и кеш, чтобы не трогать рабочие данные."""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+
+
+def bench_settings():
+    """Настройки как в продакшене: без DEBUG (он копит connection.queries) и с локальными хостами."""
+    return override_settings(
+        DEBUG=False,
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver', '127.0.0.1', 'localhost'],
+    )
+
+
+def isolated_caches():
+    # Отдельный префикс, чтобы страницы временной базы не смешались с рабочим кешем.
+    prefix = f'bench-{os.getpid()}'
+    return {alias: {**config, 'KEY_PREFIX': prefix} for alias, config in settings.CACHES.items()}
+
+
+@contextmanager
+def temporary_database():
+    """Создаёт пустую базу со всеми миграциями и удаляет её на выходе."""
+    directory = tempfile.mkdtemp(prefix='autogerm-bench-')
+    old_name = connection.settings_dict['NAME']
+    if connection.vendor == 'sqlite':
+        # Файл, а не память: так в бенчмарке работают WAL и настройки из autogerm/database.py.
+        connection.settings_dict['TEST'] = {
+            **connection.settings_dict.get('TEST', {}), 'NAME': os.path.join(directory, 'bench.sqlite3'),
+        }
+    try:
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(CACHES=isolated_caches()):
+                yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
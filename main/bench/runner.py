@@ -0,0 +1,305 @@
+"""Нагрузочный прогон сценариев витрины и сравнение результатов с базовым прогоном.
+
+Транспорты:
+  client — django.test.Client, запрос проходит через WSGIHandler в том же процессе;
+  asgi   — django.test.AsyncClient, запрос проходит через ASGIHandler;
+  wsgi   — настоящий HTTP-сервер (ThreadedWSGIServer, как у runserver) на 127.0.0.1;
+  url    — внешний сервер (gunicorn, uvicorn и т. п.), работающий с той же базой.
+"""
+import asyncio
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.utils.crypto import get_random_string
+
+from main.models import Car, CartItem, User
+
+
+TRANSPORTS = ('client', 'asgi', 'wsgi', 'url')
+
+CATALOG_QUERIES = (
+    '',
+    '?sort=price_asc',
+    '?sort=power_desc&fuel_type=diesel',
+    '?transmission=auto&drive=full',
+    '?price_max=5000000&sort=mileage_asc',
+)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    method: str
+    role: str  # anonymous, customer или admin
+    path: Callable
+    expected: int = 200
+    prepare: Optional[Callable] = None
+
+
+def _fill_cart(fixture, user, rng):
+    CartItem.objects.get_or_create(user=user, car_id=rng.choice(fixture.car_ids))
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario('catalog', 'GET', 'anonymous', lambda f, rng: '/catalog/' + rng.choice(CATALOG_QUERIES)),
+        Scenario('catalog_customer', 'GET', 'customer', lambda f, rng: '/catalog/' + rng.choice(CATALOG_QUERIES)),
+        Scenario('car_detail', 'GET', 'anonymous', lambda f, rng: f'/car/{rng.choice(f.car_ids)}/'),
+        Scenario('add_to_cart', 'POST', 'customer', lambda f, rng: f'/add_to_cart/{rng.choice(f.car_ids)}/',
+                 expected=302),
+        Scenario('cart', 'GET', 'customer', lambda f, rng: '/cart/'),
+        Scenario('place_order', 'POST', 'customer', lambda f, rng: '/place_order/', expected=302,
+                 prepare=_fill_cart),
+        Scenario('profile', 'GET', 'customer', lambda f, rng: '/profile/'),
+        Scenario('admin_page', 'GET', 'admin', lambda f, rng: '/admin_page/'),
+    )
+}
+
+
+class BenchFixture:
+    """Идентификаторы из базы, по которым сценарии выбирают автомобили и пользователей."""
+
+    def __init__(self):
+        self.car_ids = list(Car.objects.order_by('id').values_list('id', flat=True))
+        self.customers = list(User.objects.filter(is_superuser=False).exclude(address='').order_by('id')[:500])
+        self.admin = User.objects.filter(is_superuser=True).order_by('id').first()
+        if not self.car_ids or not self.customers or self.admin is None:
+            raise ValueError('В базе нет данных для бенчмарка: нужны автомобили, покупатели и администратор.')
+
+    def user_for(self, role, index):
+        if role == 'customer':
+            return self.customers[index % len(self.customers)]
+        if role == 'admin':
+            return self.admin
+        return None
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class HttpSession:
+    """Сессия для реального HTTP: cookie сессии берётся из force_login, CSRF — двойной cookie."""
+
+    def __init__(self, base_url, user):
+        self.base_url = base_url.rstrip('/')
+        self.csrf_token = get_random_string(32)
+        cookies = {settings.CSRF_COOKIE_NAME: self.csrf_token}
+        if user is not None:
+            client = Client()
+            client.force_login(user)
+            cookies[settings.SESSION_COOKIE_NAME] = client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.headers = {
+            'Cookie': '; '.join(f'{name}={value}' for name, value in cookies.items()),
+            'X-CSRFToken': self.csrf_token,
+        }
+        self.opener = urllib.request.build_opener(_NoRedirect)
+
+    def request(self, method, path):
+        request = urllib.request.Request(
+            self.base_url + path, data=b'' if method == 'POST' else None, method=method, headers=self.headers)
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code
+
+
+class ClientSession:
+    def __init__(self, user):
+        self.client = Client()
+        if user is not None:
+            self.client.force_login(user)
+
+    def request(self, method, path):
+        return self.client.generic(method, path).status_code
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalServer:
+    """Многопоточный WSGI-сервер Django в фоновом потоке, как у runserver."""
+
+    def __init__(self):
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0), _QuietHandler)
+        self.server.set_app(WSGIHandler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p90_ms': percentile(latencies, 0.9) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': max(latencies, default=0.0) * 1000,
+    }
+
+
+def _run_threaded(make_session, fixture, scenario, requests, concurrency, warmup, seed):
+    latencies, errors, started = [], [0], []
+    remaining = [requests]
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency, action=lambda: started.append(time.perf_counter()))
+    failures = []
+
+    def worker(index):
+        try:
+            rng = random.Random(seed * 1000 + index)
+            user = fixture.user_for(scenario.role, index)
+            session = make_session(user)
+
+            def call():
+                if scenario.prepare:
+                    scenario.prepare(fixture, user, rng)
+                path = scenario.path(fixture, rng)
+                begin = time.perf_counter()
+                status = session.request(scenario.method, path)
+                return time.perf_counter() - begin, status != scenario.expected
+
+            for _ in range(warmup):
+                call()
+            barrier.wait()
+            local, failed = [], 0
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+                duration, error = call()
+                local.append(duration)
+                failed += error
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+        except Exception as exc:
+            failures.append(exc)
+            barrier.abort()
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if failures:
+        raise failures[0]
+    return summarize(latencies, errors[0], time.perf_counter() - started[0])
+
+
+def _run_async(fixture, scenario, requests, concurrency, warmup, seed):
+    clients = []
+    for index in range(concurrency):
+        client, user = AsyncClient(), fixture.user_for(scenario.role, index)
+        if user is not None:
+            client.force_login(user)
+        clients.append((client, user, random.Random(seed * 1000 + index)))
+    prepare = sync_to_async(scenario.prepare) if scenario.prepare else None
+
+    async def call(client, user, rng):
+        if prepare:
+            await prepare(fixture, user, rng)
+        path = scenario.path(fixture, rng)
+        begin = time.perf_counter()
+        response = await client.generic(scenario.method, path)
+        return time.perf_counter() - begin, response.status_code != scenario.expected
+
+    async def main():
+        for client, user, rng in clients:
+            for _ in range(warmup):
+                await call(client, user, rng)
+        latencies, errors, remaining = [], 0, requests
+
+        async def worker(client, user, rng):
+            nonlocal errors, remaining
+            while remaining > 0:
+                remaining -= 1
+                duration, error = await call(client, user, rng)
+                latencies.append(duration)
+                errors += error
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(*item) for item in clients))
+        return summarize(latencies, errors, time.perf_counter() - started)
+
+    return asyncio.run(main())
+
+
+def run_scenario(fixture, scenario, transport='client', requests=100, concurrency=1, warmup=5, seed=42,
+                 base_url=None):
+    if transport == 'asgi':
+        return _run_async(fixture, scenario, requests, concurrency, warmup, seed)
+    if transport == 'client':
+        make_session = ClientSession
+    else:
+        def make_session(user):
+            return HttpSession(base_url, user)
+    return _run_threaded(make_session, fixture, scenario, requests, concurrency, warmup, seed)
+
+
+def compare_results(baseline, current, threshold=1.25, min_delta_ms=1.0):
+    """Список регрессий текущего прогона относительно базового.
+
+    Задержка считается регрессией, если выросла больше чем в threshold раз
+    и при этом хотя бы на min_delta_ms (чтобы не реагировать на шум
+    субмиллисекундных запросов); пропускная способность — если упала больше
+    чем в threshold раз; ошибки — если их стало больше.
+    """
+    regressions = []
+    for name, base in baseline.get('scenarios', {}).items():
+        cur = current.get('scenarios', {}).get(name)
+        if cur is None:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if cur[metric] > base[metric] * threshold and cur[metric] - base[metric] >= min_delta_ms:
+                regressions.append(f'{name}: {metric} {base[metric]:.2f} -> {cur[metric]:.2f}')
+        if cur['throughput_rps'] * threshold < base['throughput_rps']:
+            regressions.append(
+                f'{name}: throughput_rps {base["throughput_rps"]:.1f} -> {cur["throughput_rps"]:.1f}')
+        if cur['errors'] > base['errors']:
+            regressions.append(f'{name}: errors {base["errors"]} -> {cur["errors"]}')
+    return regressions
@@ -0,0 +1,202 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from .cart import SESSION_CART_KEY
+from .models import CacheVersion
+
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 5)
+VERSION_MEMO_SIZE = 10000
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+# Прочитанные из базы версии: name -> (значение, момент устаревания).
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def record(name, outcome):
+    with _stats_lock:
+        _stats[(name, outcome)] += 1
+
+
+def cache_stats():
+    """Снимок счётчиков попаданий и промахов кеша в этом процессе."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _memoized(names):
+    now = time.monotonic()
+    found = {}
+    for name in names:
+        value, expires = _versions.get(name, (None, 0))
+        if expires > now:
+            found[name] = value
+    return found
+
+
+def _memoize(names, stored):
+    ttl = settings.CACHE_VERSION_TTL
+    expires = time.monotonic() + ttl
+    with _versions_lock:
+        if len(_versions) > VERSION_MEMO_SIZE:
+            _versions.clear()
+        for name in names:
+            if ttl:
+                _versions[name] = (stored.get(name, 0), expires)
+    return {name: stored.get(name, 0) for name in names}
+
+
+def get_versions(names):
+    """Текущие версии именованных наборов данных (каталог, конкретный автомобиль).
+
+    Версия входит в ключи кеша страниц и ETag, поэтому её увеличение разом
+    делает устаревшими все связанные записи. Версии лежат в базе
+    (CacheVersion) и видны всем процессам; прочитанное значение
+    запоминается в процессе на CACHE_VERSION_TTL секунд, поэтому чужое
+    изменение доходит до этого процесса не позже чем через столько же.
+    """
+    found = _memoized(names)
+    missing = [name for name in names if name not in found]
+    if missing:
+        stored = dict(CacheVersion.objects.filter(name__in=missing).values_list('name', 'value'))
+        found.update(_memoize(missing, stored))
+    return [found[name] for name in names]
+
+
+async def aget_versions(names):
+    """Асинхронный вариант get_versions для async-view."""
+    found = _memoized(names)
+    missing = [name for name in names if name not in found]
+    if missing:
+        stored = {name: value async for name, value in
+                  CacheVersion.objects.filter(name__in=missing).values_list('name', 'value')}
+        found.update(_memoize(missing, stored))
+    return [found[name] for name in names]
+
+
+def get_version(name):
+    return get_versions([name])[0]
+
+
+async def aget_version(name):
+    return (await aget_versions([name]))[0]
+
+
+def bump_version(*names):
+    """Увеличивает версии в текущей транзакции: читатели увидят новую вместе с изменёнными данными.
+
+    Новая версия начинается с текущего времени, чтобы не совпасть с
+    прежними ключами кеша после пересоздания базы.
+    """
+    if not names:
+        return
+    with _versions_lock:
+        for name in names:
+            _versions.pop(name, None)
+    quote = connection.ops.quote_name
+    table = quote(CacheVersion._meta.db_table)
+    name_column, value_column = (quote(CacheVersion._meta.get_field(field).column) for field in ('name', 'value'))
+    start = time.time_ns()
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} ({name_column}, {value_column}) VALUES (%s, %s) '
+            f'ON CONFLICT ({name_column}) DO UPDATE SET {value_column} = {table}.{value_column} + 1',
+            [(name, start) for name in dict.fromkeys(names)],
+        )
+
+
+def _has_pending_messages(request):
+    return 'messages' in request.COOKIES or '_messages' in getattr(request, 'session', {})
+
+
+def _has_session_cart(request):
+    return SESSION_CART_KEY in getattr(request, 'session', {})
+
+
+def _page_key(name, versions, request):
+    parts = [str(version) for version in versions]
+    parts.append(request.get_full_path())
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return f'page:{name}:{digest}'
+
+
+def _cached_page(name, key):
+    cached = cache.get(key)
+    if cached is None:
+        record(name, 'miss')
+        return None
+    record(name, 'hit')
+    content, content_type = cached
+    return HttpResponse(content, content_type=content_type)
+
+
+def _store_page(key, response, timeout):
+    if response.status_code == 200 and not response.cookies and not response.streaming:
+        cache.set(key, (response.content, response['Content-Type']), timeout)
+
+
+def anonymous_page_cache(name, versions, timeout=None):
+    """Кеширует ответ view целиком для анонимных GET-запросов.
+
+    versions(request, *args, **kwargs) возвращает имена версий, от которых
+    зависит страница; ключ кеша строится из них и полного пути запроса.
+    Авторизованные пользователи, гости с непустой корзиной и запросы с
+    непоказанными сообщениями всегда получают свежий ответ. Работает и с
+    async-view: для них request.user должен быть уже загружен (await
+    request.auser()).
+
+    Закешированная страница одна на всех гостей, поэтому CSRF-токен в неё
+    не попадает: формы гостя берут его из cookie csrftoken (см. base.html),
+    а cookie выставляется здесь, на каждом ответе гостю.
+    """
+    timeout = PAGE_CACHE_TIMEOUT if timeout is None else timeout
+
+    def bypass(request):
+        return (request.method not in ('GET', 'HEAD') or request.user.is_authenticated
+                or _has_pending_messages(request) or _has_session_cart(request))
+
+    def ensure_csrf_cookie(request):
+        if not request.user.is_authenticated:
+            get_token(request)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                ensure_csrf_cookie(request)
+                if bypass(request):
+                    return await view(request, *args, **kwargs)
+                key = _page_key(name, await aget_versions(versions(request, *args, **kwargs)), request)
+                response = _cached_page(name, key)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                    _store_page(key, response, timeout)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            ensure_csrf_cookie(request)
+            if bypass(request):
+                return view(request, *args, **kwargs)
+            key = _page_key(name, get_versions(versions(request, *args, **kwargs)), request)
+            response = _cached_page(name, key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                _store_page(key, response, timeout)
+            return response
+        return wrapper
+    return decorator
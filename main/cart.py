@@ -0,0 +1,246 @@
+from collections import namedtuple
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Car, CartItem
+
+
+CART_SUMMARY_TIMEOUT = 60 * 15
+
+SESSION_CART_KEY = 'cart'
+SESSION_CART_MAX_ITEMS = 50
+
+_money = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _summary_key(user_id):
+    return f'cart-summary:{user_id}'
+
+
+def _totals():
+    return {
+        'count': Coalesce(Sum('quantity'), 0),
+        'total': Coalesce(Sum(F('car__price') * F('quantity'), output_field=_money), Value(Decimal('0')),
+                          output_field=_money),
+    }
+
+
+def cart_totals(items):
+    """Количество и стоимость позиций корзины одним агрегирующим запросом."""
+    return items.aggregate(**_totals())
+
+
+def get_cart_summary(user):
+    """Сводка корзины для шапки сайта, закешированная на CART_SUMMARY_TIMEOUT.
+
+    Кеш сбрасывается при любом изменении корзины через invalidate_cart_summary.
+    Изменение цены автомобиля кеш не сбрасывает — сумма догонит её не позже
+    чем через CART_SUMMARY_TIMEOUT или при следующем открытии корзины.
+    """
+    key = _summary_key(user.pk)
+    summary = cache.get(key)
+    if summary is None:
+        summary = cart_totals(CartItem.objects.filter(user=user))
+        cache.set(key, summary, CART_SUMMARY_TIMEOUT)
+    return summary
+
+
+async def acart_totals(items):
+    return await items.aaggregate(**_totals())
+
+
+async def aget_cart_summary(user):
+    """Асинхронный get_cart_summary; обращение к кешу синхронное, оно не ходит в базу."""
+    key = _summary_key(user.pk)
+    summary = cache.get(key)
+    if summary is None:
+        summary = await acart_totals(CartItem.objects.filter(user=user))
+        cache.set(key, summary, CART_SUMMARY_TIMEOUT)
+    return summary
+
+
+def store_cart_summary(user, summary):
+    cache.set(_summary_key(user.pk), summary, CART_SUMMARY_TIMEOUT)
+
+
+def invalidate_cart_summary(user):
+    cache.delete(_summary_key(user.pk))
+
+
+def invalidate_cart_summaries(user_ids):
+    cache.delete_many([_summary_key(user_id) for user_id in user_ids])
+
+
+def add_car_to_cart(user, car_id):
+    """Добавляет автомобиль в корзину или увеличивает количество на 1.
+
+    Один запрос: INSERT ... SELECT из живых автомобилей с ON CONFLICT по
+    уникальному индексу (user, car) — как в _upsert_cart_items. Первое
+    добавление вставляет строку, повторное и параллельное атомарно
+    увеличивают quantity.
+    Возвращает False, если автомобиль не найден или удалён.
+    """
+    quote = connection.ops.quote_name
+    meta = CartItem._meta
+    table = quote(meta.db_table)
+    user_column, car_column, quantity = (quote(meta.get_field(name).column) for name in ('user', 'car', 'quantity'))
+    car_meta = Car._meta
+    sql = (
+        f'INSERT INTO {table} ({user_column}, {car_column}, {quantity}) '
+        f'SELECT %s, {quote(car_meta.pk.column)}, 1 FROM {quote(car_meta.db_table)} '
+        f'WHERE {quote(car_meta.pk.column)} = %s AND {quote(car_meta.get_field("is_deleted").column)} = %s '
+        f'ON CONFLICT ({user_column}, {car_column}) DO UPDATE SET {quantity} = {table}.{quantity} + 1'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user.pk, car_id, False])
+        return cursor.rowcount > 0
+
+
+def change_cart_item(user, item_id, action):
+    """Меняет позицию корзины одним запросом: add, remove или delete.
+
+    remove уменьшает количество, пока оно больше 1, а последнюю единицу
+    удаляет вместе с позицией. Возвращает выполненное действие ('delete',
+    если remove удалил последнюю единицу) или None, если позиции нет.
+    """
+    item = CartItem.objects.filter(id=item_id, user=user)
+    if action == 'add':
+        return action if item.update(quantity=F('quantity') + 1) else None
+    if action == 'remove':
+        while True:
+            if item.filter(quantity__gt=1).update(quantity=F('quantity') - 1):
+                return action
+            # Удаляем, только если единица всё ещё последняя: add, выполненный
+            # между двумя запросами, не должен пропасть вместе с позицией.
+            deleted, _ = item.filter(quantity__lte=1).delete()
+            if deleted:
+                return 'delete'
+            if not item.exists():
+                return None
+    if action == 'delete':
+        deleted, _ = item.delete()
+        return action if deleted else None
+    return None
+
+
+class SessionCartFull(Exception):
+    pass
+
+
+# id позиции гостевой корзины — id автомобиля: шаблон cart.html и
+# update_cart_quantity работают с ней так же, как с CartItem.
+SessionCartItem = namedtuple('SessionCartItem', 'id car quantity')
+
+
+class SessionCart:
+    """Корзина гостя в сессии: {"<id автомобиля>": количество}.
+
+    Операции те же, что у корзины в базе: add_car_to_cart и change_cart_item.
+    Изменение количества не обращается к базе — пишется только сессия.
+    Позиций не больше SESSION_CART_MAX_ITEMS, чтобы сессия оставалась
+    маленькой и в хранилище signed_cookies. При входе корзина переносится
+    в базу функцией merge_session_cart.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    @property
+    def lines(self):
+        return self.session.get(SESSION_CART_KEY, {})
+
+    def _save(self, lines):
+        if lines:
+            self.session[SESSION_CART_KEY] = lines
+        else:
+            self.session.pop(SESSION_CART_KEY, None)
+
+    def count(self):
+        return sum(self.lines.values())
+
+    def add(self, car_id):
+        """Возвращает False, если автомобиль не найден или удалён; SessionCartFull — нет места."""
+        lines = dict(self.lines)
+        key = str(car_id)
+        if key not in lines and len(lines) >= SESSION_CART_MAX_ITEMS:
+            raise SessionCartFull
+        if not Car.objects.filter(id=car_id).exists():
+            return False
+        lines[key] = lines.get(key, 0) + 1
+        self._save(lines)
+        return True
+
+    def change(self, car_id, action):
+        """add, remove или delete, как change_cart_item; None, если позиции нет."""
+        lines = dict(self.lines)
+        key = str(car_id)
+        if key not in lines or action not in ('add', 'remove', 'delete'):
+            return None
+        if action == 'add':
+            lines[key] += 1
+        elif action == 'remove' and lines[key] > 1:
+            lines[key] -= 1
+        else:
+            del lines[key]
+            action = 'delete'
+        self._save(lines)
+        return action
+
+    def _items(self, cars):
+        lines = self.lines
+        items = [SessionCartItem(int(key), cars[int(key)], quantity)
+                 for key, quantity in lines.items() if int(key) in cars]
+        if len(items) != len(lines):
+            # Удалённые автомобили пропадают из корзины гостя.
+            self._save({str(item.id): item.quantity for item in items})
+        return items
+
+    def items(self):
+        """Позиции в порядке добавления; автомобили загружаются одним запросом."""
+        return self._items(Car.objects.in_bulk([int(key) for key in self.lines]))
+
+    async def aitems(self):
+        ids = [int(key) for key in self.lines]
+        return self._items({car.id: car async for car in Car.objects.filter(id__in=ids)})
+
+
+def session_cart_totals(items):
+    return {
+        'count': sum(item.quantity for item in items),
+        'total': sum((item.car.price * item.quantity for item in items), Decimal('0')),
+    }
+
+
+def merge_session_cart(session, user):
+    """Переносит корзину гостя в корзину пользователя после входа.
+
+    Один SELECT отбрасывает удалённые автомобили, затем один INSERT ... ON
+    CONFLICT добавляет новые позиции и прибавляет количество к тем, что уже
+    были в корзине пользователя. Возвращает число перенесённых позиций.
+    """
+    lines = session.pop(SESSION_CART_KEY, None)
+    if not lines:
+        return 0
+    available = set(Car.objects.filter(id__in=[int(key) for key in lines]).values_list('id', flat=True))
+    rows = [(user.pk, int(key), quantity) for key, quantity in lines.items() if int(key) in available]
+    if rows:
+        _upsert_cart_items(rows)
+        invalidate_cart_summary(user)
+    return len(rows)
+
+
+def _upsert_cart_items(rows):
+    quote = connection.ops.quote_name
+    meta = CartItem._meta
+    table = quote(meta.db_table)
+    user, car, quantity = (quote(meta.get_field(name).column) for name in ('user', 'car', 'quantity'))
+    sql = (
+        f'INSERT INTO {table} ({user}, {car}, {quantity}) VALUES {", ".join(["(%s, %s, %s)"] * len(rows))} '
+        f'ON CONFLICT ({user}, {car}) DO UPDATE SET {quantity} = {table}.{quantity} + excluded.{quantity}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
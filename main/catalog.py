@@ -0,0 +1,66 @@
+from .models import CarListing
+from .pagination import akeyset_paginate, keyset_paginate
+
+
+PAGE_SIZE = 24
+
+SORT_CHOICES = [
+    ('newest', 'Сначала новые'),
+    ('price_asc', 'Сначала дешевле'),
+    ('price_desc', 'Сначала дороже'),
+    ('power_desc', 'Мощнее'),
+    ('mileage_asc', 'С меньшим пробегом'),
+]
+
+# Каталог читает готовые карточки CarListing (см. main.listings). Каждой
+# сортировке соответствует индекс CarListing (<ключ>, id) или первичный ключ,
+# поэтому любая страница читает из индекса не больше PAGE_SIZE + 1 строк.
+SORT_ORDERING = {
+    'newest': ('-id',),
+    'price_asc': ('price', 'id'),
+    'price_desc': ('-price', '-id'),
+    'power_desc': ('-power', '-id'),
+    'mileage_asc': ('mileage', 'id'),
+}
+
+DEFAULT_SORT = 'newest'
+
+RANGE_FILTERS = ('price', 'power', 'mileage')
+CHOICE_FILTERS = ('transmission', 'fuel_type', 'drive', 'color')
+
+
+def filter_cars(queryset, filters):
+    """Применяет к queryset очищенные данные CatalogFilterForm."""
+    lookups = {}
+    for name in RANGE_FILTERS:
+        if filters.get(f'{name}_min') is not None:
+            lookups[f'{name}__gte'] = filters[f'{name}_min']
+        if filters.get(f'{name}_max') is not None:
+            lookups[f'{name}__lte'] = filters[f'{name}_max']
+    for name in CHOICE_FILTERS:
+        if filters.get(name):
+            lookups[name] = filters[name]
+    return queryset.filter(**lookups)
+
+
+def get_ordering(sort):
+    return SORT_ORDERING.get(sort or DEFAULT_SORT, SORT_ORDERING[DEFAULT_SORT])
+
+
+def catalog_page(filters, cursor=None, per_page=PAGE_SIZE):
+    queryset = filter_cars(CarListing.objects.all(), filters)
+    return keyset_paginate(queryset, get_ordering(filters.get('sort')), cursor, per_page)
+
+
+def next_page_query(query, page):
+    """Строка запроса следующей страницы: текущие фильтры и новый курсор."""
+    if not page.has_next:
+        return None
+    query = query.copy()
+    query['cursor'] = page.next_cursor
+    return query.urlencode()
+
+
+async def acatalog_page(filters, cursor=None, per_page=PAGE_SIZE):
+    queryset = filter_cars(CarListing.objects.all(), filters)
+    return await akeyset_paginate(queryset, get_ordering(filters.get('sort')), cursor, per_page)
@@ -0,0 +1,13 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cart import SessionCart, get_cart_summary
+
+
+def cart_summary(request):
+    user = getattr(request, 'user', None)
+    if user is None:
+        return {}
+    if not user.is_authenticated:
+        # Шапке гостя нужно только количество, его сессия хранит сама.
+        return {'cart_summary': {'count': SessionCart(request.session).count()}}
+    return {'cart_summary': SimpleLazyObject(lambda: get_cart_summary(user))}
@@ -0,0 +1,177 @@
+"""Счётчики фасетов каталога: сколько автомобилей даст каждое значение фильтра.
+
+Все счётчики считаются одним GROUP BY по CarListing. Номера корзин цены и
+пробега хранятся в карточке, а группировка идёт по колонкам покрывающего
+индекса listing_facet_idx, поэтому запрос читает индекс по порядку без
+сортировки и без вычисления CASE на каждую строку. Фильтры цены и пробега
+учитываются условными COUNT(...) FILTER внутри ячеек. Ячеек сотни, а не
+число машин; из них счётчики собираются в Python.
+
+Счётчик фасета учитывает все фильтры, кроме собственного: при выбранной
+коробке «Автомат» видно, сколько машин будет с «Механикой». Фильтр мощности
+фасетом не является и применяется в WHERE. Результат кешируется по
+состоянию фильтров и версии каталога.
+"""
+import hashlib
+import json
+from bisect import bisect_right
+from collections import Counter, namedtuple
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Q
+
+from .caching import aget_version, get_version, record
+from .models import Car, CarListing
+
+
+FACET_CACHE_TIMEOUT = 60 * 5
+
+CHOICE_FACETS = ('transmission', 'fuel_type', 'drive', 'color')
+CHOICE_LABELS = {
+    'transmission': dict(Car.TRANSMISSION_CHOICES),
+    'fuel_type': dict(Car.FUEL_CHOICES),
+    'drive': dict(Car.DRIVE_CHOICES),
+}
+
+# Границы корзин и шаг значения: корзина [low, high) выбирается фильтром
+# <name>_min=low, <name>_max=high - шаг. Номер корзины хранится в CarListing,
+# после изменения границ нужен manage.py rebuild_listings.
+RANGE_FACETS = {
+    'price': ((1_000_000, 2_000_000, 3_000_000, 5_000_000, 8_000_000), Decimal('0.01')),
+    'mileage': ((10_000, 50_000, 100_000, 150_000), 1),
+}
+RANGE_UNITS = {'price': (1_000_000, 'млн руб.'), 'mileage': (1_000, 'тыс. км')}
+
+FACETS = (*CHOICE_FACETS, *RANGE_FACETS)
+
+Facet = namedtuple('Facet', 'value label count')
+
+
+def bucket_index(name, value):
+    return bisect_right(RANGE_FACETS[name][0], value)
+
+
+def _range_condition(name, filters):
+    condition = Q()
+    if filters.get(f'{name}_min') is not None:
+        condition &= Q(**{f'{name}__gte': filters[f'{name}_min']})
+    if filters.get(f'{name}_max') is not None:
+        condition &= Q(**{f'{name}__lte': filters[f'{name}_max']})
+    return condition
+
+
+def _count(condition):
+    # COUNT(*) без условия SQLite считает быстрее, чем COUNT(id).
+    return Count('id', filter=condition) if condition else Count('*')
+
+
+def _cells_queryset(filters):
+    """Один GROUP BY по колонкам индекса; в ячейке — число машин по условиям фильтров цены и пробега.
+
+    all_ok подходит под оба фильтра, price_ok — только под фильтр цены
+    (нужен фасету пробега), mileage_ok — только под фильтр пробега.
+    """
+    price, mileage = _range_condition('price', filters), _range_condition('mileage', filters)
+    return (
+        CarListing.objects.filter(_range_condition('power', filters))
+        .values(*CHOICE_FACETS, 'price_bucket', 'mileage_bucket')
+        .annotate(all_ok=_count(price & mileage), price_ok=_count(price), mileage_ok=_count(mileage))
+        .order_by()
+    )
+
+
+def _bucket_label(name, low, high):
+    divisor, unit = RANGE_UNITS[name]
+    low, high = (None if bound is None else f'{bound / divisor:g}' for bound in (low, high))
+    if low is None:
+        return f'до {high} {unit}'
+    if high is None:
+        return f'от {low} {unit}'
+    return f'{low}–{high} {unit}'
+
+
+def _collect(cells, filters):
+    selected = {name: filters[name] for name in CHOICE_FACETS if filters.get(name)}
+    counts = {name: Counter() for name in FACETS}
+    total = 0
+    for cell in cells:
+        failed = [name for name, value in selected.items() if cell[name] != value]
+        if not failed:
+            total += cell['all_ok']
+            for name in CHOICE_FACETS:
+                counts[name][cell[name]] += cell['all_ok']
+            counts['price'][cell['price_bucket']] += cell['mileage_ok']
+            counts['mileage'][cell['mileage_bucket']] += cell['price_ok']
+        elif len(failed) == 1:
+            # Ячейка не проходит только собственный фильтр фасета — она видна в его счётчике.
+            counts[failed[0]][cell[failed[0]]] += cell['all_ok']
+
+    facets = {'total': total}
+    for name in CHOICE_FACETS:
+        labels = CHOICE_LABELS.get(name)
+        if labels:
+            facets[name] = [Facet(value, label, counts[name][value]) for value, label in labels.items()]
+        else:
+            facets[name] = [Facet(value, value, count) for value, count in sorted(
+                counts[name].items(), key=lambda item: (-item[1], item[0])) if count]
+    for name, (bounds, _) in RANGE_FACETS.items():
+        edges = (None, *bounds, None)
+        facets[name] = [
+            Facet((low, high), _bucket_label(name, low, high), counts[name][index])
+            for index, (low, high) in enumerate(zip(edges, edges[1:]))
+        ]
+    return facets
+
+
+def _cache_key(filters, version):
+    names = (*CHOICE_FACETS, *(f'{name}_{edge}' for name in ('price', 'power', 'mileage') for edge in ('min', 'max')))
+    state = {name: value for name in names if (value := filters.get(name)) not in (None, '')}
+    digest = hashlib.md5(json.dumps(state, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+    return f'facets:{version}:{digest}'
+
+
+def compute_facets(filters):
+    """Счётчики всех фасетов для очищенных данных CatalogFilterForm, без кеша."""
+    return _collect(_cells_queryset(filters), filters)
+
+
+def catalog_facets(filters):
+    key = _cache_key(filters, get_version('catalog'))
+    facets = cache.get(key)
+    if facets is None:
+        record('facets', 'miss')
+        facets = compute_facets(filters)
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    else:
+        record('facets', 'hit')
+    return facets
+
+
+async def acatalog_facets(filters):
+    """Асинхронный вариант catalog_facets для async-view."""
+    key = _cache_key(filters, await aget_version('catalog'))
+    facets = cache.get(key)
+    if facets is None:
+        record('facets', 'miss')
+        facets = _collect([cell async for cell in _cells_queryset(filters)], filters)
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    else:
+        record('facets', 'hit')
+    return facets
+
+
+def range_links(query, facets):
+    """Ссылки на корзины цены и пробега: текущие фильтры с заменённым диапазоном и без курсора."""
+    links = {}
+    for name, (_, step) in RANGE_FACETS.items():
+        links[name] = []
+        for facet in facets[name]:
+            low, high = facet.value
+            params = query.copy()
+            params.pop('cursor', None)
+            params[f'{name}_min'] = '' if low is None else str(low)
+            params[f'{name}_max'] = '' if high is None else str(high - step)
+            links[name].append((facet, params.urlencode()))
+    return links
@@ -1,6 +1,11 @@
+import zipfile
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from .models import User, Car, Order
+from .catalog import SORT_CHOICES, DEFAULT_SORT
+from .inventory import detect_format
+from .orders import STATUS_BATCH_SIZE
 
 class RegisterForm(UserCreationForm):
     first_name = forms.CharField(label="Имя", max_length=30)
@@ -30,3 +35,98 @@ class OrderForm(forms.ModelForm):
     class Meta:
         model = Order
         fields = ['user', 'status', 'address']
+
+class CatalogFilterForm(forms.Form):
+    price_min = forms.DecimalField(label="Цена от", required=False, min_value=0, max_digits=10, decimal_places=2)
+    price_max = forms.DecimalField(label="Цена до", required=False, min_value=0, max_digits=10, decimal_places=2)
+    power_min = forms.IntegerField(label="Мощность от", required=False, min_value=0)
+    power_max = forms.IntegerField(label="Мощность до", required=False, min_value=0)
+    mileage_min = forms.IntegerField(label="Пробег от", required=False, min_value=0)
+    mileage_max = forms.IntegerField(label="Пробег до", required=False, min_value=0)
+    transmission = forms.ChoiceField(label="Коробка передач", required=False,
+                                     choices=[('', 'Любая')] + Car.TRANSMISSION_CHOICES)
+    fuel_type = forms.ChoiceField(label="Тип топлива", required=False,
+                                  choices=[('', 'Любой')] + Car.FUEL_CHOICES)
+    drive = forms.ChoiceField(label="Привод", required=False,
+                              choices=[('', 'Любой')] + Car.DRIVE_CHOICES)
+    # Цвета в базе — свободный текст, варианты списка подставляет show_facets.
+    color = forms.CharField(label="Цвет", required=False, max_length=50, widget=forms.Select(choices=[('', 'Любой')]))
+    sort = forms.ChoiceField(label="Сортировка", required=False, choices=SORT_CHOICES, initial=DEFAULT_SORT)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            if isinstance(field, forms.ChoiceField):
+                field.widget.attrs['class'] = 'form-select form-select-sm'
+            else:
+                field.widget.attrs['class'] = 'form-control form-control-sm'
+        self.fields['color'].widget.attrs['class'] = 'form-select form-select-sm'
+
+    def show_facets(self, facets):
+        """Дописывает к вариантам списков число автомобилей из main.facets."""
+        for name in ('transmission', 'fuel_type', 'drive', 'color'):
+            field = self.fields[name]
+            choices = [list(field.widget.choices)[0]]
+            choices += [(facet.value, f'{facet.label} ({facet.count})') for facet in facets[name]]
+            selected = self.data.get(name)
+            if selected and selected not in {facet.value for facet in facets[name]}:
+                choices.append((selected, f'{selected} (0)'))
+            field.widget.choices = choices
+
+class CarImportForm(forms.Form):
+    file = forms.FileField(label="Файл CSV или JSONL")
+    photos = forms.FileField(label="Архив с фото (zip)", required=False)
+    dry_run = forms.BooleanField(label="Только проверить, ничего не сохранять", required=False)
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        try:
+            self.format = detect_format(upload.name)
+        except ValueError as exc:
+            raise forms.ValidationError(str(exc))
+        return upload
+
+    def clean_photos(self):
+        photos = self.cleaned_data['photos']
+        if photos and not zipfile.is_zipfile(photos):
+            raise forms.ValidationError("Архив с фото должен быть zip-файлом")
+        return photos
+
+class OrderReportForm(forms.Form):
+    status = forms.ChoiceField(label="Статус", required=False, choices=[('', 'Все')] + Order.STATUS_CHOICES)
+    date_from = forms.DateField(label="С", required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(label="По", required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            css = 'form-select form-select-sm' if isinstance(field, forms.ChoiceField) else 'form-control form-control-sm'
+            field.widget.attrs['class'] = css
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError("Начало периода позже конца")
+        return cleaned_data
+
+
+class OrderIdsField(forms.Field):
+    """Список номеров заказов из повторяющегося параметра (чекбоксы order_ids)."""
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            ids = sorted({int(item) for item in value})
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Некорректный номер заказа")
+        if len(ids) > STATUS_BATCH_SIZE:
+            raise forms.ValidationError(f"За раз можно изменить не больше {STATUS_BATCH_SIZE} заказов")
+        return ids
+
+
+class OrderStatusBulkForm(forms.Form):
+    order_ids = OrderIdsField(label="Заказы", error_messages={'required': "Выберите заказы"})
+    status = forms.ChoiceField(label="Новый статус", choices=Order.STATUS_CHOICES)
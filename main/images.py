@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = 'cars/derived'
+
+# Карточка каталога — фиксированный кадр 3:2 (1x и 2x для экранов с высокой плотностью).
+CARD_SIZES = ((480, 320), (960, 640))
+# Страница автомобиля — ширины для srcset, пропорции исходника сохраняются.
+DETAIL_WIDTHS = (640, 1024, 1600)
+
+FORMATS = [
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+]
+
+
+class ResponsivePhoto:
+    """Набор производных одного фото для тегов <picture>/<img srcset>."""
+
+    def __init__(self, photo, variants):
+        self.photo = photo
+        self.variants = variants or {}
+
+    def _urls(self, fmt):
+        return [(width, default_storage.url(name)) for width, name in self.variants.get(fmt, [])]
+
+    def _srcset(self, fmt):
+        return ', '.join(f'{url} {width}w' for width, url in self._urls(fmt))
+
+    @property
+    def src(self):
+        urls = self._urls('jpeg')
+        if urls:
+            return urls[0][1]
+        return self.photo.url if self.photo else ''
+
+    @property
+    def jpeg_srcset(self):
+        return self._srcset('jpeg')
+
+    @property
+    def webp_srcset(self):
+        return self._srcset('webp')
+
+
+def _available_formats():
+    return [fmt for fmt in FORMATS if fmt[0] != 'webp' or features.check('webp')]
+
+
+def _load(data):
+    image = Image.open(BytesIO(data))
+    # У анимированных GIF берём первый кадр: превью всё равно статичное.
+    image.seek(0)
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _save(image, stem, label, fmt):
+    ext, pil_format, options = fmt
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    content = buffer.getvalue()
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    name = posixpath.join(DERIVATIVES_DIR, f'{stem}-{label}.{digest}.{ext}')
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(content))
+    return name
+
+
+def render_derivatives(data, stem):
+    """Строит все производные из байтов исходного фото.
+
+    Возвращает словарь вида
+    {'card': {'webp': [[480, name], ...], 'jpeg': [...]}, 'detail': {...}}.
+    """
+    image = _load(data)
+    result = {'card': {}, 'detail': {}}
+    formats = _available_formats()
+
+    for width, height in CARD_SIZES:
+        frame = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for fmt in formats:
+            name = _save(frame, stem, f'card{width}', fmt)
+            result['card'].setdefault(fmt[0], []).append([width, name])
+
+    widths = [w for w in DETAIL_WIDTHS if w < image.width] or [DETAIL_WIDTHS[0]]
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        frame = image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            name = _save(frame, stem, f'w{width}', fmt)
+            result['detail'].setdefault(fmt[0], []).append([width, name])
+    return result
+
+
+def _stored_names(derivatives):
+    names = set()
+    for kind in ('card', 'detail'):
+        for variants in derivatives.get(kind, {}).values():
+            names.update(name for _, name in variants)
+    return names
+
+
+def build_photo_derivatives(car, force=False):
+    """Генерирует производные для car.photo и сохраняет их в car.photo_derivatives.
+
+    Повторный вызов для того же исходника ничего не делает, если не передан force.
+    Возвращает True, если производные были пересобраны.
+    """
+    if not car.photo:
+        return False
+    with car.photo.open('rb') as photo:
+        data = photo.read()
+    source = hashlib.sha256(data).hexdigest()
+    previous = car.photo_derivatives or {}
+    if not force and previous.get('source') == source:
+        return False
+
+    stem = posixpath.splitext(posixpath.basename(car.photo.name))[0]
+    try:
+        derivatives = render_derivatives(data, stem)
+    except (OSError, ValueError):
+        logger.warning('Не удалось обработать фото автомобиля %s', car.pk, exc_info=True)
+        return False
+    derivatives['source'] = source
+
+    for name in _stored_names(previous) - _stored_names(derivatives):
+        default_storage.delete(name)
+
+    car.photo_derivatives = derivatives
+    car.save(update_fields=['photo_derivatives', 'updated_at'])
+    return True
@@ -0,0 +1,240 @@
+"""Очередь фоновых заданий в базе данных, без внешнего брокера.
+
+View ставит задание через enqueue() и сразу отвечает, а выполняет его
+обработчик manage.py run_jobs в отдельных процессах и потоках. Обработчик
+захватывает задание одним UPDATE ... WHERE status = 'queued', поэтому
+одно задание не достанется двум потокам. Упавшее задание повторяется с
+экспоненциальной задержкой и после max_attempts попыток остаётся в статусе
+failed с текстом ошибки. Задание убитого обработчика возвращается в
+очередь по истечении JOB_LOCK_TIMEOUT.
+
+Задание выполняется хотя бы один раз, но может и повторно, поэтому
+функции заданий должны быть идемпотентными. Функции регистрируются
+декоратором task (main.tasks); аргументы передаются через JSON.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+# Сколько ближайших заданий пробует захватить поток, если первое уже забрал другой.
+CLAIM_CANDIDATES = 10
+MAX_ERROR_LENGTH = 5000
+MAINTENANCE_INTERVAL = 60
+# Попытки записать захват или результат задания, если база занята другим писателем.
+STATE_WRITE_ATTEMPTS = 5
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def task(name):
+    """Регистрирует функцию как задание name для enqueue()."""
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, *, delay=0, max_attempts=None, **payload):
+    """Ставит в очередь задание name с аргументами payload.
+
+    Внутри транзакции задание становится видно обработчику только после её
+    фиксации — вместе с данными, которые оно обрабатывает.
+    """
+    if name not in TASKS:
+        raise UnknownTask(name)
+    job = Job.objects.create(
+        name=name,
+        payload=payload,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    if settings.JOBS_RUN_INLINE and not delay:
+        transaction.on_commit(lambda: _run_inline(job.id))
+    return job
+
+
+def _run_inline(job_id):
+    job = claim('inline', [job_id])
+    if job is not None:
+        run_job(job)
+
+
+def _persist(func, *args, **kwargs):
+    """Вызывает запрос, повторяя его при ошибке базы.
+
+    Потерянная запись результата оставила бы задание в running до
+    JOB_LOCK_TIMEOUT, после чего уже выполненное задание выполнилось бы снова.
+    """
+    for attempt in range(STATE_WRITE_ATTEMPTS):
+        try:
+            return func(*args, **kwargs)
+        except DatabaseError:
+            if attempt == STATE_WRITE_ATTEMPTS - 1:
+                raise
+            time.sleep(0.05 * 2 ** attempt)
+
+
+def claim(worker, ids=None):
+    """Захватывает ближайшее готовое задание для worker; None, если очередь пуста."""
+    now = timezone.now()
+    candidates = Job.objects.filter(status='queued', run_at__lte=now)
+    if ids is not None:
+        candidates = candidates.filter(id__in=ids)
+    for job_id in list(candidates.order_by('run_at', 'id').values_list('id', flat=True)[:CLAIM_CANDIDATES]):
+        claimed = Job.objects.filter(id=job_id, status='queued').update(
+            status='running', locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return _persist(Job.objects.get, id=job_id)
+    return None
+
+
+def retry_delay(attempts):
+    """Задержка перед следующей попыткой: удваивается, с разбросом, чтобы повторы не шли волной."""
+    delay = min(settings.JOB_RETRY_DELAY * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def run_job(job):
+    """Выполняет захваченное задание и записывает результат; исключения не пробрасывает."""
+    # locked_at отличает этот захват от повторного, если задание сочли брошенным.
+    mine = Job.objects.filter(id=job.id, status='running', locked_at=job.locked_at)
+    func = TASKS.get(job.name)
+    try:
+        if func is None:
+            raise UnknownTask(job.name)
+        func(**job.payload)
+    except Exception:
+        now = timezone.now()
+        error = traceback.format_exc()[-MAX_ERROR_LENGTH:]
+        if job.attempts >= job.max_attempts:
+            _persist(mine.update, status='failed', last_error=error, finished_at=now, locked_by='', locked_at=None)
+            logger.error('Задание %s #%s не выполнено, попыток: %s', job.name, job.id, job.attempts)
+        else:
+            run_at = now + timedelta(seconds=retry_delay(job.attempts))
+            _persist(mine.update, status='queued', last_error=error, run_at=run_at, locked_by='', locked_at=None)
+            logger.warning('Задание %s #%s упало, повтор в %s', job.name, job.id, run_at)
+        return False
+    _persist(mine.update, status='done', finished_at=timezone.now(), locked_by='', locked_at=None)
+    return True
+
+
+def run_pending(limit=None, worker='inline'):
+    """Выполняет готовые задания в текущем потоке, пока они есть; возвращает их число."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim(worker)
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+def requeue_stale():
+    """Возвращает в очередь задания, которые выполняются дольше JOB_LOCK_TIMEOUT."""
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', locked_at__lt=now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT))
+    message = 'Обработчик не завершил задание за JOB_LOCK_TIMEOUT'
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', last_error=message, finished_at=now, locked_by='', locked_at=None,
+    )
+    requeued = stale.update(status='queued', last_error=message, run_at=now, locked_by='', locked_at=None)
+    return requeued + failed
+
+
+def purge_finished():
+    """Удаляет выполненные задания старше JOB_KEEP_DONE; задания с ошибкой остаются."""
+    border = timezone.now() - timedelta(seconds=settings.JOB_KEEP_DONE)
+    return Job.objects.filter(status='done', finished_at__lt=border).delete()[0]
+
+
+def retry_failed(job_id):
+    """Ставит задание с ошибкой в очередь заново с полным числом попыток."""
+    return Job.objects.filter(id=job_id, status='failed').update(
+        status='queued', attempts=0, run_at=timezone.now(), finished_at=None,
+    ) == 1
+
+
+def job_counts():
+    """[(статус, подпись, число заданий)] для всех статусов, одним GROUP BY."""
+    counts = dict(Job.objects.values_list('status').annotate(count=Count('*')).order_by())
+    return [(status, label, counts.get(status, 0)) for status, label in Job.STATUS_CHOICES]
+
+
+def work(worker, stop, poll_interval, once=False):
+    """Цикл потока обработчика: берёт задания, пока не установлен stop.
+
+    Текущее задание всегда доводится до конца; once — выйти, когда очередь опустеет.
+    """
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                job = claim(worker)
+                if job is None:
+                    if once:
+                        break
+                else:
+                    run_job(job)
+                    continue
+            except DatabaseError:
+                # Например, SQLite занята записью другого процесса. Задание, которое
+                # не удалось отметить выполненным, вернёт в очередь requeue_stale.
+                logger.warning('Ошибка базы в обработчике очереди', exc_info=True)
+            stop.wait(poll_interval)
+    finally:
+        connection.close()
+
+
+def serve(threads=1, poll_interval=None, once=False, stop=None):
+    """Запускает threads потоков обработчика и ждёт их завершения.
+
+    Пока потоки работают, раз в MAINTENANCE_INTERVAL возвращает в очередь
+    брошенные задания и удаляет старые выполненные.
+    """
+    poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+    stop = stop or threading.Event()
+    prefix = f'{socket.gethostname()}:{os.getpid()}'
+    workers = [
+        threading.Thread(target=work, args=(f'{prefix}:{number}', stop, poll_interval, once),
+                         name=f'job-worker-{number}', daemon=True)
+        for number in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    next_maintenance = 0
+    try:
+        while not stop.is_set() and any(thread.is_alive() for thread in workers):
+            if time.monotonic() >= next_maintenance:
+                try:
+                    requeue_stale()
+                    purge_finished()
+                except DatabaseError:
+                    logger.warning('Не удалось обслужить очередь', exc_info=True)
+                next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+            stop.wait(min(poll_interval, 1))
+    finally:
+        stop.set()
+        for thread in workers:
+            thread.join()
+        connection.close()
@@ -0,0 +1,85 @@
+"""Денормализованные карточки каталога (CarListing).
+
+Каталог и поиск читают готовые строки CarListing: строки отображения,
+URL и srcset миниатюр считаются при сохранении автомобиля, а не на каждый
+запрос и не в шаблоне. В таблице только активные автомобили. Car.save и
+удаление синхронизируют её сигналами; массовые операции без сигналов
+(импорт, генерация данных) вызывают sync_listings сами, а rebuild_listings
+пересобирает таблицу целиком — например, после смены MEDIA_URL.
+"""
+from django.db import transaction
+from django.template.defaultfilters import floatformat
+from django.utils.text import Truncator
+
+from .facets import bucket_index
+from .images import ResponsivePhoto
+from .models import Car, CarListing
+
+
+TITLE_LENGTH = 40
+
+SYNCED_FIELDS = [
+    'price', 'power', 'mileage', 'transmission', 'fuel_type', 'drive', 'color', 'price_bucket', 'mileage_bucket',
+    'title', 'price_display', 'mileage_display', 'transmission_display', 'photo_src', 'photo_jpeg_srcset',
+    'photo_webp_srcset', 'updated_at',
+]
+
+
+def listing_values(car):
+    """Значения полей CarListing для автомобиля (работает и с моделью из миграций)."""
+    photo = ResponsivePhoto(car.photo, (car.photo_derivatives or {}).get('card'))
+    return {
+        'price': car.price,
+        'power': car.power,
+        'mileage': car.mileage,
+        'transmission': car.transmission,
+        'fuel_type': car.fuel_type,
+        'drive': car.drive,
+        'color': car.color,
+        'price_bucket': bucket_index('price', car.price),
+        'mileage_bucket': bucket_index('mileage', car.mileage),
+        'title': Truncator(car.configuration).chars(TITLE_LENGTH),
+        'price_display': f'{floatformat(car.price, 0)} руб.',
+        'mileage_display': f'{floatformat(car.mileage, 0)} км',
+        'transmission_display': car.get_transmission_display(),
+        'photo_src': photo.src,
+        'photo_jpeg_srcset': photo.jpeg_srcset,
+        'photo_webp_srcset': photo.webp_srcset,
+        'updated_at': car.updated_at,
+    }
+
+
+def build_listing(car):
+    return CarListing(id=car.id, **listing_values(car))
+
+
+def sync_listings(cars):
+    """Обновляет карточки автомобилей: активные upsert'ом, удалённые убирает."""
+    cars = list(cars)
+    remove_listings([car.id for car in cars if car.is_deleted])
+    CarListing.objects.bulk_create(
+        [build_listing(car) for car in cars if not car.is_deleted],
+        update_conflicts=True, unique_fields=['id'], update_fields=SYNCED_FIELDS,
+    )
+
+
+def remove_listings(car_ids):
+    if car_ids:
+        CarListing.objects.filter(id__in=car_ids).delete()
+
+
+def rebuild_listings(batch_size=1000):
+    """Пересобирает таблицу одной транзакцией: каталог не увидит её пустой. Возвращает число карточек."""
+    count = 0
+    with transaction.atomic():
+        CarListing.objects.all().delete()
+        batch = []
+        for car in Car.objects.iterator(chunk_size=batch_size):
+            batch.append(build_listing(car))
+            if len(batch) >= batch_size:
+                CarListing.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        CarListing.objects.bulk_create(batch)
+        count += len(batch)
+    return count
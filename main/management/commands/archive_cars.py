@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from main.archive import ARCHIVE_BATCH_SIZE, archive_candidates, archive_deleted_cars
+
+
+class Command(BaseCommand):
+    help = 'Переносит давно удалённые автомобили из каталога в архив (ArchivedCar), сохраняя ссылки заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Сколько дней автомобиль должен быть удалён (по умолчанию CAR_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать кандидатов')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archive_candidates(options['days']).count()
+            self.stdout.write(f'Будет перенесено в архив: {count}')
+            return
+        archived = archive_deleted_cars(options['days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Перенесено в архив: {archived}'))
@@ -0,0 +1,78 @@
+import json
+import logging
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from main.bench.data import generate
+from main.bench.environment import bench_settings, temporary_database
+from main.bench.runner import SCENARIOS, BenchFixture, run_scenario
+
+
+# Режим: (транспорт, URLconf).
+MODES = {
+    'wsgi': ('client', 'autogerm.urls'),
+    'asgi-sync': ('asgi', 'autogerm.urls'),
+    'asgi': ('asgi', 'autogerm.urls_asgi'),
+}
+
+DEFAULT_SCENARIOS = ['catalog', 'catalog_customer', 'car_detail', 'cart', 'profile']
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает WSGI и ASGI при разном числе одновременных клиентов: '
+            'синхронные view под WSGI, те же view под ASGI и async-view из main.async_views')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--mode', action='append', choices=list(MODES), dest='modes')
+        parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), dest='scenarios')
+        parser.add_argument('--requests', type=int, default=400, help='Запросов на сценарий')
+        parser.add_argument('--warmup', type=int, default=3, help='Прогревочных запросов на клиента')
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--cars', type=int, default=5000)
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', dest='json_path', help='Сохранить результаты в JSON')
+
+    def handle(self, *args, **options):
+        if options['verbosity'] < 2:
+            logging.getLogger('main.performance').setLevel(logging.WARNING)
+        modes = options['modes'] or list(MODES)
+        scenarios = options['scenarios'] or DEFAULT_SCENARIOS
+
+        results = {'meta': {key: options[key] for key in ('clients', 'requests', 'warmup', 'seed')}, 'modes': {}}
+        with bench_settings(), temporary_database():
+            results['meta']['data'] = generate(
+                options['users'], options['cars'], options['orders'], seed=options['seed'])
+            fixture = BenchFixture()
+            for mode in modes:
+                transport, urlconf = MODES[mode]
+                with override_settings(ROOT_URLCONF=urlconf):
+                    for clients in options['clients']:
+                        self.stdout.write(f'{mode}: {clients} клиентов...')
+                        results['modes'].setdefault(mode, {})[str(clients)] = {
+                            name: run_scenario(fixture, SCENARIOS[name], transport=transport,
+                                               requests=options['requests'], concurrency=clients,
+                                               warmup=options['warmup'], seed=options['seed'])
+                            for name in scenarios
+                        }
+
+        self.report(results, modes, scenarios, options['clients'])
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump(results, fh, indent=2, ensure_ascii=False)
+
+    def report(self, results, modes, scenarios, clients):
+        self.stdout.write('зап/с (p99, мс)')
+        self.stdout.write(f'{"сценарий":<18}{"клиентов":>9}' + ''.join(f'{mode:>20}' for mode in modes))
+        for name in scenarios:
+            for count in clients:
+                cells = []
+                for mode in modes:
+                    stats = results['modes'][mode][str(count)][name]
+                    cell = f'{stats["throughput_rps"]:.0f} ({stats["p99_ms"]:.1f})'
+                    if stats['errors']:
+                        cell += f' !{stats["errors"]}'
+                    cells.append(f'{cell:>20}')
+                self.stdout.write(f'{name:<18}{count:>9}' + ''.join(cells))
@@ -0,0 +1,106 @@
+import json
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from main.bench.data import generate_listings
+from main.bench.environment import bench_settings, temporary_database
+from main.catalog import filter_cars
+from main.facets import CHOICE_FACETS, CHOICE_LABELS, RANGE_FACETS, compute_facets
+from main.models import CarListing
+
+
+FILTER_STATES = {
+    'без фильтров': {},
+    'дизель': {'fuel_type': 'diesel'},
+    'автомат 2–5 млн 200+ л.с.': {
+        'transmission': 'auto', 'price_min': Decimal('2000000'), 'price_max': Decimal('4999999.99'), 'power_min': 200,
+    },
+}
+
+
+def naive_facets(filters):
+    """Тот же результат, что compute_facets, но одним COUNT на каждое значение фасета."""
+    def base(skip):
+        return filter_cars(CarListing.objects.all(), {
+            name: value for name, value in filters.items() if name != skip and not name.startswith(f'{skip}_')
+        })
+
+    counts = {}
+    for name in CHOICE_FACETS:
+        values = CHOICE_LABELS.get(name) or base(name).order_by().values_list(name, flat=True).distinct()
+        counts[name] = {value: base(name).filter(**{name: value}).count() for value in values}
+    for name, (bounds, _) in RANGE_FACETS.items():
+        edges = (None, *bounds, None)
+        counts[name] = {}
+        for low, high in zip(edges, edges[1:]):
+            queryset = base(name)
+            if low is not None:
+                queryset = queryset.filter(**{f'{name}__gte': low})
+            if high is not None:
+                queryset = queryset.filter(**{f'{name}__lt': high})
+            counts[name][(low, high)] = queryset.count()
+    return counts
+
+
+def as_counts(facets):
+    return {name: {facet.value: facet.count for facet in facets[name] if facet.count}
+            for name in (*CHOICE_FACETS, *RANGE_FACETS)}
+
+
+def without_zeros(counts):
+    return {name: {value: count for value, count in values.items() if count} for name, values in counts.items()}
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает счётчики фасетов каталога одним GROUP BY (main.facets) '
+            'с отдельным COUNT на каждое значение на 10 тыс., 100 тыс. и 1 млн карточек')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cars', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=5, help='Замеров на каждое состояние фильтров')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', dest='json_path', help='Сохранить результаты в JSON')
+
+    def measure(self, func, filters, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                result = func(filters)
+                timings.append((time.perf_counter() - started) * 1000)
+        return result, {'median_ms': statistics.median(timings), 'queries': len(queries)}
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['cars'])
+        results = []
+        with bench_settings(), temporary_database():
+            generated = 0
+            for size in sizes:
+                self.stdout.write(f'Генерация карточек до {size}...')
+                generate_listings(size - generated, seed=options['seed'] + generated)
+                generated = size
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                for state, filters in FILTER_STATES.items():
+                    grouped, grouped_stats = self.measure(compute_facets, filters, options['repeat'])
+                    naive, naive_stats = self.measure(naive_facets, filters, options['repeat'])
+                    if as_counts(grouped) != without_zeros(naive):
+                        raise CommandError(f'Счётчики расходятся: {size} карточек, «{state}»')
+                    results.append({'cars': size, 'filters': state, 'grouped': grouped_stats, 'naive': naive_stats})
+
+        self.stdout.write(f'{"карточек":>10}  {"фильтры":<28}{"GROUP BY, мс":>14}{"COUNT на значение, мс":>24}')
+        for row in results:
+            grouped, naive = row['grouped'], row['naive']
+            self.stdout.write(
+                f'{row["cars"]:>10}  {row["filters"]:<28}'
+                f'{grouped["median_ms"]:>9.1f} ({grouped["queries"]})'
+                f'{naive["median_ms"]:>17.1f} ({naive["queries"]})'
+            )
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump(results, fh, indent=2, ensure_ascii=False)
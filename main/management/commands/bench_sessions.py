@@ -0,0 +1,136 @@
+import json
+import logging
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from main.bench.data import BENCH_PASSWORD, generate
+from main.bench.environment import bench_settings, temporary_database
+from main.bench.runner import SCENARIOS, BenchFixture
+
+
+# Профиль: настройки сессий и last_login. «every-request» — поведение без
+# троттлинга: last_login пишется при каждом входе, срок сессии продлевается
+# записью на каждый запрос (как SESSION_SAVE_EVERY_REQUEST = True).
+PROFILES = {
+    'every-request': {'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+                      'SESSION_REFRESH_INTERVAL': 0, 'LAST_LOGIN_UPDATE_INTERVAL': 0},
+    'db': {'SESSION_ENGINE': 'django.contrib.sessions.backends.db'},
+    'cached_db': {'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db'},
+    'signed_cookies': {'SESSION_ENGINE': 'django.contrib.sessions.backends.signed_cookies'},
+}
+
+DEFAULT_SCENARIOS = ['catalog_customer', 'car_detail', 'cart', 'profile']
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def _measure(timings, request):
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = request()
+        timings['ms'].append((time.perf_counter() - started) * 1000)
+    timings['queries'].append(len(queries))
+    timings['writes'].append(sum(query['sql'].lstrip().upper().startswith(WRITE_PREFIXES) for query in queries))
+    return response
+
+
+def _summary(timings):
+    return {
+        'requests': len(timings['ms']),
+        'mean_ms': statistics.fmean(timings['ms']),
+        'queries_per_request': statistics.fmean(timings['queries']),
+        'writes_per_request': statistics.fmean(timings['writes']),
+        'errors': timings['errors'],
+    }
+
+
+def _new_timings():
+    return {'ms': [], 'queries': [], 'writes': [], 'errors': 0}
+
+
+def _login(client, user):
+    return client.post('/login/', {'username': user.phone, 'password': BENCH_PASSWORD})
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает хранилища сессий (db, cached_db, signed_cookies) и троттлинг записи '
+            'last_login и срока сессии: время, число запросов к базе и записей на запрос')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', choices=list(PROFILES), dest='profiles')
+        parser.add_argument('--scenario', action='append', choices=DEFAULT_SCENARIOS, dest='scenarios')
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на сценарий')
+        parser.add_argument('--logins', type=int, default=20, help='Входов на профиль')
+        parser.add_argument('--login-users', type=int, default=4,
+                            help='Сколько разных покупателей входят по очереди')
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--cars', type=int, default=5000)
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', dest='json_path', help='Сохранить результаты в JSON')
+
+    def handle(self, *args, **options):
+        if options['verbosity'] < 2:
+            logging.getLogger('main.performance').setLevel(logging.WARNING)
+        profiles = options['profiles'] or list(PROFILES)
+        scenarios = options['scenarios'] or DEFAULT_SCENARIOS
+
+        results = {'meta': {key: options[key] for key in ('requests', 'logins', 'login_users', 'seed')},
+                   'profiles': {}}
+        with bench_settings(), temporary_database():
+            results['meta']['data'] = generate(
+                options['users'], options['cars'], options['orders'], seed=options['seed'])
+            fixture = BenchFixture()
+            for profile in profiles:
+                self.stdout.write(f'{profile}...')
+                with override_settings(**PROFILES[profile]):
+                    results['profiles'][profile] = self.run_profile(fixture, scenarios, options)
+
+        self.report(results, profiles, ['login', *scenarios])
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump(results, fh, indent=2, ensure_ascii=False)
+
+    def run_profile(self, fixture, scenarios, options):
+        rng = random.Random(options['seed'])
+        # Повторные входы одних и тех же покупателей: троттлинг last_login
+        # пропускает запись, если с прошлого входа прошло меньше интервала.
+        timings = _new_timings()
+        users = fixture.customers[:options['login_users']]
+        for index in range(options['logins']):
+            response = _measure(timings, lambda: _login(Client(), users[index % len(users)]))
+            timings['errors'] += response.status_code != 302
+        results = {'login': _summary(timings)}
+
+        client = Client()
+        _login(client, fixture.customers[0])
+        for name in scenarios:
+            scenario = SCENARIOS[name]
+            client.get(scenario.path(fixture, rng))
+            timings = _new_timings()
+            for _ in range(options['requests']):
+                path = scenario.path(fixture, rng)
+                response = _measure(timings, lambda: client.get(path))
+                timings['errors'] += response.status_code != scenario.expected
+            results[name] = _summary(timings)
+        return results
+
+    def report(self, results, profiles, phases):
+        self.stdout.write('мс на запрос / запросов к базе / записей')
+        self.stdout.write(f'{"сценарий":<18}' + ''.join(f'{profile:>22}' for profile in profiles))
+        for name in phases:
+            cells = []
+            for profile in profiles:
+                stats = results['profiles'][profile][name]
+                cell = (f'{stats["mean_ms"]:.1f} / {stats["queries_per_request"]:.1f}'
+                        f' / {stats["writes_per_request"]:.2f}')
+                if stats['errors']:
+                    cell += f' !{stats["errors"]}'
+                cells.append(f'{cell:>22}')
+            self.stdout.write(f'{name:<18}' + ''.join(cells))
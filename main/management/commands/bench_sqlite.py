@@ -0,0 +1,141 @@
+import json
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from autogerm.database import BUSY_TIMEOUT, SQLITE_PRAGMAS, pragma_statements
+from main.bench.runner import percentile
+
+
+PROFILES = {
+    'default': {'pragmas': [], 'begin': 'BEGIN', 'timeout': 5},
+    'tuned': {'pragmas': pragma_statements(SQLITE_PRAGMAS), 'begin': 'BEGIN IMMEDIATE', 'timeout': BUSY_TIMEOUT},
+}
+
+SCHEMA = [
+    'CREATE TABLE car (id INTEGER PRIMARY KEY, price REAL, mileage INTEGER, configuration TEXT)',
+    'CREATE INDEX car_price ON car (price, id)',
+    'CREATE TABLE cart (id INTEGER PRIMARY KEY, car_id INTEGER, quantity INTEGER, created REAL)',
+]
+
+
+class Command(BaseCommand):
+    help = ('Конкурентный бенчмарк чтения/записи SQLite: настройки по умолчанию '
+            'против pragmas из autogerm/database.py')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5.0, help='Секунд на профиль')
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--json', dest='json_path', help='Сохранить результаты в JSON')
+
+    def connect(self, path, profile):
+        conn = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None, check_same_thread=False)
+        for statement in profile['pragmas']:
+            conn.execute(statement)
+        return conn
+
+    def prepare(self, path, profile, rows):
+        conn = self.connect(path, profile)
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.execute('BEGIN')
+        conn.executemany(
+            'INSERT INTO car (id, price, mileage, configuration) VALUES (?, ?, ?, ?)',
+            ((i, random.uniform(5e5, 1e7), random.randint(0, 300000), f'Car {i}') for i in range(1, rows + 1)),
+        )
+        conn.execute('COMMIT')
+        conn.close()
+
+    def run_profile(self, name, profile, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = str(Path(directory) / 'bench.sqlite3')
+            self.prepare(path, profile, options['rows'])
+            deadline = time.perf_counter() + options['duration']
+            latencies = {'read': [], 'write': []}
+            errors = {'read': 0, 'write': 0}
+            lock = threading.Lock()
+
+            def reader():
+                conn = self.connect(path, profile)
+                local, failed = [], 0
+                while time.perf_counter() < deadline:
+                    low = random.uniform(5e5, 9e6)
+                    started = time.perf_counter()
+                    try:
+                        conn.execute(
+                            'SELECT id, price FROM car WHERE price >= ? ORDER BY price, id LIMIT 24', (low,),
+                        ).fetchall()
+                        local.append(time.perf_counter() - started)
+                    except sqlite3.OperationalError:
+                        failed += 1
+                conn.close()
+                with lock:
+                    latencies['read'].extend(local)
+                    errors['read'] += failed
+
+            def writer():
+                conn = self.connect(path, profile)
+                local, failed = [], 0
+                while time.perf_counter() < deadline:
+                    car_id = random.randint(1, options['rows'])
+                    started = time.perf_counter()
+                    try:
+                        conn.execute(profile['begin'])
+                        conn.execute('INSERT INTO cart (car_id, quantity, created) VALUES (?, 1, ?)',
+                                     (car_id, time.time()))
+                        conn.execute('UPDATE car SET mileage = mileage + 1 WHERE id = ?', (car_id,))
+                        conn.execute('COMMIT')
+                        local.append(time.perf_counter() - started)
+                    except sqlite3.OperationalError:
+                        failed += 1
+                        if conn.in_transaction:
+                            conn.execute('ROLLBACK')
+                conn.close()
+                with lock:
+                    latencies['write'].extend(local)
+                    errors['write'] += failed
+
+            threads = ([threading.Thread(target=reader) for _ in range(options['readers'])]
+                       + [threading.Thread(target=writer) for _ in range(options['writers'])])
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        result = {}
+        for role, values in latencies.items():
+            result[role] = {
+                'ops_per_sec': len(values) / options['duration'],
+                'p50_ms': percentile(values, 0.5) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+                'mean_ms': statistics.fmean(values) * 1000 if values else 0.0,
+                'errors': errors[role],
+            }
+        return result
+
+    def handle(self, *args, **options):
+        results = {}
+        for name, profile in PROFILES.items():
+            self.stdout.write(f'Профиль {name}: {options["readers"]} читателей, {options["writers"]} писателей...')
+            results[name] = self.run_profile(name, profile, options)
+
+        header = f'{"профиль":<10}{"операция":<10}{"оп/с":>10}{"p50, мс":>10}{"p99, мс":>10}{"ошибки":>8}'
+        self.stdout.write(header)
+        for name, roles in results.items():
+            for role, stats in roles.items():
+                self.stdout.write(
+                    f'{name:<10}{role:<10}{stats["ops_per_sec"]:>10.0f}{stats["p50_ms"]:>10.2f}'
+                    f'{stats["p99_ms"]:>10.2f}{stats["errors"]:>8}'
+                )
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump(results, fh, indent=2)
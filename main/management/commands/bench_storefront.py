@@ -0,0 +1,124 @@
+import json
+import logging
+import platform
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from main.bench.data import generate
+from main.bench.environment import bench_settings, temporary_database
+from main.bench.runner import SCENARIOS, TRANSPORTS, BenchFixture, LocalServer, compare_results, run_scenario
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный бенчмарк сценариев витрины: пропускная способность и p50/p99. '
+            'По умолчанию работает на временной базе с синтетическими данными, '
+            'результат сохраняется в JSON и может сравниваться с базовым прогоном.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transport', choices=TRANSPORTS, default='client')
+        parser.add_argument('--url', help='Адрес внешнего сервера для --transport url (база должна быть общей)')
+        parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), dest='scenarios',
+                            help='Запустить только указанные сценарии (можно повторять)')
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на сценарий')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=10, help='Прогревочных запросов на поток')
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--cars', type=int, default=5000)
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', dest='json_path', help='Сохранить результаты в JSON')
+        parser.add_argument('--baseline', help='JSON предыдущего прогона для проверки регрессий')
+        parser.add_argument('--threshold', type=float, default=1.25,
+                            help='Во сколько раз метрика может ухудшиться относительно базового прогона')
+
+    def handle(self, *args, **options):
+        if options['transport'] == 'url' and not options['url']:
+            raise CommandError('Для --transport url нужен --url.')
+        if options['verbosity'] < 2:
+            logging.getLogger('main.performance').setLevel(logging.WARNING)
+
+        with bench_settings():
+            if options['transport'] == 'url':
+                results = self.run(options, None)
+            else:
+                results = self.run_on_temporary_database(options)
+
+        self.report(results)
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump(results, fh, indent=2, ensure_ascii=False)
+        if options['baseline']:
+            self.check_baseline(options['baseline'], results, options['threshold'])
+
+    def run_on_temporary_database(self, options):
+        with temporary_database():
+            data = generate(options['users'], options['cars'], options['orders'], seed=options['seed'])
+            self.stdout.write(f'Данные: {data}')
+            return self.run(options, data)
+
+    def run(self, options, data):
+        try:
+            fixture = BenchFixture()
+        except ValueError as exc:
+            raise CommandError(f'{exc} Запустите seed_bench_data.')
+
+        transport = options['transport']
+        results = {
+            'meta': {
+                'transport': transport,
+                'url': options['url'],
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'warmup': options['warmup'],
+                'seed': options['seed'],
+                'data': data,
+                'database': connection.vendor,
+                'cache': settings.CACHES['default']['BACKEND'],
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'timestamp': timezone.now().isoformat(),
+            },
+            'scenarios': {},
+        }
+
+        names = options['scenarios'] or list(SCENARIOS)
+        if transport == 'wsgi':
+            with LocalServer() as server:
+                self.run_scenarios(results, fixture, names, options, server.url)
+        else:
+            self.run_scenarios(results, fixture, names, options, options['url'])
+        return results
+
+    def run_scenarios(self, results, fixture, names, options, base_url):
+        for name in names:
+            self.stdout.write(f'Сценарий {name}...')
+            results['scenarios'][name] = run_scenario(
+                fixture, SCENARIOS[name], transport=options['transport'], requests=options['requests'],
+                concurrency=options['concurrency'], warmup=options['warmup'], seed=options['seed'],
+                base_url=base_url,
+            )
+
+    def report(self, results):
+        meta = results['meta']
+        self.stdout.write(f'Транспорт {meta["transport"]}, потоков {meta["concurrency"]}')
+        self.stdout.write(f'{"сценарий":<14}{"зап/с":>10}{"p50, мс":>10}{"p90, мс":>10}{"p99, мс":>10}{"ошибки":>8}')
+        for name, stats in results['scenarios'].items():
+            self.stdout.write(
+                f'{name:<14}{stats["throughput_rps"]:>10.1f}{stats["p50_ms"]:>10.2f}{stats["p90_ms"]:>10.2f}'
+                f'{stats["p99_ms"]:>10.2f}{stats["errors"]:>8}'
+            )
+
+    def check_baseline(self, path, results, threshold):
+        with open(path, encoding='utf-8') as fh:
+            baseline = json.load(fh)
+        for key in ('transport', 'concurrency', 'data'):
+            if baseline.get('meta', {}).get(key) != results['meta'][key]:
+                self.stderr.write(f'Внимание: {key} отличается от базового прогона, сравнение может быть некорректным.')
+        regressions = compare_results(baseline, results, threshold)
+        if regressions:
+            raise CommandError('Регрессии относительно базового прогона:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'Регрессий нет (порог x{threshold}).'))
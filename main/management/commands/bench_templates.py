@@ -0,0 +1,147 @@
+import json
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Context, Engine
+
+from main.listings import build_listing
+from main.models import Car, Order
+from main.templatetags.main_extras import STATUS_BADGE_CLASSES
+
+
+def status_chain_template():
+    """Строки заказов с цепочкой {% if %} по статусу и циклом по STATUS_CHOICES, как было в шаблонах."""
+    branches = ''.join(
+        f"{{% {'if' if index == 0 else 'elif'} order.status == '{status}' %}}"
+        f'<span class="badge {classes}">{{{{ order.get_status_display }}}}</span>'
+        for index, (status, classes) in enumerate(STATUS_BADGE_CLASSES.items())
+    )
+    return (
+        '{% for order in orders %}<tr><td>{{ order.id }}</td>'
+        f'<td>{branches}{{% else %}}<span class="badge bg-danger">{{{{ order.get_status_display }}}}</span>{{% endif %}}</td>'
+        '<td><select name="status">{% for key, label in order.STATUS_CHOICES %}'
+        '<option value="{{ key }}"{% if order.status == key %} selected{% endif %}>{{ label }}</option>'
+        '{% endfor %}</select></td></tr>\n{% endfor %}'
+    )
+
+
+STATUS_TAGS_TEMPLATE = (
+    '{% load main_extras %}{% for order in orders %}<tr><td>{{ order.id }}</td>'
+    '<td>{% status_badge order.status %}</td>'
+    '<td><select name="status">{% status_options order.status %}</select></td></tr>\n{% endfor %}'
+)
+
+CARD_FILTERS_TEMPLATE = (
+    '{% for car in cars %}<h5>{{ car.configuration|truncatechars:40 }}</h5>'
+    '<p>{{ car.price|floatformat:0 }} руб.</p><span>{{ car.mileage|floatformat:0 }} км</span>'
+    '<span>{{ car.get_transmission_display }}</span>\n{% endfor %}'
+)
+
+CARD_FIELDS_TEMPLATE = (
+    '{% for car in cars %}<h5>{{ car.title }}</h5>'
+    '<p>{{ car.price_display }}</p><span>{{ car.mileage_display }}</span>'
+    '<span>{{ car.transmission_display }}</span>\n{% endfor %}'
+)
+
+# Шаблоны, которые загружает запрос страницы каталога.
+CATALOG_TEMPLATES = ('main/catalog.html', 'main/base.html', 'main/includes/car_card.html')
+
+
+def make_orders(count, rng):
+    statuses = [status for status, _ in Order.STATUS_CHOICES]
+    return [Order(id=number, status=rng.choice(statuses)) for number in range(1, count + 1)]
+
+
+def make_cars(count, rng):
+    transmissions = [value for value, _ in Car.TRANSMISSION_CHOICES]
+    return [
+        Car(
+            id=number, photo=f'cars/{number}.jpg',
+            configuration=f'BMW {rng.randint(1, 8)}er{" M Sport Edition" * rng.randint(1, 4)}',
+            price=Decimal(rng.randrange(900_000, 9_000_000, 1000)), mileage=rng.randrange(0, 250_000),
+            transmission=rng.choice(transmissions),
+        )
+        for number in range(1, count + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время рендеринга списков на 1 тыс. и 10 тыс. строк: цепочки {% if %} статусов '
+            'против тегов status_badge/status_options, фильтры и get_*_display против готовых полей '
+            'CarListing, а также загрузку шаблонов страницы с cached.Loader и без него')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000])
+        parser.add_argument('--requests', type=int, default=200, help='Загрузок шаблонов каталога на замер')
+        parser.add_argument('--repeat', type=int, default=5, help='Замеров на каждый вариант')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', dest='json_path', help='Сохранить результаты в JSON')
+
+    def measure(self, func, repeat):
+        timings, result = [], None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, statistics.median(timings)
+
+    def compare(self, name, rows, baseline, optimized, repeat):
+        expected, baseline_ms = self.measure(baseline, repeat)
+        actual, optimized_ms = self.measure(optimized, repeat)
+        if expected != actual:
+            raise CommandError(f'Результаты расходятся: «{name}», {rows} строк')
+        return {'case': name, 'rows': rows, 'baseline_ms': baseline_ms, 'optimized_ms': optimized_ms}
+
+    def loader_engines(self):
+        engine = Engine.get_default()
+        loaders = settings.TEMPLATE_LOADERS
+        options = {'dirs': engine.dirs, 'libraries': engine.libraries}
+        cached = [('django.template.loaders.cached.Loader', loaders)]
+        return Engine(loaders=loaders, **options), Engine(loaders=cached, **options)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        engine = Engine.get_default()
+        status_chain = engine.from_string(status_chain_template())
+        status_tags = engine.from_string(STATUS_TAGS_TEMPLATE)
+        card_filters = engine.from_string(CARD_FILTERS_TEMPLATE)
+        card_fields = engine.from_string(CARD_FIELDS_TEMPLATE)
+
+        results = []
+        for rows in sorted(options['rows']):
+            orders = Context({'orders': make_orders(rows, rng)})
+            cars = make_cars(rows, rng)
+            listings = [build_listing(car) for car in cars]
+            results.append(self.compare(
+                'статусы заказов', rows,
+                lambda: status_chain.render(orders), lambda: status_tags.render(orders), options['repeat'],
+            ))
+            results.append(self.compare(
+                'карточки каталога', rows,
+                lambda: card_filters.render(Context({'cars': cars})),
+                lambda: card_fields.render(Context({'cars': listings})),
+                options['repeat'],
+            ))
+
+        plain, cached = self.loader_engines()
+
+        def load(loader_engine):
+            return lambda: [
+                loader_engine.get_template(name).source for _ in range(options['requests']) for name in CATALOG_TEMPLATES
+            ]
+        results.append(self.compare('загрузка шаблонов', options['requests'], load(plain), load(cached),
+                                    options['repeat']))
+
+        self.stdout.write(f'{"вариант":<20}{"строк":>8}{"было, мс":>12}{"стало, мс":>12}{"ускорение":>11}')
+        for row in results:
+            speedup = row['baseline_ms'] / row['optimized_ms'] if row['optimized_ms'] else float('inf')
+            self.stdout.write(
+                f'{row["case"]:<20}{row["rows"]:>8}{row["baseline_ms"]:>12.1f}{row["optimized_ms"]:>12.1f}{speedup:>10.1f}×'
+            )
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump(results, fh, indent=2, ensure_ascii=False)
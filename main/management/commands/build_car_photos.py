@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from main.images import build_photo_derivatives
+from main.models import Car
+
+
+class Command(BaseCommand):
+    help = 'Генерирует превью и srcset-производные для фото автомобилей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Пересобрать производные, даже если исходник не менялся')
+        parser.add_argument('--car', type=int, action='append', dest='car_ids',
+                            help='Обработать только указанные id (можно повторять)')
+
+    def handle(self, *args, **options):
+        cars = Car.all_objects.exclude(photo='').order_by('id')
+        if options['car_ids']:
+            cars = cars.filter(id__in=options['car_ids'])
+
+        built = skipped = 0
+        for car in cars.iterator(chunk_size=100):
+            if build_photo_derivatives(car, force=options['force']):
+                built += 1
+                self.stdout.write(f'{car.id}: {car.photo.name}')
+            else:
+                skipped += 1
+        self.stdout.write(self.style.SUCCESS(f'Готово: обработано {built}, пропущено {skipped}'))
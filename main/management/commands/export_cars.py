@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from main.inventory import export_cars
+from main.models import Car
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает автомобили (включая удалённые) в CSV или JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--output', help='Файл для записи, по умолчанию стандартный вывод')
+        parser.add_argument('--active-only', action='store_true', help='Без удалённых автомобилей')
+
+    def handle(self, *args, **options):
+        queryset = Car.objects.all() if options['active_only'] else None
+        fh = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        try:
+            for line in export_cars(options['format'], queryset):
+                fh.write(line)
+        finally:
+            if fh is not sys.stdout:
+                fh.close()
@@ -0,0 +1,50 @@
+import sys
+import time
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.inventory import BATCH_SIZE, detect_format, import_cars
+
+
+class Command(BaseCommand):
+    help = 'Импортирует автомобили из CSV/JSONL по stock_id (создание и обновление пачками)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .csv или .jsonl, "-" — стандартный ввод')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='По умолчанию по расширению файла')
+        parser.add_argument('--photos', help='zip-архив с фотографиями')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить файл')
+        parser.add_argument('--skip-photo-processing', action='store_true',
+                            help='Не строить превью сразу (потом: build_car_photos)')
+        parser.add_argument('--defer-photos', action='store_true',
+                            help='Построить превью фоновыми заданиями (manage.py run_jobs)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            fmt = options['format'] or detect_format(path)
+        except ValueError as exc:
+            raise CommandError(f'{exc}; укажите --format')
+
+        archive = zipfile.ZipFile(options['photos']) if options['photos'] else None
+        fh = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        started = time.perf_counter()
+        try:
+            report = import_cars(
+                fh, fmt, archive=archive, batch_size=options['batch_size'], dry_run=options['dry_run'],
+                build_photos=not options['skip_photo_processing'], defer_photos=options['defer_photos'],
+                on_error=lambda line, message: self.stderr.write(f'строка {line}: {message}'),
+            )
+        finally:
+            if fh is not sys.stdin:
+                fh.close()
+            if archive:
+                archive.close()
+
+        elapsed = time.perf_counter() - started
+        prefix = 'Проверка' if options['dry_run'] else 'Импорт'
+        summary = (f'{prefix} за {elapsed:.2f} с: создано {report.created}, '
+                   f'обновлено {report.updated}, ошибок {report.error_count}')
+        self.stdout.write(self.style.WARNING(summary) if report.error_count else self.style.SUCCESS(summary))
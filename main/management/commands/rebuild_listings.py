@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.caching import bump_version
+from main.listings import rebuild_listings
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересобирает карточки каталога CarListing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_listings(batch_size=options['batch_size'])
+        bump_version('catalog')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Карточек: {count}, пересобраны за {elapsed:.2f} с'))
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает поисковый индекс каталога'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        started = time.perf_counter()
+        backend.rebuild(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс {type(backend).__name__} перестроен за {elapsed:.2f} с'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from main.orders import recount_order_statuses
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики заказов по статусам (OrderStatusCounter) одним GROUP BY'
+
+    def handle(self, *args, **options):
+        counts = recount_order_statuses()
+        self.stdout.write(self.style.SUCCESS(f'Заказов по статусам: {counts}'))
@@ -0,0 +1,62 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.jobs import run_pending, serve
+from main.worker import install_stop_handlers, run_process
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задания из очереди main.jobs (Ctrl+C или SIGTERM — мягкая остановка)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOB_WORKER_PROCESSES,
+                            help='Число процессов обработчика')
+        parser.add_argument('--threads', type=int, default=settings.JOB_WORKER_THREADS,
+                            help='Число потоков в каждом процессе')
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+                            help='Пауза в секундах, когда очередь пуста')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задания и выйти')
+
+    def handle(self, *args, **options):
+        processes, threads = options['processes'], options['threads']
+        if processes < 1 or threads < 1:
+            raise CommandError('--processes и --threads должны быть не меньше 1')
+
+        if processes == 1 and threads == 1 and options['once']:
+            done = run_pending()
+            self.stdout.write(self.style.SUCCESS(f'Выполнено заданий: {done}'))
+            return
+
+        self.stdout.write(f'Обработчик очереди: процессов {processes}, потоков {threads}')
+        if processes == 1:
+            stop = threading.Event()
+            install_stop_handlers(stop)
+            serve(threads, options['poll_interval'], options['once'], stop)
+        else:
+            self._run_processes(processes, threads, options['poll_interval'], options['once'])
+        self.stdout.write(self.style.SUCCESS('Обработчик остановлен'))
+
+    def _run_processes(self, processes, threads, poll_interval, once):
+        context = multiprocessing.get_context('spawn')
+        children = [
+            context.Process(target=run_process, args=(threads, poll_interval, once), name=f'run_jobs-{number}')
+            for number in range(processes)
+        ]
+
+        def stop_children(*args):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+
+        # Ctrl+C получает вся группа процессов, SIGTERM — только родитель.
+        signal.signal(signal.SIGTERM, stop_children)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        for child in children:
+            child.start()
+        for child in children:
+            child.join()
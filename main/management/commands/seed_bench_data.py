@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.bench.data import BENCH_PASSWORD, generate
+
+
+class Command(BaseCommand):
+    help = ('Заполняет текущую базу синтетическими пользователями, автомобилями и заказами '
+            '(нужно для bench_storefront --url против внешнего сервера)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--cars', type=int, default=5000)
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive')
+
+    def handle(self, *args, **options):
+        if options['interactive']:
+            answer = input('Данные будут добавлены в рабочую базу. Продолжить? [y/N] ')
+            if answer.strip().lower() not in ('y', 'yes', 'д', 'да'):
+                raise CommandError('Отменено.')
+        generate(options['users'], options['cars'], options['orders'], seed=options['seed'], stdout=self.stdout)
+        self.stdout.write(f'Пароль всех созданных пользователей: {BENCH_PASSWORD}')
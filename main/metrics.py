@@ -0,0 +1,143 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(pairs):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus с метками, хранится в памяти процесса."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: [0] * (len(buckets) + 1))
+        self._sums = defaultdict(float)
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[labels][index] += 1
+            self._sums[labels] += value
+
+    def _format_labels(self, labels, extra=None):
+        pairs = list(zip(self.label_names, labels))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return format_labels(pairs)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, list(counts), self._sums[labels]) for labels, counts in self._counts.items())
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{self._format_labels(labels, ("le", bound))} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{self._format_labels(labels, ("le", "+Inf"))} {cumulative}')
+            lines.append(f'{self.name}_sum{self._format_labels(labels)} {total}')
+            lines.append(f'{self.name}_count{self._format_labels(labels)} {cumulative}')
+        return lines
+
+
+REQUEST_LABELS = ('view', 'method')
+
+request_duration = Histogram(
+    'autogerm_request_duration_seconds', 'Время обработки запроса', REQUEST_LABELS, TIME_BUCKETS)
+db_queries = Histogram(
+    'autogerm_request_db_queries', 'Число SQL-запросов на HTTP-запрос', REQUEST_LABELS, QUERY_BUCKETS)
+db_duration = Histogram(
+    'autogerm_request_db_duration_seconds', 'Время SQL-запросов на HTTP-запрос', REQUEST_LABELS, TIME_BUCKETS)
+template_duration = Histogram(
+    'autogerm_request_template_duration_seconds', 'Время рендеринга шаблонов на HTTP-запрос', REQUEST_LABELS,
+    TIME_BUCKETS)
+response_size = Histogram(
+    'autogerm_response_size_bytes', 'Размер тела ответа', REQUEST_LABELS, SIZE_BUCKETS)
+
+HISTOGRAMS = (request_duration, db_queries, db_duration, template_duration, response_size)
+
+
+class RequestStats:
+    """Счётчики одного запроса: SQL (с текстом для медленных запросов) и шаблоны."""
+
+    max_captured_queries = 500
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.captured = []
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        if len(self.captured) < self.max_captured_queries:
+            self.captured.append((sql, duration))
+
+
+current_stats = ContextVar('request_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper всех соединений: учитывает SQL в статистике текущего запроса.
+
+    Статистика берётся из ContextVar, поэтому сюда попадают и запросы async ORM,
+    которые Django выполняет в отдельном потоке с копией контекста.
+    """
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - started)
+
+
+def add_template_time(duration):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.template_time += duration
+
+
+def observe_request(view, method, duration, stats, size):
+    labels = (view, method)
+    request_duration.observe(labels, duration)
+    db_queries.observe(labels, stats.queries)
+    db_duration.observe(labels, stats.db_time)
+    template_duration.observe(labels, stats.template_time)
+    if size is not None:
+        response_size.observe(labels, size)
+
+
+def render_prometheus(counters=()):
+    """Текст для /manage/metrics/; counters — пары (имя, справка, {метки: значение})."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for name, help_text, values in counters:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for labels, value in sorted(values.items()):
+            lines.append(f'{name}{format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
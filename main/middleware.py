@@ -0,0 +1,186 @@
+import json
+import logging
+import time
+
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .metrics import RequestStats, current_stats, observe_request
+from .staticfiles import find_file, serve_file
+
+
+logger = logging.getLogger('main.performance')
+
+
+class PerformanceMiddleware:
+    """Замеряет время запроса, SQL, рендеринг шаблонов и размер ответа.
+
+    Данные пишутся в гистограммы main.metrics и одной JSON-строкой в лог
+    main.performance. Если запрос дольше PERF_SLOW_REQUEST_MS, в лог с
+    уровнем WARNING добавляются все SQL-запросы этого запроса. SQL считает
+    main.metrics.record_query, подключённый ко всем соединениям, поэтому
+    middleware работает одинаково под WSGI и ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'PERF_SLOW_REQUEST_MS', 500)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self._finish(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self._finish(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def _finish(self, request, response, stats, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match and match.view_name else 'unresolved'
+        size = None if response.streaming else len(response.content)
+        observe_request(view, request.method, duration, stats, size)
+        self._log(request, response, view, duration, stats, size)
+
+    def _log(self, request, response, view, duration, stats, size):
+        record = {
+            'event': 'request',
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'db_queries': stats.queries,
+            'db_ms': round(stats.db_time * 1000, 2),
+            'template_ms': round(stats.template_time * 1000, 2),
+            'response_bytes': size,
+        }
+        if duration * 1000 >= self.slow_ms:
+            record['event'] = 'slow_request'
+            record['sql'] = [{'sql': sql, 'ms': round(ms * 1000, 2)} for sql, ms in stats.captured]
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+
+SESSION_REFRESHED_KEY = '_refreshed_at'
+
+
+def mark_session_fresh(session):
+    session[SESSION_REFRESHED_KEY] = int(time.time())
+
+
+class SessionRefreshMiddleware:
+    """Продлевает срок сессии не чаще раза в SESSION_REFRESH_INTERVAL секунд.
+
+    Сессия сохраняется только при изменении (SESSION_SAVE_EVERY_REQUEST =
+    False), поэтому без продления активный пользователь разлогинился бы через
+    SESSION_COOKIE_AGE после входа. Middleware раз в интервал записывает в
+    сессию отметку времени — одна запись вместо записи на каждый запрос;
+    сессия, которая сохраняется и так (вход, изменение корзины), получает
+    отметку бесплатно. Сессии, которые запрос не читал, не загружаются.
+    Подключается после SessionMiddleware. Под ASGI работает без перехода
+    в пул потоков: прочитанная запросом сессия уже загружена.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self._refresh(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self._refresh(request)
+        return response
+
+    def _refresh(self, request):
+        session = getattr(request, 'session', None)
+        if session is None or not session.accessed or session.is_empty():
+            return
+        stale = time.time() - session.get(SESSION_REFRESHED_KEY, 0) >= settings.SESSION_REFRESH_INTERVAL
+        if session.modified or stale:
+            mark_session_fresh(session)
+
+
+class StaticFilesMiddleware:
+    """Отдаёт файлы STATIC_ROOT по STATIC_URL и MEDIA_ROOT по MEDIA_URL.
+
+    Ответ собирает main.staticfiles.serve_file: сжатая копия, ETag, 304 и
+    Cache-Control immutable для имён с хешем. Запрос к файлу не доходит до
+    сессий, авторизации и URL-резолвера; если файла нет, запрос идёт дальше
+    по цепочке. Под ASGI файловая система опрашивается в пуле потоков и
+    только для путей с префиксом статики или медиа. Подключается сразу
+    после SecurityMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.roots = [
+            (urlsplit(url).path, root, max_age)
+            for url, root, max_age in (
+                (settings.STATIC_URL, settings.STATIC_ROOT, settings.STATIC_MAX_AGE),
+                (settings.MEDIA_URL, settings.MEDIA_ROOT, settings.MEDIA_MAX_AGE),
+            )
+            if url and root and urlsplit(url).path.startswith('/')
+        ]
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _root_for(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        for prefix, root, max_age in self.roots:
+            if request.path_info.startswith(prefix):
+                return request.path_info[len(prefix):], root, max_age
+        return None
+
+    def _serve(self, request, relative_path, root, max_age):
+        found = find_file(root, relative_path)
+        return serve_file(request, *found, max_age) if found else None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        match = self._root_for(request)
+        response = self._serve(request, *match) if match else None
+        return self.get_response(request) if response is None else response
+
+    async def __acall__(self, request):
+        match = self._root_for(request)
+        response = await sync_to_async(self._serve)(request, *match) if match else None
+        return await self.get_response(request) if response is None else response
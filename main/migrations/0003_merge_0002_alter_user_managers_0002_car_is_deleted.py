@@ -0,0 +1,14 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:24
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_alter_user_managers'),
+        ('main', '0002_car_is_deleted'),
+    ]
+
+    operations = [
+    ]
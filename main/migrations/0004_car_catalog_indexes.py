@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_merge_0002_alter_user_managers_0002_car_is_deleted'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['is_deleted', 'id'], name='car_active_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['is_deleted', 'price', 'id'], name='car_active_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['is_deleted', 'power', 'id'], name='car_active_power_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['is_deleted', 'mileage', 'id'], name='car_active_mileage_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_car_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='photo_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Производные фото'),
+        ),
+    ]
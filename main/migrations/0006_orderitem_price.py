@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:27
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def snapshot_prices(apps, schema_editor):
+    Car = apps.get_model('main', 'Car')
+    OrderItem = apps.get_model('main', 'OrderItem')
+    OrderItem.objects.update(
+        price=Subquery(Car.objects.filter(pk=OuterRef('car_id')).values('price')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_car_photo_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Цена за единицу'),
+        ),
+        migrations.RunPython(snapshot_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS main_car_fts USING fts5("
+        "configuration, configuration_desc, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    # Таблица создаётся пустой: заполнять её должен текущий стеммер, а не
+    # тот, что был при написании миграции. Это делает main.signals.fill_search_index
+    # после migrate (или manage.py rebuild_search_index).
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS main_car_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_orderitem_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_car_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='stock_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='Номер у поставщика'),
+        ),
+    ]
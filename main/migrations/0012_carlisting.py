@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:13
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from django.template.defaultfilters import floatformat
+from django.utils.text import Truncator
+
+
+# Копия main.listings.listing_values на момент этой миграции: последующие
+# изменения модуля не должны менять то, что она записывает.
+def _photo_urls(car, fmt):
+    variants = (car.photo_derivatives or {}).get('card') or {}
+    return [(width, default_storage.url(name)) for width, name in variants.get(fmt, [])]
+
+
+def _srcset(urls):
+    return ', '.join(f'{url} {width}w' for width, url in urls)
+
+
+def listing_values(car):
+    jpeg, webp = _photo_urls(car, 'jpeg'), _photo_urls(car, 'webp')
+    return {
+        'price': car.price,
+        'power': car.power,
+        'mileage': car.mileage,
+        'transmission': car.transmission,
+        'fuel_type': car.fuel_type,
+        'drive': car.drive,
+        'title': Truncator(car.configuration).chars(40),
+        'price_display': f'{floatformat(car.price, 0)} руб.',
+        'mileage_display': f'{floatformat(car.mileage, 0)} км',
+        'transmission_display': car.get_transmission_display(),
+        'photo_src': jpeg[0][1] if jpeg else (car.photo.url if car.photo else ''),
+        'photo_jpeg_srcset': _srcset(jpeg),
+        'photo_webp_srcset': _srcset(webp),
+        'updated_at': car.updated_at,
+    }
+
+
+def fill_listings(apps, schema_editor):
+    Car = apps.get_model('main', 'Car')
+    CarListing = apps.get_model('main', 'CarListing')
+    CarListing.objects.bulk_create(
+        (CarListing(id=car.id, **listing_values(car)) for car in Car.objects.filter(is_deleted=False).iterator()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_order_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarListing',
+            fields=[
+                ('id', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('power', models.PositiveIntegerField()),
+                ('mileage', models.PositiveIntegerField()),
+                ('transmission', models.CharField(max_length=10)),
+                ('fuel_type', models.CharField(max_length=10)),
+                ('drive', models.CharField(max_length=10)),
+                ('title', models.CharField(max_length=100)),
+                ('price_display', models.CharField(max_length=32)),
+                ('mileage_display', models.CharField(max_length=32)),
+                ('transmission_display', models.CharField(max_length=32)),
+                ('photo_src', models.CharField(max_length=255)),
+                ('photo_jpeg_srcset', models.TextField(blank=True)),
+                ('photo_webp_srcset', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['price', 'id'], name='listing_price_idx'), models.Index(fields=['power', 'id'], name='listing_power_idx'), models.Index(fields=['mileage', 'id'], name='listing_mileage_idx')],
+            },
+        ),
+        migrations.RunPython(fill_listings, migrations.RunPython.noop),
+    ]
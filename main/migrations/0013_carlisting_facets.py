@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:52
+
+from bisect import bisect_right
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from django.template.defaultfilters import floatformat
+from django.utils.text import Truncator
+
+
+# Копии main.listings.listing_values и границ корзин main.facets.RANGE_FACETS
+# на момент этой миграции: последующие изменения модулей не должны менять
+# то, что она записывает.
+PRICE_BOUNDS = (1_000_000, 2_000_000, 3_000_000, 5_000_000, 8_000_000)
+MILEAGE_BOUNDS = (10_000, 50_000, 100_000, 150_000)
+
+
+def _photo_urls(car, fmt):
+    variants = (car.photo_derivatives or {}).get('card') or {}
+    return [(width, default_storage.url(name)) for width, name in variants.get(fmt, [])]
+
+
+def _srcset(urls):
+    return ', '.join(f'{url} {width}w' for width, url in urls)
+
+
+def listing_values(car):
+    jpeg, webp = _photo_urls(car, 'jpeg'), _photo_urls(car, 'webp')
+    return {
+        'price': car.price,
+        'power': car.power,
+        'mileage': car.mileage,
+        'transmission': car.transmission,
+        'fuel_type': car.fuel_type,
+        'drive': car.drive,
+        'color': car.color,
+        'price_bucket': bisect_right(PRICE_BOUNDS, car.price),
+        'mileage_bucket': bisect_right(MILEAGE_BOUNDS, car.mileage),
+        'title': Truncator(car.configuration).chars(40),
+        'price_display': f'{floatformat(car.price, 0)} руб.',
+        'mileage_display': f'{floatformat(car.mileage, 0)} км',
+        'transmission_display': car.get_transmission_display(),
+        'photo_src': jpeg[0][1] if jpeg else (car.photo.url if car.photo else ''),
+        'photo_jpeg_srcset': _srcset(jpeg),
+        'photo_webp_srcset': _srcset(webp),
+        'updated_at': car.updated_at,
+    }
+
+
+def refill_listings(apps, schema_editor):
+    Car = apps.get_model('main', 'Car')
+    CarListing = apps.get_model('main', 'CarListing')
+    CarListing.objects.all().delete()
+    CarListing.objects.bulk_create(
+        (CarListing(id=car.id, **listing_values(car)) for car in Car.objects.filter(is_deleted=False).iterator()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_carlisting'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='carlisting',
+            name='id',
+            field=models.IntegerField(primary_key=True, serialize=False),
+        ),
+        migrations.AddField(
+            model_name='carlisting',
+            name='color',
+            field=models.CharField(default='', max_length=50),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='carlisting',
+            name='mileage_bucket',
+            field=models.PositiveSmallIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='carlisting',
+            name='price_bucket',
+            field=models.PositiveSmallIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='carlisting',
+            index=models.Index(fields=['transmission', 'fuel_type', 'drive', 'color', 'price_bucket', 'mileage_bucket', 'price', 'mileage', 'power'], name='listing_facet_idx'),
+        ),
+        migrations.RunPython(refill_listings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Order = apps.get_model('main', 'Order')
+    OrderStatusCounter = apps.get_model('main', 'OrderStatusCounter')
+    counts = dict(Order.objects.values_list('status').annotate(count=Count('id')).order_by())
+    OrderStatusCounter.objects.bulk_create(
+        OrderStatusCounter(status=status, count=counts.get(status, 0))
+        for status, _ in Order._meta.get_field('status').choices
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_carlisting_facets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusCounter',
+            fields=[
+                ('status', models.CharField(choices=[('created', 'Создан'), ('processed', 'Обработан'), ('in_process', 'Авто в процессе'), ('in_delivery', 'Авто в доставке'), ('delivered', 'Доставлен'), ('completed', 'Завершён')], max_length=20, primary_key=True, serialize=False)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OrderStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('created', 'Создан'), ('processed', 'Обработан'), ('in_process', 'Авто в процессе'), ('in_delivery', 'Авто в доставке'), ('delivered', 'Доставлен'), ('completed', 'Завершён')], max_length=20)),
+                ('to_status', models.CharField(choices=[('created', 'Создан'), ('processed', 'Обработан'), ('in_process', 'Авто в процессе'), ('in_delivery', 'Авто в доставке'), ('delivered', 'Доставлен'), ('completed', 'Завершён')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='main.order')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['order', 'created_at'], name='order_status_event_idx')],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
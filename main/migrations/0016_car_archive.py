@@ -0,0 +1,93 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_deleted_at(apps, schema_editor):
+    # Точный момент удаления неизвестен; updated_at — не раньше него.
+    Car = apps.get_model('main', 'Car')
+    Car.objects.filter(is_deleted=True).update(deleted_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCar',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('stock_id', models.CharField(blank=True, max_length=64, null=True, verbose_name='Номер у поставщика')),
+                ('photo', models.CharField(blank=True, max_length=100, verbose_name='Фото')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Стоимость')),
+                ('power', models.PositiveIntegerField(verbose_name='Лошадиные силы')),
+                ('mileage', models.PositiveIntegerField(verbose_name='Пробег (км)')),
+                ('transmission', models.CharField(choices=[('auto', 'Автомат'), ('manual', 'Механика'), ('robot', 'Робот')], max_length=10, verbose_name='Коробка передач')),
+                ('color', models.CharField(max_length=50, verbose_name='Цвет')),
+                ('drive', models.CharField(choices=[('rear', 'Задний'), ('front', 'Передний'), ('full', 'Полный')], max_length=10, verbose_name='Привод')),
+                ('fuel_type', models.CharField(choices=[('petrol', 'Бензин'), ('diesel', 'Дизель'), ('electric', 'Электро'), ('hybrid', 'Гибрид')], max_length=10, verbose_name='Тип топлива')),
+                ('configuration', models.CharField(max_length=100, verbose_name='Название')),
+                ('configuration_desc', models.TextField(blank=True, verbose_name='Описание')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Помечен удалённым')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Перенесён в архив')),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='car',
+            name='car_active_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='car',
+            name='car_active_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='car',
+            name='car_active_power_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='car',
+            name='car_active_mileage_idx',
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Помечен удалённым'),
+        ),
+        migrations.RunPython(fill_deleted_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='car',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='main.car'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['id'], name='car_live_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['price', 'id'], name='car_live_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['power', 'id'], name='car_live_power_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['mileage', 'id'], name='car_live_mileage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='car_deleted_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='archived_car',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='order_items', to='main.archivedcar'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:38
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_cacheversion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='car',
+            name='car_live_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='car',
+            name='car_live_power_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='car',
+            name='car_live_mileage_idx',
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
+from django.utils import timezone
+
+from .images import ResponsivePhoto
 
 
 class ActiveCarManager(models.Manager):
@@ -72,6 +75,7 @@ class Car(models.Model):
     ]
 
     is_deleted = models.BooleanField(default=False)
+    stock_id = models.CharField("Номер у поставщика", max_length=64, unique=True, null=True, blank=True)
 
     photo = models.ImageField("Фото", upload_to='cars/')
     price = models.DecimalField("Стоимость", max_digits=10, decimal_places=2)
@@ -83,13 +87,113 @@ class Car(models.Model):
     fuel_type = models.CharField("Тип топлива", max_length=10, choices=FUEL_CHOICES)
     configuration = models.CharField("Название", max_length=100)
     configuration_desc = models.TextField("Описание", blank=True)
+    photo_derivatives = models.JSONField("Производные фото", default=dict, blank=True, editable=False)
+    updated_at = models.DateTimeField("Изменён", auto_now=True)
+    deleted_at = models.DateTimeField("Помечен удалённым", null=True, blank=True, editable=False)
 
     objects = ActiveCarManager()
     all_objects = models.Manager()
 
+    class Meta:
+        # Частичный индекс только по активным автомобилям: удалённые строки не
+        # раздувают его, а условие совпадает с фильтром ActiveCarManager.
+        # Сортировки каталога читают CarListing и его индексы, а не Car.
+        indexes = [
+            models.Index(fields=['id'], name='car_live_id_idx', condition=models.Q(is_deleted=False)),
+            # Кандидаты на архивацию (main.archive).
+            models.Index(fields=['deleted_at'], name='car_deleted_at_idx', condition=models.Q(is_deleted=True)),
+        ]
+
     def __str__(self):
         return f"{self.configuration} - {self.price} руб."
 
+    def sync_deleted_at(self, now=None):
+        """Ставит deleted_at при пометке удалённым и сбрасывает при восстановлении."""
+        if not self.is_deleted:
+            self.deleted_at = None
+        elif self.deleted_at is None:
+            self.deleted_at = now or timezone.now()
+
+    def save(self, *args, **kwargs):
+        self.sync_deleted_at()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'is_deleted' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'deleted_at'}
+        super().save(*args, **kwargs)
+
+    @property
+    def card_photo(self):
+        return ResponsivePhoto(self.photo, self.photo_derivatives.get('card'))
+
+    @property
+    def detail_photo(self):
+        return ResponsivePhoto(self.photo, self.photo_derivatives.get('detail'))
+
+
+class ArchivedCar(models.Model):
+    """Автомобиль, давно помеченный удалённым и перенесённый из Car (main.archive).
+
+    id совпадает с прежним id автомобиля. Позиции заказов после переноса
+    ссылаются на архив через OrderItem.archived_car.
+    """
+    id = models.IntegerField(primary_key=True)
+    stock_id = models.CharField("Номер у поставщика", max_length=64, null=True, blank=True)
+    photo = models.CharField("Фото", max_length=100, blank=True)
+    price = models.DecimalField("Стоимость", max_digits=10, decimal_places=2)
+    power = models.PositiveIntegerField("Лошадиные силы")
+    mileage = models.PositiveIntegerField("Пробег (км)")
+    transmission = models.CharField("Коробка передач", max_length=10, choices=Car.TRANSMISSION_CHOICES)
+    color = models.CharField("Цвет", max_length=50)
+    drive = models.CharField("Привод", max_length=10, choices=Car.DRIVE_CHOICES)
+    fuel_type = models.CharField("Тип топлива", max_length=10, choices=Car.FUEL_CHOICES)
+    configuration = models.CharField("Название", max_length=100)
+    configuration_desc = models.TextField("Описание", blank=True)
+    deleted_at = models.DateTimeField("Помечен удалённым", null=True, blank=True)
+    archived_at = models.DateTimeField("Перенесён в архив", default=timezone.now)
+
+    def __str__(self):
+        return f"{self.configuration} (архив)"
+
+
+class CarListing(models.Model):
+    """Готовая карточка активного автомобиля для каталога и поиска (см. main.listings).
+
+    id совпадает с id автомобиля. Поля фильтров и сортировок повторяют Car,
+    строки отображения и URL миниатюр посчитаны заранее.
+    """
+    # Просто integer: в SQLite такой первичный ключ совпадает с rowid и есть в каждом индексе.
+    id = models.IntegerField(primary_key=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    power = models.PositiveIntegerField()
+    mileage = models.PositiveIntegerField()
+    transmission = models.CharField(max_length=10)
+    fuel_type = models.CharField(max_length=10)
+    drive = models.CharField(max_length=10)
+    color = models.CharField(max_length=50)
+    price_bucket = models.PositiveSmallIntegerField()
+    mileage_bucket = models.PositiveSmallIntegerField()
+    title = models.CharField(max_length=100)
+    price_display = models.CharField(max_length=32)
+    mileage_display = models.CharField(max_length=32)
+    transmission_display = models.CharField(max_length=32)
+    photo_src = models.CharField(max_length=255)
+    photo_jpeg_srcset = models.TextField(blank=True)
+    photo_webp_srcset = models.TextField(blank=True)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['price', 'id'], name='listing_price_idx'),
+            models.Index(fields=['power', 'id'], name='listing_power_idx'),
+            models.Index(fields=['mileage', 'id'], name='listing_mileage_idx'),
+            # Покрывающий индекс счётчиков фасетов (main.facets): GROUP BY идёт по его порядку.
+            models.Index(fields=['transmission', 'fuel_type', 'drive', 'color', 'price_bucket', 'mileage_bucket',
+                                 'price', 'mileage', 'power'], name='listing_facet_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
 
 class CartItem(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cart_items')
@@ -115,11 +219,111 @@ class Order(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='created')
     address = models.TextField("Адрес доставки")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_idx'),
+        ]
+
+    # Статус при загрузке из базы и автор изменения для журнала OrderStatusEvent
+    # (см. сигнал track_order_status в main.signals).
+    _loaded_status = None
+    status_changed_by = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        order = super().from_db(db, field_names, values)
+        order._loaded_status = order.__dict__.get('status')
+        return order
+
     def __str__(self):
         return f"Заказ {self.id} - {self.user.first_name} {self.user.last_name}"
 
 
+class OrderStatusEvent(models.Model):
+    """Запись журнала смен статуса заказа. Журнал только дополняется.
+
+    from_status пуст у записи о создании заказа. changed_by пуст, если
+    статус сменился не из интерфейса персонала.
+    """
+    # Отдельный индекс по order не нужен: его заменяет (order, created_at).
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_events', db_index=False)
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, blank=True)
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='order_status_event_idx'),
+        ]
+
+
+class OrderStatusCounter(models.Model):
+    """Число заказов в каждом статусе, поддерживается при каждой смене (main.orders)."""
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, primary_key=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.status}: {self.count}'
+
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
-    car = models.ForeignKey(Car, on_delete=models.CASCADE)
-    quantity = models.PositiveIntegerField(default=1)
\ No newline at end of file
+    # После архивации автомобиля car пуст, а позиция ссылается на archived_car.
+    car = models.ForeignKey(Car, on_delete=models.SET_NULL, null=True, blank=True)
+    archived_car = models.ForeignKey(ArchivedCar, on_delete=models.PROTECT, null=True, blank=True,
+                                     related_name='order_items')
+    quantity = models.PositiveIntegerField(default=1)
+    price = models.DecimalField("Цена за единицу", max_digits=10, decimal_places=2, default=0)
+
+    @property
+    def product(self):
+        """Автомобиль позиции: из каталога или из архива."""
+        return self.car or self.archived_car
+
+
+class Job(models.Model):
+    """Фоновое задание очереди main.jobs; выполняется командой manage.py run_jobs."""
+    STATUS_CHOICES = [
+        ('queued', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Выполнено'),
+        ('failed', 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Обработчик выбирает готовые задания по run_at; выполненных в индексе нет.
+            models.Index(fields=['run_at', 'id'], name='job_queue_idx', condition=models.Q(status='queued')),
+            models.Index(fields=['status', '-id'], name='job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.id} ({self.status})'
+
+
+class CacheVersion(models.Model):
+    """Версия именованного набора данных для ключей кеша (main.caching).
+
+    Хранится в базе, а не в кеше: её увеличивают и процессы без общего кеша
+    с сайтом (run_jobs, команды импорта), и изменение становится видно
+    всем вместе с транзакцией, которая изменила данные.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField()
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
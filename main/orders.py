@@ -0,0 +1,153 @@
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Prefetch, Q, Value, When
+from django.utils import timezone
+
+from .models import CartItem, Order, OrderItem, OrderStatusCounter, OrderStatusEvent
+from .pagination import akeyset_paginate, keyset_paginate
+
+
+HISTORY_PAGE_SIZE = 20
+# Совпадает с индексом Order (user, created_at, id).
+HISTORY_ORDERING = ('-created_at', '-id')
+
+STATUS_BATCH_SIZE = 500
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class EmptyCartError(CheckoutError):
+    pass
+
+
+class CarUnavailableError(CheckoutError):
+    pass
+
+
+class CartChangedError(CheckoutError):
+    pass
+
+
+def place_order_from_cart(user):
+    """Оформляет заказ из корзины пользователя одной транзакцией.
+
+    Позиции заказа создаются одним bulk_create с зафиксированной ценой.
+    Корзина очищается только если она не менялась с момента чтения: если
+    параллельный запрос успел изменить количество или оформить те же позиции,
+    транзакция откатывается с CartChangedError.
+    """
+    with transaction.atomic():
+        items = list(
+            CartItem.objects.select_for_update()
+            .filter(user=user)
+            .select_related('car')
+            .order_by('id')
+        )
+        if not items:
+            raise EmptyCartError()
+        if any(item.car.is_deleted for item in items):
+            raise CarUnavailableError()
+
+        order = Order.objects.create(user=user, address=user.address)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, car=item.car, quantity=item.quantity, price=item.car.price)
+            for item in items
+        ])
+
+        snapshot = reduce(or_, (Q(id=item.id, quantity=item.quantity) for item in items))
+        deleted, _ = CartItem.objects.filter(snapshot, user=user).delete()
+        if deleted != len(items):
+            raise CartChangedError()
+    return order
+
+
+def order_history(user, status=None):
+    """Заказы пользователя с позициями и автомобилями: страница занимает два запроса."""
+    orders = user.orders.prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('car', 'archived_car').order_by('id')),
+    )
+    if status:
+        orders = orders.filter(status=status)
+    return orders
+
+
+def order_history_page(user, status=None, cursor=None, per_page=HISTORY_PAGE_SIZE):
+    return keyset_paginate(order_history(user, status), HISTORY_ORDERING, cursor, per_page)
+
+
+async def aorder_history_page(user, status=None, cursor=None, per_page=HISTORY_PAGE_SIZE):
+    return await akeyset_paginate(order_history(user, status), HISTORY_ORDERING, cursor, per_page)
+
+
+def status_counts():
+    """[(статус, название, число заказов)] из OrderStatusCounter, без COUNT(*) по заказам."""
+    counts = dict(OrderStatusCounter.objects.values_list('status', 'count'))
+    return [(status, label, counts.get(status, 0)) for status, label in Order.STATUS_CHOICES]
+
+
+def recount_order_statuses():
+    """Пересчитывает счётчики статусов одним GROUP BY по заказам.
+
+    Нужен после изменений заказов в обход save() и transition_orders —
+    bulk_create, update() по queryset, правки в базе вручную.
+    """
+    counts = dict(Order.objects.values_list('status').annotate(count=Count('id')).order_by())
+    OrderStatusCounter.objects.bulk_create(
+        [OrderStatusCounter(status=status, count=counts.get(status, 0)) for status, _ in Order.STATUS_CHOICES],
+        update_conflicts=True, unique_fields=['status'], update_fields=['count'],
+    )
+    return counts
+
+
+def adjust_status_counters(deltas):
+    """Прибавляет к счётчикам {статус: изменение} одним UPDATE."""
+    deltas = {status: delta for status, delta in deltas.items() if status and delta}
+    if not deltas:
+        return
+    change = Case(*(When(status=status, then=Value(delta)) for status, delta in deltas.items()),
+                  output_field=IntegerField())
+    if OrderStatusCounter.objects.filter(status__in=list(deltas)).update(count=F('count') + change) < len(deltas):
+        # Строки счётчика нет (новый статус или пустая таблица) — пересчёт создаст все строки.
+        recount_order_statuses()
+
+
+def record_status_change(order, from_status, changed_by=None):
+    """Журнал и счётчики для заказа, сохранённого через save(); вызывается из сигнала post_save."""
+    OrderStatusEvent.objects.create(order=order, from_status=from_status or '', to_status=order.status,
+                                    changed_by=changed_by)
+    adjust_status_counters({from_status: -1, order.status: 1})
+
+
+def transition_orders(order_ids, status, changed_by=None):
+    """Переводит заказы order_ids в статус status.
+
+    На всю пачку — SELECT текущих статусов, один UPDATE заказов, один INSERT
+    в журнал и один UPDATE счётчиков, сколько бы заказов в ней ни было.
+    Заказы, уже находящиеся в статусе status, пропускаются. Возвращает число
+    переведённых заказов.
+    """
+    if status not in dict(Order.STATUS_CHOICES):
+        raise ValueError(f'Неизвестный статус заказа: {status}')
+    with transaction.atomic():
+        current = dict(
+            Order.objects.select_for_update().filter(id__in=order_ids).exclude(status=status)
+            .values_list('id', 'status')
+        )
+        if not current:
+            return 0
+        Order.objects.filter(id__in=list(current)).update(status=status)
+        now = timezone.now()
+        OrderStatusEvent.objects.bulk_create([
+            OrderStatusEvent(order_id=order_id, from_status=from_status, to_status=status,
+                             changed_by=changed_by, created_at=now)
+            for order_id, from_status in current.items()
+        ])
+        deltas = {status: len(current)}
+        for from_status in current.values():
+            deltas[from_status] = deltas.get(from_status, 0) - 1
+        adjust_status_counters(deltas)
+    return len(current)
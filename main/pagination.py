@@ -0,0 +1,137 @@
+import datetime
+import json
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+CURSOR_SALT = 'main.pagination.cursor'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CountedPaginator(Paginator):
+    """Paginator с заранее известным числом объектов — без SELECT COUNT(*) по всей таблице."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        return self._count
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder обрезает время до миллисекунд; в курсоре нужна полная точность."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _cursor_salt(ordering):
+    # Курсор подписывается вместе с сортировкой: курсор price_asc, присланный
+    # с sort=power_desc, не пройдёт проверку подписи.
+    return f'{CURSOR_SALT}:{",".join(ordering)}'
+
+
+def encode_cursor(values, ordering):
+    values = json.loads(json.dumps(list(values), cls=CursorEncoder))
+    return signing.dumps(values, salt=_cursor_salt(ordering), compress=True)
+
+
+def decode_cursor(cursor, ordering):
+    try:
+        values = signing.loads(cursor, salt=_cursor_salt(ordering))
+    except signing.BadSignature:
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor(cursor)
+    return values
+
+
+def _parse_ordering(ordering):
+    return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+
+def _value(obj, name):
+    if isinstance(obj, dict):
+        return obj[name]
+    return getattr(obj, name)
+
+
+def keyset_filter(ordering, values):
+    """Условие «строго после курсора» для сортировки ordering.
+
+    Первый ключ дублируется диапазонным условием (>= / <=), чтобы база могла
+    начать чтение индекса с нужного места, а не разбирать OR целиком.
+    """
+    fields = _parse_ordering(ordering)
+    condition = Q()
+    equal = Q()
+    for (name, descending), value in zip(fields, values):
+        lookup = 'lt' if descending else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    first_name, first_desc = fields[0]
+    seek = Q(**{f'{first_name}__{"lte" if first_desc else "gte"}': values[0]})
+    return seek & condition
+
+
+def _page_queryset(queryset, ordering, cursor, per_page):
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, ordering)
+        try:
+            queryset = queryset.filter(keyset_filter(ordering, values))
+        except (TypeError, ValueError, ValidationError):
+            raise InvalidCursor(cursor)
+    return queryset[:per_page + 1]
+
+
+def _make_page(items, ordering, per_page):
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor((_value(items[-1], name) for name, _ in _parse_ordering(ordering)), ordering)
+    return KeysetPage(items, next_cursor)
+
+
+def keyset_paginate(queryset, ordering, cursor=None, per_page=24):
+    """Страница queryset по курсору.
+
+    ordering должен заканчиваться уникальным полем (обычно id), иначе
+    страницы могут терять или дублировать строки с равными ключами.
+    """
+    queryset = _page_queryset(queryset, ordering, cursor, per_page)
+    return _make_page(list(queryset), ordering, per_page)
+
+
+async def akeyset_paginate(queryset, ordering, cursor=None, per_page=24):
+    """Асинхронный вариант keyset_paginate для async-view."""
+    queryset = _page_queryset(queryset, ordering, cursor, per_page)
+    return _make_page([item async for item in queryset], ordering, per_page)
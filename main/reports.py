@@ -0,0 +1,166 @@
+"""Выгрузки заказов и сводные отчёты для персонала.
+
+Выгрузки читают базу через iterator(chunk_size) и отдают строки по мере
+чтения, поэтому память не зависит от числа заказов. Сводные отчёты
+считаются одним GROUP BY в SQL по цене, зафиксированной в OrderItem.
+Данные автомобиля берутся из Car или, после архивации, из ArchivedCar.
+"""
+import datetime
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Car, Order, OrderItem
+from .streaming import stream_rows
+
+
+EXPORT_CHUNK_SIZE = 2000
+REPORT_TIME_LIMIT = 30
+
+_money = DecimalField(max_digits=14, decimal_places=2)
+LINE_TOTAL = ExpressionWrapper(F('price') * F('quantity'), output_field=_money)
+
+
+def _car_field(name):
+    return Coalesce(f'car__{name}', f'archived_car__{name}')
+
+
+CAR_COLUMNS = {
+    'car_ref': Coalesce('car_id', 'archived_car_id'),
+    'car_stock_id': _car_field('stock_id'),
+    'car_configuration': _car_field('configuration'),
+    'car_fuel_type': _car_field('fuel_type'),
+}
+
+ORDER_COLUMNS = (
+    ('id', 'Номер'),
+    ('created_at', 'Создан'),
+    ('status', 'Статус'),
+    ('user__phone', 'Телефон'),
+    ('user__last_name', 'Фамилия'),
+    ('user__first_name', 'Имя'),
+    ('address', 'Адрес'),
+    ('item_count', 'Автомобилей'),
+    ('total', 'Сумма'),
+)
+
+ITEM_COLUMNS = (
+    ('order_id', 'Заказ'),
+    ('order__created_at', 'Создан'),
+    ('order__status', 'Статус'),
+    ('order__user__phone', 'Телефон'),
+    ('car_ref', 'Автомобиль'),
+    ('car_stock_id', 'Номер у поставщика'),
+    ('car_configuration', 'Название'),
+    ('car_fuel_type', 'Тип топлива'),
+    ('quantity', 'Количество'),
+    ('price', 'Цена'),
+    ('line_total', 'Сумма'),
+)
+
+
+def _day_bounds(date_from, date_to):
+    """Границы периода в текущем часовом поясе; date_to включительно."""
+    tz = timezone.get_current_timezone()
+    start = datetime.datetime.combine(date_from, datetime.time.min, tz) if date_from else None
+    end = datetime.datetime.combine(date_to + datetime.timedelta(days=1), datetime.time.min, tz) if date_to else None
+    return start, end
+
+
+def order_filters(filters, prefix=''):
+    """Условия фильтра по статусу и периоду для Order (prefix='') или OrderItem (prefix='order__')."""
+    conditions = {}
+    if filters.get('status'):
+        conditions[f'{prefix}status'] = filters['status']
+    start, end = _day_bounds(filters.get('date_from'), filters.get('date_to'))
+    if start:
+        conditions[f'{prefix}created_at__gte'] = start
+    if end:
+        conditions[f'{prefix}created_at__lt'] = end
+    return conditions
+
+
+def export_orders(fmt, filters):
+    queryset = (
+        Order.objects.filter(**order_filters(filters))
+        .annotate(
+            item_count=Sum('items__quantity'),
+            total=Sum(F('items__price') * F('items__quantity'), output_field=_money),
+        )
+        .order_by('created_at', 'id')
+    )
+    return _export(fmt, queryset, ORDER_COLUMNS)
+
+
+def export_order_items(fmt, filters):
+    queryset = (
+        OrderItem.objects.filter(**order_filters(filters, 'order__'))
+        .annotate(line_total=LINE_TOTAL, **CAR_COLUMNS)
+        .order_by('order__created_at', 'order_id', 'id')
+    )
+    return _export(fmt, queryset, ITEM_COLUMNS)
+
+
+def _export(fmt, queryset, columns):
+    fields = [name for name, _ in columns]
+    rows = queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return stream_rows(fmt, [title for _, title in columns], rows)
+
+
+def _revenue(queryset):
+    return queryset.annotate(
+        orders=Count('order', distinct=True),
+        cars=Sum('quantity'),
+        revenue=Sum(LINE_TOTAL),
+    )
+
+
+def revenue_report(filters):
+    """Выручка по дням, типу топлива и статусу заказа; каждая таблица — один запрос."""
+    items = OrderItem.objects.filter(**order_filters(filters, 'order__'))
+    with query_time_limit(REPORT_TIME_LIMIT):
+        report = {
+            'by_day': list(_revenue(items.annotate(day=TruncDate('order__created_at')).values('day'))
+                           .order_by('day')),
+            'by_fuel': list(_revenue(items.values(fuel_type=CAR_COLUMNS['car_fuel_type'])).order_by('-revenue')),
+            'by_status': list(_revenue(items.values('order__status')).order_by('order__status')),
+        }
+    fuel_labels, status_labels = dict(Car.FUEL_CHOICES), dict(Order.STATUS_CHOICES)
+    for row in report['by_fuel']:
+        row['label'] = fuel_labels.get(row['fuel_type'], row['fuel_type'])
+    for row in report['by_status']:
+        row['label'] = status_labels.get(row['order__status'], row['order__status'])
+    return report
+
+
+class ReportTimeout(Exception):
+    pass
+
+
+@contextmanager
+def query_time_limit(seconds):
+    """Прерывает SQL, выполняющийся дольше seconds, исключением ReportTimeout.
+
+    Отчёт за слишком большой период не должен занимать поток запроса на
+    минуты. Работает на SQLite через progress handler; на других базах
+    ограничение не применяется.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    connection.ensure_connection()
+    raw = connection.connection
+    deadline = time.monotonic() + seconds
+    raw.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+    try:
+        yield
+    except Exception as exc:
+        if time.monotonic() > deadline and 'interrupted' in str(exc):
+            raise ReportTimeout from exc
+        raise
+    finally:
+        raw.set_progress_handler(None, 0)
@@ -0,0 +1,182 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .caching import get_version, record
+from .models import Car, CarListing
+from .stemmer import stem, stem_text, tokenize
+
+
+SEARCH_CACHE_TIMEOUT = 60 * 10
+
+# Предлоги и союзы есть почти в каждом описании: поиск по ним ничего не
+# сужает, а ранжировать пришлось бы большую часть каталога. Однобуквенные
+# токены отбрасываются по той же причине.
+STOP_WORDS = frozenset({
+    'а', 'без', 'в', 'во', 'для', 'до', 'за', 'и', 'из', 'или', 'к', 'ко', 'на', 'над', 'не', 'но', 'о',
+    'об', 'от', 'по', 'под', 'при', 'про', 'с', 'со', 'у',
+})
+
+
+def search_terms(query):
+    """Значимые токены запроса: без служебных слов и однобуквенных."""
+    return [token for token in tokenize(query) if len(token) > 1 and token not in STOP_WORDS]
+
+
+class SearchBackend:
+    """Интерфейс поискового индекса по каталогу.
+
+    Индекс хранит только активные автомобили; search возвращает id
+    в порядке убывания релевантности.
+    """
+
+    def index(self, cars):
+        raise NotImplementedError
+
+    def remove(self, car_ids):
+        raise NotImplementedError
+
+    def search(self, query, limit=20, prefix=False):
+        raise NotImplementedError
+
+    def rebuild(self, batch_size=1000):
+        self.clear()
+        batch = []
+        for car in Car.objects.only('id', 'configuration', 'configuration_desc').iterator(chunk_size=batch_size):
+            batch.append(car)
+            if len(batch) >= batch_size:
+                self.index(batch)
+                batch = []
+        if batch:
+            self.index(batch)
+
+    def clear(self):
+        pass
+
+    def update(self, cars):
+        """Переиндексирует автомобили, убирая из индекса удалённые."""
+        cars = list(cars)
+        self.remove([car.id for car in cars if car.is_deleted])
+        self.index([car for car in cars if not car.is_deleted])
+
+
+class BasicSearchBackend(SearchBackend):
+    """Поиск без индекса через icontains — для баз без полнотекстового поиска."""
+
+    def index(self, cars):
+        pass
+
+    def remove(self, car_ids):
+        pass
+
+    def search(self, query, limit=20, prefix=False):
+        condition = Q()
+        for token in search_terms(query):
+            condition &= Q(configuration__icontains=token) | Q(configuration_desc__icontains=token)
+        if not condition:
+            return []
+        return list(Car.objects.filter(condition).order_by('-id').values_list('id', flat=True)[:limit])
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Индекс на виртуальной таблице SQLite FTS5 (создаётся миграцией).
+
+    В таблицу пишутся основы слов (см. main.stemmer), rowid совпадает с id
+    автомобиля. Название весит больше описания при ранжировании bm25.
+    """
+
+    table = 'main_car_fts'
+    weights = (10.0, 1.0)
+
+    def index(self, cars):
+        rows = [(car.id, stem_text(car.configuration), stem_text(car.configuration_desc)) for car in cars]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, configuration, configuration_desc) VALUES (%s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, car_ids):
+        if not car_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(car_id,) for car_id in car_ids])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def build_match(self, query, prefix=False):
+        terms = [stem(token) for token in search_terms(query)]
+        terms = [term for term in terms if term]
+        if not terms:
+            return ''
+        quoted = [f'"{term}"' for term in terms]
+        # Префиксом ищется только последнее набранное слово, если оно не отброшено.
+        if prefix and search_terms(tokenize(query)[-1]):
+            quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def search(self, query, limit=20, prefix=False):
+        match = self.build_match(query, prefix)
+        if not match:
+            return []
+        weights = ', '.join(str(weight) for weight in self.weights)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, {weights}) LIMIT %s',
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def get_search_backend():
+    path = getattr(settings, 'CAR_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    return BasicSearchBackend()
+
+
+def search_ids(query, limit=20, prefix=False):
+    """id найденных автомобилей; результат кешируется до изменения каталога.
+
+    bm25 ранжирует все совпадения, и на частом слове («bmw», «салон») это
+    10–25 мс на 100 тыс. автомобилей. Подсказки повторяют одни и те же
+    префиксы, поэтому готовый список id берётся из кеша по версии каталога.
+    """
+    if not search_terms(query):
+        return []
+    state = f'{get_version("catalog")}|{int(prefix)}|{limit}|{" ".join(tokenize(query))}'
+    key = f'search:{hashlib.md5(state.encode()).hexdigest()}'
+    ids = cache.get(key)
+    if ids is None:
+        record('search', 'miss')
+        ids = get_search_backend().search(query, limit=limit, prefix=prefix)
+        cache.set(key, ids, SEARCH_CACHE_TIMEOUT)
+    else:
+        record('search', 'hit')
+    return ids
+
+
+def search_cars(query, limit=20, prefix=False):
+    """Активные автомобили по запросу в порядке релевантности."""
+    ids = search_ids(query, limit=limit, prefix=prefix)
+    cars = Car.objects.in_bulk(ids)
+    return [cars[car_id] for car_id in ids if car_id in cars]
+
+
+def search_listings(query, limit=20):
+    """Карточки CarListing найденных автомобилей в порядке релевантности."""
+    ids = search_ids(query, limit=limit)
+    listings = CarListing.objects.in_bulk(ids)
+    return [listings[car_id] for car_id in ids if car_id in listings]
@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .caching import bump_version
+from .listings import remove_listings, sync_listings
+from .metrics import record_query
+from .middleware import mark_session_fresh
+from .models import Car, Order, User
+from .orders import adjust_status_counters, record_status_change
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Car)
+def index_car(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    get_search_backend().update([instance])
+
+
+@receiver(post_delete, sender=Car)
+def unindex_car(sender, instance, **kwargs):
+    get_search_backend().remove([instance.id])
+
+
+@receiver(post_migrate)
+def fill_search_index(sender, plan=None, **kwargs):
+    """Заполняет поисковый индекс, если migrate только что создал его (0007_car_search_index)."""
+    if sender.label != 'main':
+        return
+    if any(migration.app_label == 'main' and migration.name == '0007_car_search_index' and not backwards
+           for migration, backwards in plan or []):
+        get_search_backend().rebuild()
+
+
+@receiver(post_save, sender=Car)
+def refresh_listing(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sync_listings([instance])
+
+
+@receiver(post_delete, sender=Car)
+def drop_listing(sender, instance, **kwargs):
+    remove_listings([instance.id])
+
+
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+def invalidate_car_pages(sender, instance, **kwargs):
+    bump_version('catalog', f'car:{instance.id}')
+
+
+@receiver(post_save, sender=Order)
+def track_order_status(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else instance._loaded_status
+    if created or (previous is not None and previous != instance.status):
+        record_status_change(instance, previous, instance.status_changed_by)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Order)
+def untrack_order_status(sender, instance, **kwargs):
+    adjust_status_counters({instance._loaded_status or instance.status: -1})
+
+
+@receiver(connection_created)
+def track_queries(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(user_logged_in, dispatch_uid='update_last_login')
+def update_last_login(sender, user, request=None, **kwargs):
+    """Замена django.contrib.auth.models.update_last_login (отключается в MainConfig.ready).
+
+    last_login пишется не чаще раза в LAST_LOGIN_UPDATE_INTERVAL секунд и
+    одним UPDATE одной колонки вместо user.save(). Сессия после входа
+    сохраняется в любом случае, поэтому в неё сразу ставится отметка продления.
+    """
+    if request is not None and hasattr(request, 'session'):
+        mark_session_fresh(request.session)
+    now = timezone.now()
+    interval = settings.LAST_LOGIN_UPDATE_INTERVAL
+    if user.last_login and (now - user.last_login).total_seconds() < interval:
+        return
+    user.last_login = now
+    User.objects.filter(pk=user.pk).update(last_login=now)
@@ -0,0 +1,154 @@
+"""Раздача статики и медиа с хешированными именами, сжатием и условными GET.
+
+collectstatic через CompressedManifestStaticFilesStorage кладёт в
+STATIC_ROOT файлы с хешем содержимого в имени (styles.3f2a1b9c0d4e.css) и
+рядом их сжатые копии .gz и, если установлен пакет brotli, .br. Такой файл
+никогда не меняется, поэтому отдаётся с Cache-Control: immutable на год.
+Производные фото в MEDIA_ROOT тоже содержат хеш в имени (main.images).
+Файлы без хеша кешируются на STATIC_MAX_AGE и перепроверяются по ETag.
+"""
+import gzip
+import mimetypes
+import os
+import re
+import stat
+from email.utils import formatdate
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # сжатие brotli необязательно
+    brotli = None
+
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.xml', '.html', '.ico'}
+# Сжатая копия, которая меньше оригинала менее чем на 5%, не стоит отдельного файла.
+MIN_COMPRESSION_RATIO = 0.95
+
+# (расширение файла, значение Content-Encoding) в порядке предпочтения.
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+
+# Хеш, который ManifestStaticFilesStorage и main.images добавляют к имени файла.
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def _write_if_smaller(path, original, compressed):
+    if len(compressed) < len(original) * MIN_COMPRESSION_RATIO:
+        with open(path, 'wb') as fh:
+            fh.write(compressed)
+        return True
+    return False
+
+
+def compress_file(path):
+    """Пишет рядом с файлом path.gz и path.br; возвращает список созданных путей."""
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+        return []
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    created = []
+    if _write_if_smaller(path + '.gz', data, gzip.compress(data, compresslevel=9, mtime=0)):
+        created.append(path + '.gz')
+    if brotli is not None and _write_if_smaller(path + '.br', data, brotli.compress(data)):
+        created.append(path + '.br')
+    return created
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage, который после collectstatic сжимает собранные файлы."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        compressed = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not dry_run and hashed_name and not isinstance(processed, Exception):
+                for stored in (name, hashed_name):
+                    if stored not in compressed:
+                        compressed.add(stored)
+                        compress_file(self.path(stored))
+            yield name, hashed_name, processed
+
+
+def _etag(stat_result):
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def _accepted_encodings(request):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        quality = params.strip().removeprefix('q=')
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _stat_file(path):
+    try:
+        result = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    return result if stat.S_ISREG(result.st_mode) else None
+
+
+def find_file(root, relative_path):
+    """Путь и stat обычного файла внутри root или None; выход за пределы root — None."""
+    if not root or not relative_path or relative_path.endswith('/'):
+        return None
+    try:
+        path = safe_join(root, relative_path)
+    except (SuspiciousFileOperation, ValueError):
+        return None
+    result = _stat_file(path)
+    return (path, result) if result else None
+
+
+def cache_control(name, max_age):
+    if HASHED_NAME.search(name):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={max_age}'
+
+
+def serve_file(request, path, stat_result, max_age):
+    """Ответ с файлом: сжатая копия по Accept-Encoding, ETag, Last-Modified и 304."""
+    name = os.path.basename(path)
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    compressible = os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS
+    encoding = None
+    if compressible:
+        accepted = _accepted_encodings(request)
+        for suffix, coding in ENCODINGS:
+            variant = _stat_file(path + suffix) if coding in accepted else None
+            if variant:
+                path, stat_result, encoding = path + suffix, variant, coding
+                break
+
+    etag = _etag(stat_result)
+    last_modified = int(stat_result.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=content_type)
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+            del response['Content-Disposition']
+        response['Content-Length'] = stat_result.st_size
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = formatdate(last_modified, usegmt=True)
+    response['Cache-Control'] = cache_control(name, max_age)
+    if compressible:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,154 @@
+"""Стеммер Snowball для русского языка и разбиение текста на токены для поиска.
+
+Реализация следует описанию алгоритма на snowballstem.org/algorithms/russian.
+Латинские слова и числа (BMW, 320i, xDrive) не стеммируются, а только
+приводятся к нижнему регистру.
+"""
+import re
+
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('вшись', 'вши', 'в'),
+    ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв'),
+)
+ADJECTIVE = (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой',
+    'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    ('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н'),
+    ('ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло', 'ено', 'ует', 'уют',
+     'ены', 'ить', 'ыть', 'ишь', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю'),
+)
+NOUN = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие', 'ье', 'еи', 'ии', 'ей', 'ой',
+    'ий', 'ям', 'ем', 'ам', 'ом', 'ах', 'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у',
+    'ы', 'ь', 'ю', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+CYRILLIC_RE = re.compile('^[а-я]+$')
+
+
+def _by_length(suffixes):
+    return tuple(sorted(suffixes, key=len, reverse=True))
+
+
+PERFECTIVE_GERUND = tuple(_by_length(group) for group in PERFECTIVE_GERUND)
+ADJECTIVE = _by_length(ADJECTIVE)
+PARTICIPLE = tuple(_by_length(group) for group in PARTICIPLE)
+VERB = tuple(_by_length(group) for group in VERB)
+NOUN = _by_length(NOUN)
+
+
+def _regions(word):
+    """Позиции начала областей RV и R2."""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _remove(rv, suffixes):
+    for suffix in suffixes:
+        if rv.endswith(suffix):
+            return rv[:-len(suffix)]
+    return None
+
+
+def _remove_grouped(rv, groups):
+    """Снимает окончание: первая группа допустима только после «а» или «я»."""
+    first, second = groups
+    for suffix in sorted(first + second, key=len, reverse=True):
+        if not rv.endswith(suffix):
+            continue
+        stem = rv[:-len(suffix)]
+        if suffix in second:
+            return stem
+        if stem.endswith(('а', 'я')):
+            return stem
+    return None
+
+
+def _remove_adjectival(rv):
+    stem = _remove(rv, ADJECTIVE)
+    if stem is None:
+        return None
+    participle = _remove_grouped(stem, PARTICIPLE)
+    return stem if participle is None else participle
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC_RE.match(word):
+        return word
+    start, r2 = _regions(word)
+    prefix, rv = word[:start], word[start:]
+    r2 = max(r2 - start, 0)
+
+    # Шаг 1
+    result = _remove_grouped(rv, PERFECTIVE_GERUND)
+    if result is None:
+        reflexive = _remove(rv, REFLEXIVE)
+        if reflexive is not None:
+            rv = reflexive
+        for step in (_remove_adjectival,
+                     lambda value: _remove_grouped(value, VERB),
+                     lambda value: _remove(value, NOUN)):
+            result = step(rv)
+            if result is not None:
+                break
+        else:
+            result = rv
+    rv = result
+
+    # Шаг 2
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательный суффикс должен целиком лежать в R2
+    for suffix in DERIVATIONAL:
+        if rv.endswith(suffix) and len(rv) - len(suffix) >= r2:
+            rv = rv[:-len(suffix)]
+            break
+
+    # Шаг 4
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        superlative = _remove(rv, SUPERLATIVE)
+        if superlative is not None:
+            rv = superlative
+            if rv.endswith('нн'):
+                rv = rv[:-1]
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+
+    return prefix + rv
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower().replace('ё', 'е'))
+
+
+def stem_text(text):
+    return ' '.join(stem(token) for token in tokenize(text))
@@ -0,0 +1,82 @@
+"""Потоковая запись CSV и JSONL: строки отдаются по одной, без сборки файла в памяти."""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: write возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def excel_csv_lines(header, rows):
+    """CSV для Excel с русской локалью: BOM, чтобы кириллица открылась как UTF-8, и разделитель «;»."""
+    writer = csv.writer(_Echo(), delimiter=';')
+    yield '\ufeff' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(header, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+FORMATS = {
+    'csv': (csv_lines, 'text/csv', 'csv'),
+    'excel': (excel_csv_lines, 'text/csv', 'csv'),
+    'jsonl': (jsonl_lines, 'application/x-ndjson', 'jsonl'),
+}
+
+
+def stream_rows(fmt, header, rows):
+    """Итератор строк файла в формате fmt (csv, excel или jsonl)."""
+    return FORMATS[fmt][0](header, rows)
+
+
+def content_type(fmt):
+    return f'{FORMATS[fmt][1]}; charset=utf-8'
+
+
+def extension(fmt):
+    return FORMATS[fmt][2]
+
+
+def streaming_download(lines, fmt, filename):
+    """Ответ-вложение, который отдаёт строки по мере генерации."""
+    response = StreamingHttpResponse(lines, content_type=content_type(fmt))
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension(fmt)}"'
+    return response
+
+
+def read_rows(fh, fmt):
+    """Читает текстовый поток построчно и отдаёт пары (номер строки, словарь).
+
+    Для CSV номер — номер записи с учётом заголовка, для JSONL — номер строки.
+    Строку JSONL, которая не разбирается, отдаёт как исключение ValueError вместо словаря.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(fh)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(fh, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, ValueError(f'некорректный JSON: {exc}')
+            continue
+        yield number, row if isinstance(row, dict) else ValueError('ожидался JSON-объект')
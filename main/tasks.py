@@ -0,0 +1,11 @@
+"""Фоновые задания сайта; ставятся через main.jobs.enqueue()."""
+from .images import build_photo_derivatives
+from .jobs import task
+from .models import Car
+
+
+@task('build_car_photos')
+def build_car_photos(car_ids, force=False):
+    """Превью и srcset-производные фото; уже собранные для того же исходника пропускаются."""
+    for car in Car.all_objects.filter(id__in=car_ids).exclude(photo='').order_by('id'):
+        build_photo_derivatives(car, force=force)
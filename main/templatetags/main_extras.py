@@ -0,0 +1,48 @@
+from functools import lru_cache
+
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from ..models import Order
+
+
+register = template.Library()
+
+STATUS_LABELS = dict(Order.STATUS_CHOICES)
+STATUS_BADGE_CLASSES = {
+    'created': 'bg-info text-dark',
+    'processed': 'bg-warning text-dark',
+    'in_process': 'bg-primary',
+    'in_delivery': 'bg-primary',
+    'delivered': 'bg-success',
+    'completed': 'bg-secondary',
+}
+
+
+@register.simple_tag(takes_context=True)
+def page_query(context, param, number):
+    """Текущая строка запроса с заменённым номером страницы param."""
+    query = context['request'].GET.copy()
+    query[param] = number
+    return query.urlencode()
+
+
+# Статусов несколько, поэтому готовая разметка на каждый хранится в lru_cache:
+# в списке из сотен заказов тег сводится к поиску в словаре.
+@register.simple_tag
+@lru_cache(maxsize=None)
+def status_badge(status, extra_class=''):
+    """Бейдж статуса заказа: цвет из STATUS_BADGE_CLASSES, подпись из Order.STATUS_CHOICES."""
+    classes = STATUS_BADGE_CLASSES.get(status, 'bg-danger')
+    if extra_class:
+        classes = f'{classes} {extra_class}'
+    return format_html('<span class="badge {}">{}</span>', classes, STATUS_LABELS.get(status, status))
+
+
+@register.simple_tag
+@lru_cache(maxsize=None)
+def status_options(selected):
+    """<option> всех статусов заказа с отмеченным selected."""
+    return format_html_join('', '<option value="{}"{}>{}</option>', (
+        (status, ' selected' if status == selected else '', label) for status, label in Order.STATUS_CHOICES
+    ))
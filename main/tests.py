@@ -1,3 +1,1076 @@
-from django.test import TestCase
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .api import catalog_etag
+from .archive import archive_deleted_cars
+from .bench.data import generate
+from .bench.runner import SCENARIOS, BenchFixture, compare_results, run_scenario
+from . import caching
+from .caching import cache_stats
+from .catalog import catalog_page, get_ordering
+from .facets import catalog_facets, compute_facets
+from .images import build_photo_derivatives
+from .inventory import import_cars
+from .jobs import TASKS, enqueue, requeue_stale, run_pending, serve
+from .listings import rebuild_listings
+from .middleware import SESSION_REFRESHED_KEY, SessionRefreshMiddleware
+from .models import Car, CarListing, CartItem, Job, Order, OrderItem, OrderStatusEvent, User
+from .cart import SESSION_CART_KEY, add_car_to_cart, change_cart_item, merge_session_cart
+from .orders import CheckoutError, place_order_from_cart, recount_order_statuses, status_counts, transition_orders
+from .pagination import InvalidCursor, encode_cursor
+from .reports import revenue_report
+from .search import get_search_backend, search_cars
+
+
+def make_car(**kwargs):
+    fields = {
+        'photo': 'cars/test.jpg',
+        'price': Decimal('1000000'),
+        'power': 150,
+        'mileage': 50000,
+        'transmission': 'auto',
+        'color': 'Черный',
+        'drive': 'rear',
+        'fuel_type': 'petrol',
+        'configuration': 'BMW 320i',
+    }
+    fields.update(kwargs)
+    return Car.objects.create(**fields)
+
+
+def make_user(phone, **kwargs):
+    return User.objects.create_user(phone=phone, first_name='Иван', **kwargs)
+
+
+class CatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_keyset_pages_cover_every_car_once(self):
+        cars = [make_car(price=Decimal(1000 * (i % 5))) for i in range(23)]
+        seen = []
+        cursor = None
+        while True:
+            page = catalog_page({'sort': 'price_asc'}, cursor, per_page=5)
+            seen.extend(car.id for car in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        expected = [car.id for car in sorted(cars, key=lambda c: (c.price, c.id))]
+        self.assertEqual(seen, expected)
+
+    def test_filters_and_deleted_cars(self):
+        make_car(transmission='manual', power=300)
+        make_car(transmission='auto', power=300)
+        make_car(transmission='manual', power=100)
+        make_car(transmission='manual', power=300, is_deleted=True)
+        page = catalog_page({'transmission': 'manual', 'power_min': 200})
+        self.assertEqual(len(page), 1)
+
+    def test_catalog_view_ignores_tampered_cursor(self):
+        make_car()
+        response = self.client.get(reverse('catalog'), {'cursor': 'garbage', 'price_min': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cars']), 1)
+
+    def test_cursor_is_bound_to_sort_order(self):
+        for i in range(3):
+            make_car(price=Decimal('1000011.50') + i, power=100 + i, mileage=1000 * i)
+        cursor = catalog_page({'sort': 'price_asc'}, per_page=1).next_cursor
+        for sort in ('power_desc', 'mileage_asc'):
+            with self.assertRaises(InvalidCursor):
+                catalog_page({'sort': sort}, cursor, per_page=1)
+            response = self.client.get(reverse('catalog'), {'sort': sort, 'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(reverse('catalog_api'), {'sort': sort, 'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+
+        forged = encode_cursor(['1000011.50', 1], get_ordering('power_desc'))
+        with self.assertRaises(InvalidCursor):
+            catalog_page({'sort': 'power_desc'}, forged)
+
+    def test_listing_follows_car_changes(self):
+        car = make_car(configuration='Mercedes-Benz E 300 de 4MATIC All-Terrain Exclusive', mileage=12500)
+        listing = CarListing.objects.get(id=car.id)
+        self.assertEqual((listing.title, listing.mileage_display), ('Mercedes-Benz E 300 de 4MATIC All-Terra…', '12500 км'))
+        car.price = Decimal('2500000.50')
+        car.save()
+        self.assertEqual(CarListing.objects.get(id=car.id).price_display, '2500001 руб.')
+        car.is_deleted = True
+        car.save()
+        self.assertFalse(CarListing.objects.exists())
+        car.is_deleted = False
+        car.save()
+        self.assertEqual(rebuild_listings(), 1)
+
+    def test_catalog_page_is_one_query(self):
+        for _ in range(3):
+            make_car()
+        with self.assertNumQueries(1):
+            page = catalog_page({'sort': 'price_desc', 'fuel_type': 'petrol'})
+        self.assertEqual(len(page), 3)
+
+
+class CatalogApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_follow_cursor_with_selected_fields(self):
+        cars = [make_car(price=Decimal(1000 * (i % 3))) for i in range(30)]
+        url, seen = reverse('catalog_api') + '?sort=price_asc&fields=id,price,url', []
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(data['results'])
+            url = data['next']
+        self.assertEqual([item['id'] for item in seen],
+                         [car.id for car in sorted(cars, key=lambda c: (c.price, c.id))])
+        self.assertEqual(seen[0], {'id': seen[0]['id'], 'price': '0.00',
+                                   'url': reverse('car_detail', args=[seen[0]['id']])})
+
+    def test_catalog_page_continues_through_api(self):
+        for _ in range(30):
+            make_car()
+        response = self.client.get(reverse('catalog'))
+        self.assertContains(response, 'data-api-url')
+        data = self.client.get(f"{reverse('catalog_api')}?{response.context['next_query']}").json()
+        self.assertEqual(len(data['results']), 30 - len(response.context['cars']))
+        self.assertIsNone(data['next'])
+
+    def test_not_modified_until_catalog_changes(self):
+        car = make_car()
+        response = self.client.get(reverse('catalog_api'), {'fuel_type': 'petrol'})
+        etag = response['ETag']
+        self.assertEqual(response.json()['results'][0]['title'], 'BMW 320i')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('catalog_api'), {'fuel_type': 'petrol'}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        car.price = Decimal('2000000')
+        car.save()
+        response = self.client.get(reverse('catalog_api'), {'fuel_type': 'petrol'}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_follows_changes_from_other_processes(self):
+        make_car()
+        etag = self.client.get(reverse('catalog_api'))['ETag']
+        # rebuild_listings или run_jobs в другом процессе: кеш сайта о сбросе не знает.
+        with mock.patch('main.caching.cache', LocMemCache('other', {})), \
+                mock.patch.dict(caching._versions, clear=True):
+            call_command('rebuild_listings', stdout=StringIO())
+        caching._versions.clear()
+        response = self.client.get(reverse('catalog_api'), headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_rejects_unknown_fields_and_bad_cursor(self):
+        for params in ({'fields': 'id,secret'}, {'cursor': 'garbage'}, {'price_min': 'abc'}):
+            response = self.client.get(reverse('catalog_api'), params)
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.has_header('ETag'))
+            self.assertFalse(response.has_header('Cache-Control'))
+            # Подставленный ETag не превращает ошибку в 304.
+            request = RequestFactory().get(reverse('catalog_api'), params)
+            response = self.client.get(reverse('catalog_api'), params, HTTP_IF_NONE_MATCH=catalog_etag(request))
+            self.assertEqual(response.status_code, 400)
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_car(transmission='auto', fuel_type='diesel', price=Decimal('1500000'), color='Белый')
+        make_car(transmission='manual', price=Decimal('500000'))
+        make_car(transmission='auto', price=Decimal('9000000'), mileage=200000)
+
+    def test_each_facet_ignores_its_own_filter(self):
+        with self.assertNumQueries(1):
+            facets = compute_facets({'transmission': 'auto', 'price_max': Decimal('2000000')})
+
+        def counts(name):
+            return {facet.value: facet.count for facet in facets[name] if facet.count}
+
+        self.assertEqual(facets['total'], 1)
+        self.assertEqual(counts('transmission'), {'auto': 1, 'manual': 1})
+        self.assertEqual(counts('fuel_type'), {'diesel': 1})
+        self.assertEqual(counts('color'), {'Белый': 1})
+        self.assertEqual(counts('price'), {(1_000_000, 2_000_000): 1, (8_000_000, None): 1})
+        self.assertEqual(counts('mileage'), {(50_000, 100_000): 1})
+
+    def test_catalog_shows_counts_and_caches_them(self):
+        response = self.client.get(reverse('catalog'), {'fuel_type': 'petrol'})
+        self.assertContains(response, 'Автомат (1)')
+        self.assertContains(response, 'Черный (2)')
+        self.assertContains(response, 'Найдено автомобилей: <strong>2</strong>')
+        with self.assertNumQueries(0):
+            catalog_facets({'fuel_type': 'petrol'})
+
+
+class PhotoDerivativeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def gif_upload(self):
+        frames = [Image.new('P', (1200, 800), color) for color in (1, 2)]
+        buffer = BytesIO()
+        frames[0].save(buffer, 'GIF', save_all=True, append_images=frames[1:])
+        return SimpleUploadedFile('anim.gif', buffer.getvalue(), content_type='image/gif')
+
+    def test_builds_card_and_detail_variants_once(self):
+        car = make_car(photo=self.gif_upload())
+        self.assertTrue(build_photo_derivatives(car))
+        self.assertEqual([w for w, _ in car.photo_derivatives['card']['jpeg']], [480, 960])
+        self.assertEqual([w for w, _ in car.photo_derivatives['detail']['webp']], [640, 1024])
+        self.assertIn('480w', car.card_photo.webp_srcset)
+        self.assertTrue(car.card_photo.src.endswith('.jpeg'))
+        self.assertFalse(build_photo_derivatives(Car.objects.get(pk=car.pk)))
+
+
+class InventoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(User.objects.create_superuser(phone='+70000000002', password='secret-pass-123'))
+
+    def photo_archive(self):
+        image = BytesIO()
+        Image.new('RGB', (800, 600), 'red').save(image, 'JPEG')
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('red.jpg', image.getvalue())
+        return SimpleUploadedFile('photos.zip', archive.getvalue(), content_type='application/zip')
+
+    def test_upload_creates_updates_and_reports_rows(self):
+        rows = (
+            'stock_id,configuration,price,power,mileage,transmission,fuel_type,drive,color,photo\n'
+            'A1,Audi Q7 55 TFSI,5000000,340,1000,auto,petrol,full,Белый,red.jpg\n'
+            'A2,Audi A4 40 TFSI,3000000,190,2000,robot,petrol,front,Серый,red.jpg\n'
+            'A3,Broken,abc,190,2000,robot,petrol,front,Серый,red.jpg\n'
+            'A4,No photo,1000000,150,2000,auto,diesel,rear,Черный,\n'
+        )
+        response = self.client.post(reverse('admin_car_import'), {
+            'file': SimpleUploadedFile('cars.csv', rows.encode()),
+            'photos': self.photo_archive(),
+        })
+        report = response.context['report']
+        self.assertEqual((report.created, report.updated), (2, 0))
+        self.assertEqual([line for line, _ in report.errors], [4, 5])
+        first, second = Car.objects.order_by('stock_id')
+        self.assertEqual(first.photo.name, second.photo.name)
+        # Превью строит фоновое задание, а не запрос импорта.
+        self.assertEqual(first.photo_derivatives, {})
+        self.assertEqual(run_pending(), 1)
+        first.refresh_from_db()
+        self.assertTrue(first.photo_derivatives)
+        self.assertEqual(search_cars('audi q7'), [first])
+
+        update = 'stock_id,configuration,price,power,mileage,transmission,fuel_type,drive,color\n' \
+                 'A1,Audi Q7 55 TFSI,4500000,340,1000,auto,petrol,full,Белый\n'
+        report = import_cars(StringIO(update), 'csv')
+        self.assertEqual((report.created, report.updated, report.error_count), (0, 1, 0))
+        first.refresh_from_db()
+        self.assertEqual((first.price, first.photo.name), (Decimal('4500000'), second.photo.name))
+
+    def test_export_round_trip(self):
+        default_storage.save('cars/test.jpg', ContentFile(b'jpeg'))
+        make_car(stock_id='B1')
+        make_car(stock_id='B2', is_deleted=True)
+        response = self.client.get(reverse('admin_car_export'), {'format': 'jsonl'})
+        self.assertTrue(response.streaming)
+        exported = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(exported.splitlines()), 2)
+        with self.assertNumQueries(10):
+            report = import_cars(StringIO(exported), 'jsonl', build_photos=False)
+        self.assertEqual((report.created, report.updated, report.error_count), (0, 2, 0))
+        self.assertTrue(Car.all_objects.get(stock_id='B2').is_deleted)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        TASKS['test_flaky'] = self.flaky
+        self.addCleanup(TASKS.pop, 'test_flaky')
+
+    def flaky(self, fail):
+        self.calls.append(fail)
+        if fail:
+            raise RuntimeError('сбой')
+
+    def test_failed_job_is_retried_with_backoff_then_marked_failed(self):
+        job = enqueue('test_flaky', max_attempts=2, fail=True)
+        self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('RuntimeError: сбой', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(run_pending(), 0)
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertEqual(self.calls, [True, True])
+
+        admin = User.objects.create_superuser(phone='+70000000009', password='secret-pass-123')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin_jobs'), {'status': 'failed'})
+        self.assertEqual(list(response.context['jobs']), [job])
+        self.client.post(reverse('admin_job_retry', args=[job.id]))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 0))
+
+    def test_abandoned_job_is_requeued(self):
+        job = enqueue('test_flaky', fail=False)
+        Job.objects.filter(id=job.id).update(
+            status='running', attempts=1, locked_by='dead', locked_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('done', 2, ''))
+
+    def test_car_form_enqueues_photo_processing(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        image = BytesIO()
+        Image.new('RGB', (800, 600), 'blue').save(image, 'JPEG')
+        self.client.force_login(User.objects.create_superuser(phone='+70000000008', password='secret-pass-123'))
+        with override_settings(MEDIA_ROOT=media_root):
+            self.client.post(reverse('admin_car_add'), {
+                'configuration': 'BMW X5', 'price': '5000000', 'power': 340, 'mileage': 0,
+                'transmission': 'auto', 'fuel_type': 'petrol', 'drive': 'full', 'color': 'Синий',
+                'photo': SimpleUploadedFile('blue.jpg', image.getvalue(), content_type='image/jpeg'),
+            })
+            car = Car.objects.get()
+            self.assertEqual(car.photo_derivatives, {})
+            job = Job.objects.get()
+            self.assertEqual((job.name, job.payload), ('build_car_photos', {'car_ids': [car.id]}))
+            run_pending()
+        car.refresh_from_db()
+        self.assertTrue(car.photo_derivatives)
+
+    def test_photo_job_in_another_process_invalidates_site_cache(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        cache.clear()
+        image = BytesIO()
+        Image.new('RGB', (800, 600), 'blue').save(image, 'JPEG')
+        with override_settings(MEDIA_ROOT=media_root):
+            car = make_car(photo=default_storage.save('cars/blue.jpg', ContentFile(image.getvalue())))
+            self.assertNotContains(self.client.get(reverse('catalog')), 'srcset=')
+            etag = self.client.get(reverse('catalog_api'))['ETag']
+            enqueue('build_car_photos', car_ids=[car.id])
+            # Обработчик run_jobs: свой кеш и свои запомненные версии.
+            worker_cache = LocMemCache('run_jobs', {})
+            with mock.patch('main.caching.cache', worker_cache), mock.patch('main.facets.cache', worker_cache), \
+                    mock.patch.dict(caching._versions, clear=True):
+                self.assertEqual(run_pending(), 1)
+            # Запомненная сайтом версия живёт CACHE_VERSION_TTL секунд.
+            caching._versions.clear()
+            self.assertContains(self.client.get(reverse('catalog')), 'srcset=')
+            self.assertNotEqual(self.client.get(reverse('catalog_api'))['ETag'], etag)
+
+
+class ConcurrentJobTests(TransactionTestCase):
+    def test_each_job_runs_once_across_threads(self):
+        done = []
+        TASKS['test_record'] = lambda number: done.append(number)
+        self.addCleanup(TASKS.pop, 'test_record')
+        for number in range(20):
+            enqueue('test_record', number=number)
+        serve(threads=4, poll_interval=0.01, once=True)
+        self.assertEqual(sorted(done), list(range(20)))
+        self.assertEqual(Job.objects.filter(status='done').count(), 20)
+
+
+class AdminPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(phone='+70000000000', password='secret-pass-123')
+        self.client.force_login(self.admin)
+
+    def add_orders(self, count):
+        for _ in range(count):
+            user = make_user(f'+7{User.objects.count():010d}', address='Berlin')
+            order = Order.objects.create(user=user, address=user.address)
+            for _ in range(2):
+                OrderItem.objects.create(order=order, car=make_car(), quantity=2)
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin_page'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_orders(self):
+        self.add_orders(1)
+        self.count_queries()
+        baseline = self.count_queries()
+        self.add_orders(20)
+        self.assertEqual(self.count_queries(), baseline)
+
+    def test_sections_are_paginated(self):
+        self.add_orders(60)
+        response = self.client.get(reverse('admin_page'), {'orders_page': 2})
+        self.assertEqual(len(response.context['orders']), 10)
+        self.assertEqual(len(response.context['users']), 50)
+
+    def test_order_status_badge_and_options(self):
+        self.add_orders(1)
+        Order.objects.update(status='in_delivery')
+        response = self.client.get(reverse('admin_page'))
+        self.assertContains(response, '<span class="badge bg-primary">Авто в доставке</span>', html=True)
+        self.assertContains(response, '<option value="in_delivery" selected>Авто в доставке</option>', html=True)
+        self.assertContains(response, '<option value="created">Создан</option>', html=True)
+
+
+class OrderStatusTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(phone='+70000000009', password='secret-pass-123')
+        self.user = make_user('+79990000030', address='Berlin')
+
+    def make_orders(self, count, status='created'):
+        return [Order.objects.create(user=self.user, address='Berlin', status=status).id for _ in range(count)]
+
+    def counters(self):
+        return {status: count for status, _, count in status_counts() if count}
+
+    def test_batch_cost_does_not_depend_on_size(self):
+        small, large = self.make_orders(2), self.make_orders(40)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(transition_orders(small, 'processed', self.admin), 2)
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(transition_orders(large, 'processed', self.admin), 40)
+        self.assertEqual(OrderStatusEvent.objects.filter(to_status='processed', changed_by=self.admin).count(), 42)
+        self.assertEqual(self.counters(), {'processed': 42})
+
+    def test_counters_follow_every_change(self):
+        ids = self.make_orders(3)
+        delivered = self.make_orders(1, status='delivered')
+        self.assertEqual(transition_orders(ids + delivered, 'delivered'), 3)
+        order = Order.objects.get(id=ids[0])
+        order.status = 'completed'
+        order.save()
+        Order.objects.get(id=ids[1]).delete()
+        expected = {'delivered': 2, 'completed': 1}
+        self.assertEqual(self.counters(), expected)
+        recount_order_statuses()
+        self.assertEqual(self.counters(), expected)
+        self.assertEqual(list(order.status_events.order_by('created_at', 'id').values_list('from_status', 'to_status')),
+                         [('', 'created'), ('created', 'delivered'), ('delivered', 'completed')])
+
+    def test_bulk_endpoint(self):
+        ids = self.make_orders(3)
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('admin_orders_status'),
+                                    {'order_ids': ids[:2], 'status': 'in_delivery', 'orders_page': '1'})
+        self.assertRedirects(response, reverse('admin_page') + '?orders_page=1#orders', fetch_redirect_response=False)
+        self.assertEqual(self.counters(), {'created': 1, 'in_delivery': 2})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin_page'))
+        self.assertIn(('in_delivery', 'Авто в доставке', 2), response.context['status_counts'])
+        self.assertEqual(response.context['orders'].paginator.count, 3)
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql'] and '"main_order"' in q['sql']])
+
+
+class ReportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(phone='+70000000003', password='secret-pass-123'))
+        user = make_user('+70000000004', address='Berlin')
+        petrol, diesel = make_car(), make_car(fuel_type='diesel')
+        old = Order.objects.create(user=user, address='Berlin', status='completed')
+        Order.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=10))
+        OrderItem.objects.create(order=old, car=petrol, price=Decimal('100'), quantity=1)
+        new = Order.objects.create(user=user, address='Berlin')
+        OrderItem.objects.create(order=new, car=petrol, price=Decimal('200'), quantity=2)
+        OrderItem.objects.create(order=new, car=diesel, price=Decimal('50'), quantity=1)
+
+    def test_revenue_is_grouped_in_sql(self):
+        with self.assertNumQueries(3):
+            report = revenue_report({})
+        self.assertEqual(
+            [(row['order__status'], row['orders'], row['revenue']) for row in report['by_status']],
+            [('completed', 1, Decimal('100')), ('created', 1, Decimal('450'))],
+        )
+        self.assertEqual([(row['label'], row['cars']) for row in report['by_fuel']], [('Бензин', 3), ('Дизель', 1)])
+        self.assertEqual(len(report['by_day']), 2)
+
+        week_ago = timezone.localdate() - timedelta(days=7)
+        response = self.client.get(reverse('admin_reports'), {'date_from': week_ago.isoformat()})
+        self.assertEqual([row['revenue'] for row in response.context['report']['by_status']], [Decimal('450')])
+
+    def test_exports_stream_filtered_rows(self):
+        response = self.client.get(reverse('admin_orders_export'), {'kind': 'items', 'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 4)
+
+        response = self.client.get(reverse('admin_orders_export'), {'status': 'created', 'format': 'excel'})
+        self.assertIn('.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        header, row = content.splitlines()
+        self.assertTrue(header.startswith('Номер;'))
+        self.assertEqual(row.split(';')[-2:], ['3', '450'])
+
+
+def run_in_threads(target, count):
+    barrier = threading.Barrier(count)
+    results = []
+
+    def worker():
+        barrier.wait()
+        try:
+            # Общая in-memory база SQLite не ждёт блокировку, а сразу отвечает
+            # «table is locked» — повторяем, как повторил бы клиент.
+            for _ in range(100):
+                try:
+                    results.append(target())
+                    return
+                except OperationalError:
+                    time.sleep(0.005)
+        except CheckoutError as exc:
+            results.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        self.user = make_user('+79990000001', address='Berlin')
+        self.client.force_login(self.user)
+
+    def test_snapshots_prices_and_empties_cart(self):
+        car = make_car(price=Decimal('2500000'))
+        CartItem.objects.create(user=self.user, car=car, quantity=2)
+        response = self.client.post(reverse('place_order'))
+        self.assertRedirects(response, reverse('profile'))
+        item = OrderItem.objects.get()
+        self.assertEqual((item.quantity, item.price), (2, Decimal('2500000')))
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_deleted_car_blocks_checkout(self):
+        CartItem.objects.create(user=self.user, car=make_car(is_deleted=True))
+        response = self.client.post(reverse('place_order'))
+        self.assertRedirects(response, reverse('cart'))
+        self.assertFalse(Order.objects.exists())
+
+
+class OrderHistoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('+79990000002', address='Berlin')
+        self.client.force_login(self.user)
+        self.car = make_car()
+
+    def add_orders(self, count, status='created'):
+        for _ in range(count):
+            order = Order.objects.create(user=self.user, address='Berlin', status=status)
+            OrderItem.objects.create(order=order, car=self.car)
+
+    def count_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profile'), params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_history(self):
+        self.add_orders(2)
+        self.count_queries()
+        baseline = self.count_queries()
+        self.add_orders(60)
+        self.assertEqual(self.count_queries(), baseline)
+
+    def test_pages_are_newest_first_and_filtered_by_status(self):
+        self.add_orders(3, status='delivered')
+        self.add_orders(22)
+        response = self.client.get(reverse('profile'))
+        orders = response.context['orders']
+        self.assertEqual(len(orders), 20)
+        self.assertEqual(orders[0], Order.objects.latest('id'))
+        response = self.client.get(reverse('profile') + '?' + response.context['next_query'])
+        self.assertEqual([order.status for order in response.context['orders']], ['created'] * 2 + ['delivered'] * 3)
+        self.assertIsNone(response.context['next_query'])
+
+        response = self.client.get(reverse('profile'), {'status': 'delivered'})
+        self.assertEqual(len(response.context['orders']), 3)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = make_user('+79990000012', address='Berlin')
+        self.car = make_car(configuration='BMW M5')
+        order = Order.objects.create(user=self.user, address='Berlin')
+        self.item = OrderItem.objects.create(order=order, car=self.car)
+        CartItem.objects.create(user=self.user, car=self.car)
+
+    def delete_car(self, days_ago):
+        self.car.is_deleted = True
+        self.car.save(update_fields=['is_deleted'])
+        Car.all_objects.filter(pk=self.car.pk).update(deleted_at=timezone.now() - timedelta(days=days_ago))
+
+    def test_old_deleted_cars_move_to_archive(self):
+        self.delete_car(days_ago=120)
+        fresh = make_car(is_deleted=True)
+        fresh.sync_deleted_at()
+        fresh.save()
+
+        self.assertEqual(archive_deleted_cars(days=90), 1)
+        self.assertFalse(Car.all_objects.filter(pk=self.car.pk).exists())
+        self.assertTrue(Car.all_objects.filter(pk=fresh.pk).exists())
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+        self.item.refresh_from_db()
+        self.assertIsNone(self.item.car)
+        self.assertEqual(self.item.archived_car_id, self.car.pk)
+        self.assertEqual(self.item.product.configuration, 'BMW M5')
+
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('profile')), 'BMW M5')
+        self.assertEqual(revenue_report({})['by_fuel'][0]['label'], 'Бензин')
+
+    def test_restored_car_is_not_archived(self):
+        self.delete_car(days_ago=120)
+        self.car.refresh_from_db()
+        self.car.is_deleted = False
+        self.car.save(update_fields=['is_deleted'])
+        self.car.refresh_from_db()
+        self.assertIsNone(self.car.deleted_at)
+        self.assertEqual(archive_deleted_cars(days=90), 0)
+
+    def test_catalog_query_uses_listing_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            catalog_page({'sort': 'price_asc'})
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + queries[-1]['sql'])
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('listing_price_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    def test_cart_is_ordered_exactly_once(self):
+        user = make_user('+79990000002', address='Berlin')
+        for quantity in (1, 2, 3):
+            CartItem.objects.create(user=user, car=make_car(), quantity=quantity)
+
+        results = run_in_threads(lambda: place_order_from_cart(user), 8)
+
+        placed = [result for result in results if isinstance(result, Order)]
+        self.assertEqual(len(placed), 1)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(sum(OrderItem.objects.values_list('quantity', flat=True)), 6)
+        self.assertFalse(CartItem.objects.exists())
+
+
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('+79990000003')
+        self.client.force_login(self.user)
+        for price, quantity in (('1000000', 1), ('2000000', 2)):
+            CartItem.objects.create(user=self.user, car=make_car(price=Decimal(price)), quantity=quantity)
+
+    def test_cart_total_does_not_depend_on_item_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('cart'))
+        self.assertEqual(response.context['total_price'], Decimal('5000000'))
+        CartItem.objects.create(user=self.user, car=make_car(), quantity=1)
+        with self.assertNumQueries(len(queries)):
+            self.client.get(reverse('cart'))
+
+    def test_header_badge_is_cached_and_invalidated(self):
+        self.client.get(reverse('home'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, '>3</span>')
+        self.assertFalse([q for q in queries if 'main_cartitem' in q['sql']])
+
+        self.client.post(reverse('add_to_cart', args=[CartItem.objects.first().car_id]))
+        self.assertContains(self.client.get(reverse('home')), '>4</span>')
+
+
+class CartUpdateTests(TestCase):
+    def setUp(self):
+        self.user = make_user('+79990000004')
+        self.car = make_car()
+
+    def test_each_cart_action_is_a_single_statement(self):
+        with self.assertNumQueries(1):
+            add_car_to_cart(self.user, self.car.id)
+        item = CartItem.objects.get()
+        with self.assertNumQueries(1):
+            add_car_to_cart(self.user, self.car.id)
+        with self.assertNumQueries(1):
+            change_cart_item(self.user, item.id, 'remove')
+        with self.assertNumQueries(1):
+            change_cart_item(self.user, item.id, 'add')
+
+    def test_remove_last_unit_deletes_item(self):
+        add_car_to_cart(self.user, self.car.id)
+        item = CartItem.objects.get()
+        self.assertEqual(change_cart_item(self.user, item.id, 'remove'), 'delete')
+        self.assertFalse(CartItem.objects.exists())
+        self.assertIsNone(change_cart_item(self.user, item.id, 'remove'))
+
+    def test_remove_does_not_delete_item_topped_up_meanwhile(self):
+        add_car_to_cart(self.user, self.car.id)
+        item = CartItem.objects.get()
+        # add другого запроса между неудачным уменьшением и удалением.
+        original_update = QuerySet.update
+
+        def update(queryset, **kwargs):
+            updated = original_update(queryset, **kwargs)
+            if not updated and not getattr(update, 'raced', False):
+                update.raced = True
+                add_car_to_cart(self.user, self.car.id)
+            return updated
+        with mock.patch.object(QuerySet, 'update', update):
+            self.assertEqual(change_cart_item(self.user, item.id, 'remove'), 'remove')
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 1)
+
+    def test_view_reports_removed_item(self):
+        add_car_to_cart(self.user, self.car.id)
+        item = CartItem.objects.get()
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('update_cart_quantity', args=[item.id, 'remove']), follow=True)
+        self.assertContains(response, 'Автомобиль удален из корзины.')
+
+    def test_deleted_car_is_not_added(self):
+        self.assertFalse(add_car_to_cart(self.user, make_car(is_deleted=True).id))
+
+
+class ConcurrentCartTests(TransactionTestCase):
+    def test_no_lost_updates(self):
+        user = make_user('+79990000005')
+        car = make_car()
+        results = run_in_threads(lambda: add_car_to_cart(user, car.id), 10)
+        self.assertEqual(CartItem.objects.get(user=user, car=car).quantity, results.count(True))
+        self.assertGreater(results.count(True), 0)
+
+
+class SessionCartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.car = make_car(configuration='Audi A6')
+        self.other = make_car(configuration='Skoda Octavia', price=Decimal('2000000'))
+
+    def test_guest_cart_lives_in_session(self):
+        self.client.post(reverse('add_to_cart', args=[self.car.id]))
+        self.client.post(reverse('add_to_cart', args=[self.car.id]))
+        self.client.post(reverse('add_to_cart', args=[self.other.id]))
+        self.client.post(reverse('update_cart_quantity', args=[self.other.id, 'remove']))
+
+        response = self.client.get(reverse('cart'))
+        self.assertEqual([(item.car, item.quantity) for item in response.context['items']], [(self.car, 2)])
+        self.assertEqual(response.context['total_price'], Decimal('2000000'))
+        self.assertContains(response, '>2</span>')
+        self.assertFalse(CartItem.objects.exists())
+
+        self.assertEqual(self.client.post(reverse('update_cart_quantity', args=[self.other.id, 'add'])).status_code,
+                         404)
+        deleted = make_car(is_deleted=True)
+        self.client.post(reverse('add_to_cart', args=[deleted.id]))
+        self.assertEqual(self.client.session[SESSION_CART_KEY], {str(self.car.id): 2})
+
+    def test_cached_page_form_posts_with_cookie_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.get(reverse('catalog'))
+        response = client.get(reverse('catalog'))
+        self.assertContains(response, 'data-csrf-cookie')
+        token = response.cookies['csrftoken'].value
+        response = client.post(reverse('add_to_cart', args=[self.car.id]), {'csrfmiddlewaretoken': token})
+        self.assertRedirects(response, reverse('cart'))
+
+    def test_search_page_form_posts_with_cookie_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.get(reverse('home'))
+        response = client.get(reverse('search'), {'q': 'audi'})
+        self.assertContains(response, 'data-csrf-cookie')
+        token = response.cookies['csrftoken'].value
+        response = client.post(reverse('add_to_cart', args=[self.car.id]), {'csrfmiddlewaretoken': token})
+        self.assertRedirects(response, reverse('cart'))
+
+    def test_guest_with_cart_bypasses_page_cache(self):
+        self.client.get(reverse('catalog'))
+        self.client.post(reverse('add_to_cart', args=[self.car.id]))
+        self.assertContains(self.client.get(reverse('catalog')), '>1</span>')
+
+    def test_login_merges_cart_in_one_upsert(self):
+        user = make_user('+79990000007', password='secret-pass-1')
+        CartItem.objects.create(user=user, car=self.car, quantity=1)
+        gone = make_car()
+        session = {SESSION_CART_KEY: {str(self.car.id): 2, str(self.other.id): 1, str(gone.id): 1}}
+        gone.delete()
+        with self.assertNumQueries(2):
+            self.assertEqual(merge_session_cart(session, user), 2)
+        self.assertEqual(dict(CartItem.objects.filter(user=user).values_list('car_id', 'quantity')),
+                         {self.car.id: 3, self.other.id: 1})
+        self.assertEqual(session, {})
+
+    def test_login_view_moves_guest_cart_to_account(self):
+        user = make_user('+79990000008', password='secret-pass-1')
+        self.client.post(reverse('add_to_cart', args=[self.car.id]))
+        response = self.client.post(reverse('login'), {'username': user.phone, 'password': 'secret-pass-1'})
+        self.assertRedirects(response, reverse('cart'))
+        self.assertEqual(CartItem.objects.get(user=user).car, self.car)
+        self.assertNotIn(SESSION_CART_KEY, self.client.session)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.x5 = make_car(configuration='BMW X5 xDrive30d', configuration_desc='Полноприводный дизельный кроссовер')
+        self.golf = make_car(configuration='Volkswagen Golf', configuration_desc='Компактный хэтчбек с дизельным мотором')
+
+    def test_russian_word_forms_and_ranking(self):
+        self.assertEqual(set(search_cars('дизельные')), {self.x5, self.golf})
+        self.assertEqual(search_cars('полноприводная bmw'), [self.x5])
+        self.assertEqual(search_cars('golf дизельного')[0], self.golf)
+
+    def test_prefix_suggestions(self):
+        response = self.client.get(reverse('search_suggest'), {'q': 'volksw'})
+        self.assertEqual([r['id'] for r in response.json()['results']], [self.golf.id])
+
+    def test_stop_words_and_cached_results(self):
+        self.assertEqual(search_cars('с'), [])
+        self.assertEqual(search_cars('BMW с', prefix=True), [self.x5])
+        self.assertEqual(search_cars('дизельный в', limit=5), search_cars('дизельный', limit=5))
+        with self.assertNumQueries(1):
+            search_cars('дизельный в', limit=5)
+
+    def test_ranking_covers_older_matches(self):
+        # Больше тысячи более новых совпадений, но только в описании.
+        newer = Car.objects.bulk_create(
+            Car(photo='cars/test.jpg', price=Decimal('1000000'), power=150, mileage=50000, transmission='auto',
+                color='Черный', drive='rear', fuel_type='diesel', configuration='Audi A6',
+                configuration_desc='Седан после обслуживания у дилера BMW')
+            for _ in range(1200)
+        )
+        get_search_backend().index(newer)
+        self.assertEqual(search_cars('bmw', limit=5)[0], self.x5)
+
+    def test_index_follows_soft_delete(self):
+        self.golf.is_deleted = True
+        self.golf.save()
+        self.assertEqual(search_cars('golf'), [])
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.car = make_car(configuration='Audi A6')
+
+    def test_anonymous_catalog_is_served_from_cache_until_car_changes(self):
+        self.client.get(reverse('catalog'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('catalog'))
+        self.assertContains(response, 'Audi A6')
+
+        self.car.configuration = 'Audi A7'
+        self.car.save()
+        self.assertContains(self.client.get(reverse('catalog')), 'Audi A7')
+
+    def test_soft_deleted_car_detail_is_not_served_from_cache(self):
+        url = reverse('car_detail', args=[self.car.id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.car.is_deleted = True
+        self.car.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_authenticated_users_bypass_page_cache(self):
+        self.client.get(reverse('catalog'))
+        self.client.force_login(make_user('+79990000006'))
+        self.assertContains(self.client.get(reverse('catalog')), reverse('logout'))
+
+
+class SessionWriteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone='+79990000010', password='secret-pass-123')
+
+    def login(self):
+        response = self.client.post(reverse('login'), {'username': '+79990000010', 'password': 'secret-pass-123'})
+        self.assertRedirects(response, reverse('home'))
+
+    def writes(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(path).status_code, 200)
+        return [query['sql'] for query in queries if not query['sql'].startswith(('SELECT', 'SAVEPOINT', 'RELEASE'))]
+
+    def test_last_login_is_written_once_per_interval(self):
+        self.login()
+        first = User.objects.get().last_login
+        self.assertIsNotNone(first)
+        self.client.logout()
+        self.login()
+        self.assertEqual(User.objects.get().last_login, first)
+
+    def test_browsing_does_not_write_until_refresh_is_due(self):
+        self.login()
+        self.assertEqual(self.writes(reverse('profile')), [])
+        self.assertEqual(self.writes(reverse('cart')), [])
+        with override_settings(SESSION_REFRESH_INTERVAL=0):
+            self.assertEqual(len(self.writes(reverse('profile'))), 1)
+
+    async def test_refresh_runs_natively_under_asgi(self):
+        async def get_response(request):
+            request.session['cart'] = {}
+            return HttpResponse()
+
+        middleware = SessionRefreshMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        await middleware(request)
+        self.assertIn(SESSION_REFRESHED_KEY, request.session)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions_skip_the_session_table(self):
+        self.login()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertContains(self.client.get(reverse('profile')), '+79990000010')
+        self.assertFalse(any('django_session' in query['sql'] for query in queries))
+
+
+class StaticFilesTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        storages = {**settings.STORAGES,
+                    'staticfiles': {'BACKEND': 'main.staticfiles.CompressedManifestStaticFilesStorage'}}
+        override = override_settings(STATIC_ROOT=os.path.join(root, 'static'), MEDIA_ROOT=os.path.join(root, 'media'),
+                                     STORAGES=storages)
+        override.enable()
+        self.addCleanup(override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_hashed_asset_is_compressed_and_immutable(self):
+        url = static('css/styles.css')
+        self.assertRegex(url, r'^/static/css/styles\.[0-9a-f]{12}\.css$')
+        self.assertIn(url, self.client.get(reverse('home')).content.decode())
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn(b'.transition-card', gzip.decompress(b''.join(response.streaming_content)))
+
+        plain = self.client.get(url)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertNotEqual(plain['ETag'], response['ETag'])
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_media_supports_conditional_get(self):
+        url = default_storage.url(default_storage.save('cars/etag-test.jpg', ContentFile(b'jpeg')))
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get(reverse('catalog'))
+        self.assertEqual(self.client.get(reverse('admin_metrics')).status_code, 403)
+        self.client.force_login(User.objects.create_superuser(phone='+70000000001', password='secret-pass-123'))
+        response = self.client.get(reverse('admin_metrics'))
+        self.assertContains(response, 'autogerm_request_db_queries_bucket{view="catalog",method="GET",le="+Inf"}')
+        self.assertContains(response, 'autogerm_request_template_duration_seconds_count{view="catalog"')
+
+    @override_settings(PERF_SLOW_REQUEST_MS=0)
+    def test_slow_requests_dump_sql(self):
+        make_car()
+        with self.assertLogs('main.performance', 'WARNING') as logs:
+            self.client.get(reverse('car_detail', args=[Car.objects.get().id]))
+        self.assertIn('"event": "slow_request"', logs.output[0])
+        self.assertIn('main_car', logs.output[0])
+
+
+@override_settings(ROOT_URLCONF='autogerm.urls_asgi')
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('+79990000021', address='Berlin')
+        self.car = make_car(configuration='Audi A6 45 TDI')
+        CartItem.objects.create(user=self.user, car=self.car, quantity=2)
+        order = Order.objects.create(user=self.user, address='Berlin')
+        OrderItem.objects.create(order=order, car=self.car, quantity=1, price=self.car.price)
+
+    async def test_read_pages_render_for_customer(self):
+        await self.async_client.aforce_login(self.user)
+        for name, args in (('catalog', []), ('car_detail', [self.car.id]), ('cart', []), ('profile', [])):
+            response = await self.async_client.get(reverse(name, args=args))
+            self.assertContains(response, 'Audi A6 45 TDI', msg_prefix=name)
+            self.assertContains(response, '>2</span>', msg_prefix=name)
+
+    async def test_anonymous_pages(self):
+        response = await self.async_client.get(reverse('profile'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response['Location'])
+        await self.async_client.post(reverse('add_to_cart', args=[self.car.id]))
+        self.assertContains(await self.async_client.get(reverse('cart')), 'Audi A6 45 TDI')
+        self.async_client.cookies.pop(settings.SESSION_COOKIE_NAME)
+        await self.async_client.get(reverse('catalog'))
+        hits = cache_stats().get(('catalog', 'hit'), 0)
+        response = await self.async_client.get(reverse('catalog'))
+        self.assertContains(response, 'Audi A6 45 TDI')
+        self.assertEqual(cache_stats().get(('catalog', 'hit'), 0), hits + 1)
+
+
+class BenchmarkTests(TransactionTestCase):
+    def test_all_scenarios_run_without_errors(self):
+        generate(users=5, cars=30, orders=10, seed=1)
+        fixture = BenchFixture()
+        for name, scenario in SCENARIOS.items():
+            stats = run_scenario(fixture, scenario, requests=3, concurrency=1, warmup=0)
+            self.assertEqual((stats['requests'], stats['errors']), (3, 0), name)
+
+    def test_compare_results_flags_regressions(self):
+        stats = {'p50_ms': 10.0, 'p99_ms': 40.0, 'throughput_rps': 100.0, 'errors': 0}
+        baseline = {'scenarios': {'cart': stats}}
+        self.assertEqual(compare_results(baseline, {'scenarios': {'cart': dict(stats, p50_ms=12.0)}}), [])
+        regressions = compare_results(baseline, {'scenarios': {'cart': dict(stats, p99_ms=60.0, errors=1)}})
+        self.assertEqual(len(regressions), 2)
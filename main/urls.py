@@ -7,6 +7,9 @@ urlpatterns = [
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
     path('catalog/', views.catalog, name='catalog'),
+    path('api/catalog/', views.catalog_api, name='catalog_api'),
+    path('search/', views.search, name='search'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     path('car/<int:car_id>/', views.car_detail, name='car_detail'),
     path('add_to_cart/<int:car_id>/', views.add_to_cart, name='add_to_cart'),
     path('cart/', views.cart, name='cart'),
@@ -15,6 +18,13 @@ urlpatterns = [
 
     path('admin_page/', views.admin_page, name='admin_page'),
     path('change_order_status/<int:order_id>/', views.change_order_status, name='change_order_status'),
+    path('manage/orders/status/', views.bulk_order_status, name='admin_orders_status'),
+    path('manage/jobs/', views.jobs_page, name='admin_jobs'),
+    path('manage/jobs/<int:job_id>/retry/', views.job_retry, name='admin_job_retry'),
+    path('manage/cache/', views.cache_stats_view, name='admin_cache_stats'),
+    path('manage/metrics/', views.metrics_view, name='admin_metrics'),
+    path('manage/reports/', views.reports, name='admin_reports'),
+    path('manage/reports/export/', views.orders_export, name='admin_orders_export'),
 
     path('manage/user/edit/<int:user_id>/', views.user_edit, name='admin_user_edit'),
     path('manage/user/delete/<int:user_id>/', views.user_delete, name='admin_user_delete'),
@@ -22,6 +32,8 @@ urlpatterns = [
     path('manage/car/add/', views.car_add, name='admin_car_add'),
     path('manage/car/edit/<int:car_id>/', views.car_edit, name='admin_car_edit'),
     path('manage/car/delete/<int:car_id>/', views.car_delete, name='admin_car_delete'),
+    path('manage/car/import/', views.car_import, name='admin_car_import'),
+    path('manage/car/export/', views.car_export, name='admin_car_export'),
 
     path('manage/order/edit/<int:order_id>/', views.order_edit, name='admin_order_edit'),
     path('manage/order/delete/<int:order_id>/', views.order_delete, name='admin_order_delete'),
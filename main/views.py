@@ -1,14 +1,41 @@
+import io
+import zipfile
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import user_passes_test, login_required
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
-from .models import User, Car, Order
+from django.core.paginator import Paginator
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.urls import reverse
+from django.db.models import Prefetch
+from .models import User, Car, Order, Job
 from .forms import UserForm, CarForm, OrderForm, RegisterForm
-from .forms import PhoneAuthForm
+from .forms import PhoneAuthForm, CatalogFilterForm
 from django.contrib.auth import authenticate, login, logout
 from .models import CartItem
 from .models import OrderItem
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.utils.cache import get_conditional_response
+from .catalog import catalog_page, next_page_query
+from .api import InvalidFields, catalog_api_page, catalog_etag, check_cursor, parse_fields
+from .facets import catalog_facets, range_links
+from .pagination import CountedPaginator, InvalidCursor
+from .jobs import enqueue, job_counts, retry_failed
+from .orders import place_order_from_cart, EmptyCartError, CarUnavailableError, CartChangedError
+from .orders import order_history_page, status_counts, transition_orders
+from .cart import cart_totals, invalidate_cart_summary, store_cart_summary
+from .cart import add_car_to_cart, change_cart_item
+from .cart import SessionCart, SessionCartFull, SESSION_CART_MAX_ITEMS, merge_session_cart, session_cart_totals
+from .search import search_cars, search_listings
+from .caching import anonymous_page_cache, cache_stats
+from .metrics import render_prometheus
+from .forms import CarImportForm, OrderReportForm, OrderStatusBulkForm
+from .inventory import export_cars, import_cars
+from .streaming import FORMATS, streaming_download
+from .reports import ReportTimeout, export_order_items, export_orders, revenue_report
 
 
 def home(request):
@@ -21,6 +48,8 @@ def register(request):
         if form.is_valid():
             user = form.save()
             login(request, user)
+            if merge_session_cart(request.session, user):
+                return redirect('cart')
             return redirect('home')
     else:
         form = RegisterForm()
@@ -36,6 +65,8 @@ def user_login(request):
             user = authenticate(request, phone=phone, password=password)
             if user is not None:
                 login(request, user)
+                if merge_session_cart(request.session, user):
+                    return redirect('cart')
                 return redirect('home')
             else:
                 messages.error(request, 'Неверный номер телефона или пароль')
@@ -49,52 +80,142 @@ def user_logout(request):
     return redirect('home')
 
 
+@anonymous_page_cache('catalog', lambda request: ['catalog'])
 def catalog(request):
-    cars = Car.objects.all()
-    return render(request, 'main/catalog.html', {'cars': cars})
+    form = CatalogFilterForm(request.GET)
+    form.is_valid()
+    filters = form.cleaned_data
+    try:
+        page = catalog_page(filters, request.GET.get('cursor'))
+    except InvalidCursor:
+        page = catalog_page(filters)
+    facets = catalog_facets(filters)
+    form.show_facets(facets)
+
+    return render(request, 'main/catalog.html', {
+        'cars': page.items,
+        'form': form,
+        'facets': facets,
+        'range_links': range_links(request.GET, facets),
+        'next_query': next_page_query(request.GET, page),
+    })
 
 
+@require_GET
+def catalog_api(request):
+    """Страница каталога в JSON для бесконечной прокрутки (см. main.api)."""
+    # Параметры проверяются до условного ответа: ошибка 400 не получает
+    # ETag и не может превратиться в 304 при перепроверке.
+    form = CatalogFilterForm(request.GET)
+    cursor = request.GET.get('cursor')
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+    except InvalidFields as exc:
+        return JsonResponse({'errors': {'fields': [f"Неизвестные поля: {', '.join(exc.args[0])}"]}}, status=400)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    try:
+        check_cursor(form.cleaned_data, cursor)
+    except InvalidCursor:
+        return JsonResponse({'errors': {'cursor': ["Неверный курсор"]}}, status=400)
+    etag = catalog_etag(request)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        try:
+            results, page = catalog_api_page(form.cleaned_data, fields, cursor)
+        except InvalidCursor:
+            return JsonResponse({'errors': {'cursor': ["Неверный курсор"]}}, status=400)
+        query = next_page_query(request.GET, page)
+        response = JsonResponse({
+            'results': results,
+            'next': f'{request.path}?{query}' if query else None,
+        }, json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')})
+    response['ETag'] = etag
+    # Ответ одинаков для всех посетителей; браузер перепроверяет его по ETag.
+    response['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+SEARCH_LIMIT = 60
+SUGGEST_LIMIT = 8
+
+
+# Карточки гостя берут CSRF-токен из cookie (см. base.html); кешируемые
+# страницы выставляют её в anonymous_page_cache, поиск — здесь.
+@ensure_csrf_cookie
+def search(request):
+    query = request.GET.get('q', '').strip()
+    cars = search_listings(query, limit=SEARCH_LIMIT) if query else []
+    return render(request, 'main/search.html', {'query': query, 'cars': cars})
+
+
+def search_suggest(request):
+    query = request.GET.get('q', '').strip()
+    cars = search_cars(query, limit=SUGGEST_LIMIT, prefix=True) if query else []
+    return JsonResponse({'results': [
+        {'id': car.id, 'title': car.configuration, 'url': reverse('car_detail', args=[car.id])}
+        for car in cars
+    ]})
+
+
+@anonymous_page_cache('car_detail', lambda request, car_id: [f'car:{car_id}'])
 def car_detail(request, car_id):
     car = get_object_or_404(Car, id=car_id)
     return render(request, 'main/car_detail.html', {'car': car})
 
 
-@login_required
 def add_to_cart(request, car_id):
-    car = get_object_or_404(Car, id=car_id)
-    if car.is_deleted:
+    if not request.user.is_authenticated:
+        try:
+            added = SessionCart(request.session).add(car_id)
+        except SessionCartFull:
+            messages.error(request, f'В корзине может быть не больше {SESSION_CART_MAX_ITEMS} автомобилей. '
+                                    'Войдите, чтобы продолжить.')
+            return redirect('cart')
+    else:
+        added = add_car_to_cart(request.user, car_id)
+        invalidate_cart_summary(request.user)
+    if not added:
         messages.error(request, 'Этот автомобиль больше не доступен.')
         return redirect('catalog')
-
-    cart_item, created = CartItem.objects.get_or_create(user=request.user, car=car)
-    if not created:
-        cart_item.quantity += 1
-        cart_item.save()
     return redirect('cart')
 
 
-@login_required
 def cart(request):
+    if not request.user.is_authenticated:
+        items = SessionCart(request.session).items()
+        return render(request, 'main/cart.html', {
+            'items': items,
+            'total_price': session_cart_totals(items)['total'],
+        })
     items = CartItem.objects.filter(user=request.user)
-    total_price = sum(item.car.price * item.quantity for item in items)
-    return render(request, 'main/cart.html', {'items': items, 'total_price': total_price})
+    summary = cart_totals(items)
+    store_cart_summary(request.user, summary)
+    return render(request, 'main/cart.html', {
+        'items': items.select_related('car').order_by('id'),
+        'total_price': summary['total'],
+    })
 
 
 @login_required
+@require_POST
 def place_order(request):
     user = request.user
     if not user.address:
         messages.error(request, 'Пожалуйста, добавьте адрес доставки в профиле.')
         return redirect('profile')
-    items = CartItem.objects.filter(user=user)
-    if not items.exists():
+    try:
+        place_order_from_cart(user)
+    except EmptyCartError:
         messages.error(request, 'Ваша корзина пуста.')
         return redirect('catalog')
-
-    order = Order.objects.create(user=user, address=user.address)
-    for item in items:
-        OrderItem.objects.create(order=order, car=item.car, quantity=item.quantity)
-    items.delete()
+    except CarUnavailableError:
+        messages.error(request, 'Некоторые автомобили из корзины больше не доступны. Удалите их и повторите заказ.')
+        return redirect('cart')
+    except CartChangedError:
+        messages.error(request, 'Корзина изменилась во время оформления. Проверьте её и повторите заказ.')
+        return redirect('cart')
+    invalidate_cart_summary(user)
     messages.success(request, 'Заказ успешно создан.')
     return redirect('profile')
 
@@ -109,8 +230,23 @@ def profile(request):
             user.save()
             messages.success(request, 'Адрес обновлен')
         return redirect('profile')
-    orders = user.orders.all()
-    return render(request, 'main/profile.html', {'user': user, 'orders': orders})
+    status = request.GET.get('status')
+    if status not in dict(Order.STATUS_CHOICES):
+        status = None
+    try:
+        page = order_history_page(user, status, request.GET.get('cursor'))
+    except InvalidCursor:
+        page = order_history_page(user, status)
+    return render(request, 'main/profile.html', {
+        'user': user,
+        'orders': page.items,
+        'status': status,
+        'status_choices': Order.STATUS_CHOICES,
+        'next_query': next_page_query(request.GET, page),
+    })
+
+
+ADMIN_PAGE_SIZE = 50
 
 
 def admin_check(user):
@@ -119,27 +255,108 @@ def admin_check(user):
 
 @user_passes_test(admin_check)
 def admin_page(request):
-    users = User.objects.all()
-    cars = Car.all_objects.all()
-    orders = Order.objects.all()
+    users = Paginator(User.objects.order_by('id'), ADMIN_PAGE_SIZE).get_page(request.GET.get('users_page'))
+    cars = Paginator(Car.all_objects.order_by('-id'), ADMIN_PAGE_SIZE).get_page(request.GET.get('cars_page'))
+    orders = Order.objects.select_related('user').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('car', 'archived_car')),
+    ).order_by('-created_at', '-id')
+    counts = status_counts()
+    # Всего заказов — сумма счётчиков статусов, COUNT(*) по заказам не нужен.
+    orders = CountedPaginator(orders, ADMIN_PAGE_SIZE, sum(count for _, _, count in counts))
+    orders = orders.get_page(request.GET.get('orders_page'))
     return render(request, 'main/admin_page.html', {
         'users': users,
         'cars': cars,
         'orders': orders,
+        'status_counts': counts,
+        'status_choices': Order.STATUS_CHOICES,
+    })
+
+
+@user_passes_test(admin_check)
+def jobs_page(request):
+    status = request.GET.get('status')
+    jobs = Job.objects.order_by('-id')
+    if status in dict(Job.STATUS_CHOICES):
+        jobs = jobs.filter(status=status)
+    else:
+        status = None
+    counts = job_counts()
+    total = sum(count for job_status, _, count in counts if status in (None, job_status))
+    jobs = CountedPaginator(jobs, ADMIN_PAGE_SIZE, total).get_page(request.GET.get('page'))
+    return render(request, 'main/admin_jobs.html', {
+        'jobs': jobs,
+        'status': status,
+        'job_counts': counts,
     })
 
 
+@user_passes_test(admin_check)
+@require_POST
+def job_retry(request, job_id):
+    if retry_failed(job_id):
+        messages.success(request, f"Задание #{job_id} снова в очереди")
+    else:
+        messages.error(request, f"Задание #{job_id} не в статусе «Ошибка»")
+    return redirect('admin_jobs')
+
+
+@user_passes_test(admin_check)
+def cache_stats_view(request):
+    stats = {}
+    for (name, outcome), count in cache_stats().items():
+        stats.setdefault(name, {'hit': 0, 'miss': 0})[outcome] = count
+    return JsonResponse(stats)
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    authorized = request.user.is_staff or (
+        token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    )
+    if not authorized:
+        return HttpResponse(status=403)
+    cache_counters = {
+        (('cache', name), ('outcome', outcome)): count
+        for (name, outcome), count in cache_stats().items()
+    }
+    body = render_prometheus([
+        ('autogerm_cache_requests_total', 'Обращения к кешу страниц', cache_counters),
+    ])
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @user_passes_test(admin_check)
 @require_POST
 def change_order_status(request, order_id):
     order = get_object_or_404(Order, id=order_id)
     status = request.POST.get('status')
     if status in dict(Order.STATUS_CHOICES):
-        order.status = status
-        order.save()
+        transition_orders([order.id], status, request.user)
     return redirect('admin_page')
 
 
+def _orders_section(request):
+    """URL раздела заказов в админке на той же странице списка."""
+    page = request.POST.get('orders_page', '')
+    query = f'?orders_page={page}' if page.isdigit() else ''
+    return f"{reverse('admin_page')}{query}#orders"
+
+
+@user_passes_test(admin_check)
+@require_POST
+def bulk_order_status(request):
+    """Переводит выбранные заказы в один статус одной пачкой (main.orders.transition_orders)."""
+    form = OrderStatusBulkForm(request.POST)
+    if form.is_valid():
+        changed = transition_orders(form.cleaned_data['order_ids'], form.cleaned_data['status'], request.user)
+        messages.success(request, f"Статус изменён у заказов: {changed}")
+    else:
+        for errors in form.errors.values():
+            messages.error(request, '; '.join(errors))
+    return redirect(_orders_section(request))
+
+
 @user_passes_test(lambda u: u.is_superuser)
 def user_edit(request, user_id):
     user = get_object_or_404(User, id=user_id)
@@ -169,7 +386,8 @@ def car_add(request):
     if request.method == 'POST':
         form = CarForm(request.POST, request.FILES)
         if form.is_valid():
-            form.save()
+            car = form.save()
+            enqueue('build_car_photos', car_ids=[car.id])
             messages.success(request, "Автомобиль добавлен")
             return redirect('admin_page')
     else:
@@ -183,7 +401,9 @@ def car_edit(request, car_id):
     if request.method == 'POST':
         form = CarForm(request.POST, request.FILES, instance=car)
         if form.is_valid():
-            form.save()
+            car = form.save()
+            if 'photo' in form.changed_data:
+                enqueue('build_car_photos', car_ids=[car.id])
             messages.success(request, "Автомобиль обновлен")
             return redirect('admin_page')
     else:
@@ -210,12 +430,71 @@ def car_delete(request, car_id):
     return render(request, 'main/admin_confirm_delete.html', {'object': car, 'type': 'автомобиль', 'action': action})
 
 
+@user_passes_test(lambda u: u.is_superuser)
+def car_import(request):
+    report = None
+    if request.method == 'POST':
+        form = CarImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            photos = form.cleaned_data['photos']
+            archive = zipfile.ZipFile(photos.file) if photos else None
+            try:
+                with io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='') as fh:
+                    report = import_cars(fh, form.format, archive=archive, dry_run=form.cleaned_data['dry_run'],
+                                         defer_photos=True)
+            except UnicodeDecodeError:
+                form.add_error('file', "Файл должен быть в кодировке UTF-8")
+            finally:
+                if archive:
+                    archive.close()
+    else:
+        form = CarImportForm()
+    return render(request, 'main/admin_car_import.html', {'form': form, 'report': report})
+
+
+@user_passes_test(lambda u: u.is_superuser)
+def car_export(request):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        raise Http404
+    return streaming_download(export_cars(fmt), fmt, 'cars')
+
+
+@user_passes_test(admin_check)
+def reports(request):
+    form = OrderReportForm(request.GET)
+    report = None
+    if form.is_valid():
+        try:
+            report = revenue_report(form.cleaned_data)
+        except ReportTimeout:
+            messages.error(request, "Отчёт считается слишком долго, сократите период")
+    return render(request, 'main/admin_reports.html', {
+        'form': form,
+        'report': report,
+        'query': request.GET.urlencode(),
+    })
+
+
+@user_passes_test(admin_check)
+def orders_export(request):
+    fmt = request.GET.get('format', 'csv')
+    kind = request.GET.get('kind', 'orders')
+    form = OrderReportForm(request.GET)
+    if fmt not in FORMATS or kind not in ('orders', 'items') or not form.is_valid():
+        raise Http404
+    if kind == 'items':
+        return streaming_download(export_order_items(fmt, form.cleaned_data), fmt, 'order_items')
+    return streaming_download(export_orders(fmt, form.cleaned_data), fmt, 'orders')
+
+
 @user_passes_test(lambda u: u.is_superuser)
 def order_edit(request, order_id):
     order = get_object_or_404(Order, id=order_id)
     if request.method == 'POST':
         form = OrderForm(request.POST, instance=order)
         if form.is_valid():
+            form.instance.status_changed_by = request.user
             form.save()
             messages.success(request, "Заказ обновлен")
             return redirect('admin_page')
@@ -234,28 +513,22 @@ def order_delete(request, order_id):
     return render(request, 'main/admin_confirm_delete.html', {'object': order, 'type': 'заказ'})
 
 
-@login_required
 @require_http_methods(["POST"])
 def update_cart_quantity(request, item_id, action):
     """Обновляет количество товара в корзине или полностью удаляет его."""
-    item = get_object_or_404(CartItem, id=item_id, user=request.user)
-
-    if action == 'add':
-        item.quantity += 1
-        item.save()
-        messages.success(request, f'Количество "{item.car.configuration}" увеличено.')
-
-    elif action == 'remove':
-        item.quantity -= 1
-        if item.quantity <= 0:
-            item.delete()
-            messages.info(request, f'Автомобиль "{item.car.configuration}" удален из корзины.')
-        else:
-            item.save()
-            messages.success(request, f'Количество "{item.car.configuration}" уменьшено.')
-
-    elif action == 'delete':
-        item.delete()
-        messages.info(request, f'Автомобиль "{item.car.configuration}" полностью удален из корзины.')
+    if not request.user.is_authenticated:
+        done = SessionCart(request.session).change(item_id, action)
+    else:
+        done = change_cart_item(request.user, item_id, action)
+        invalidate_cart_summary(request.user)
+    if not done:
+        raise Http404
+
+    if done == 'add':
+        messages.success(request, 'Количество автомобиля увеличено.')
+    elif done == 'remove':
+        messages.success(request, 'Количество автомобиля уменьшено.')
+    else:
+        messages.info(request, 'Автомобиль удален из корзины.')
 
     return redirect('cart')
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""Точка входа процесса обработчика очереди для manage.py run_jobs --processes.
+
+Дочерние процессы запускаются через spawn: после fork потоки и соединения
+с базой родителя оказались бы в неопределённом состоянии. Модуль
+импортируется до настройки Django, поэтому модели загружаются только
+внутри run_process.
+"""
+import signal
+import threading
+
+
+def install_stop_handlers(stop):
+    """SIGTERM и SIGINT не прерывают текущее задание, а только останавливают цикл."""
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: stop.set())
+
+
+def run_process(threads, poll_interval, once):
+    import django
+    django.setup()
+
+    from .jobs import serve
+
+    stop = threading.Event()
+    install_stop_handlers(stop)
+    serve(threads, poll_interval, once, stop)